@@ -0,0 +1,93 @@
+"""Measures encoding the /api/project and sprint payloads.
+
+Compares ernest.encoding.dumps against Flask's encoder with the
+hasattr-based ExtensibleJSONEncoder the views used to go through,
+both the way jsonify did it for regular requests (sorted and
+indented) and for XHR requests (sorted).
+
+Run from the top of the repository::
+
+    $ python benchmarks/bench_json.py
+
+"""
+import datetime
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from flask import json  # noqa
+
+from benchmarks.bugs import make_bugs  # noqa
+from ernest.encoding import dumps  # noqa
+from ernest.main import Project, Sprint, app  # noqa
+from ernest.pipeline import SPRINT_PIPELINE  # noqa
+from ernest.stats import SprintStats  # noqa
+
+
+class HasattrJSONEncoder(json.JSONEncoder):
+    def default(self, obj):
+        if hasattr(obj, '__json__'):
+            return obj.__json__()
+        return super(HasattrJSONEncoder, self).default(obj)
+
+
+def make_sprints(count):
+    sprints = []
+    for i in range(count):
+        sprint = Sprint(1, '2014.{0}'.format(i))
+        sprint.start_date = datetime.datetime(2014, 1, 1)
+        sprint.end_date = datetime.datetime(2014, 1, 14)
+        sprints.append(sprint)
+    return sprints
+
+
+def project_payload():
+    return {'projects': [Project('project{0}'.format(i))
+                         for i in range(50)]}
+
+
+def sprint_payload(count):
+    bugs = SPRINT_PIPELINE.run(make_bugs(count))
+    sprints = make_sprints(3)
+    data = {
+        'is_admin': False,
+        'project': Project('SUMO'),
+        'prev_sprint': sprints[0],
+        'sprint': sprints[1],
+        'next_sprint': sprints[2],
+        'bugs': bugs,
+    }
+    data.update(SprintStats(bugs).as_dict())
+    return data
+
+
+def main():
+    encoders = [
+        ('indented', lambda data: json.dumps(
+            data, cls=HasattrJSONEncoder, indent=2, sort_keys=True)),
+        ('sorted', lambda data: json.dumps(
+            data, cls=HasattrJSONEncoder, sort_keys=True)),
+        ('dumps', dumps),
+    ]
+    payloads = [('/api/project', project_payload())] + [
+        ('sprint {0}'.format(count), sprint_payload(count))
+        for count in (100, 1000, 5000)
+    ]
+
+    print '{0:>14}'.format('ms') + ''.join(
+        '{0:>12}'.format(name) for name, encode in encoders)
+    with app.app_context():
+        for name, data in payloads:
+            results = []
+            for encoder_name, encode in encoders:
+                best = min(timeit.repeat(
+                    lambda: encode(data), number=5, repeat=5))
+                results.append(best / 5 * 1000)
+            print '{0:>14}'.format(name) + ''.join(
+                '{0:>12.2f}'.format(result) for result in results)
+
+
+if __name__ == '__main__':
+    main()
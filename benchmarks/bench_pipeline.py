@@ -0,0 +1,36 @@
+"""Measures the per-bug cost of the sprint enrichment pipeline.
+
+Run from the top of the repository::
+
+    $ python benchmarks/bench_pipeline.py
+
+"""
+import copy
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.bugs import make_bugs  # noqa
+from ernest.pipeline import SPRINT_PIPELINE  # noqa
+
+
+def main():
+    print '{0:>8} {1:>12} {2:>12}'.format('bugs', 'total ms', 'us/bug')
+    for count in (1000, 2500, 5000, 10000):
+        original = make_bugs(count)
+        runs = []
+        for _ in range(5):
+            bugs = copy.deepcopy(original)
+            start = timeit.default_timer()
+            SPRINT_PIPELINE.run(bugs, my_email='dev1@example.com')
+            runs.append(timeit.default_timer() - start)
+
+        best = min(runs)
+        print '{0:>8} {1:>12.2f} {2:>12.2f}'.format(
+            count, best * 1000, best * 1000000 / count)
+
+
+if __name__ == '__main__':
+    main()
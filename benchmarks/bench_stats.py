@@ -0,0 +1,74 @@
+"""Measures computing sprint totals and breakdowns.
+
+Compares SprintStats against the per-bug dict increments, the
+latest_change_time pass and the breakdown sorting the sprint view used
+to do.
+
+Run from the top of the repository::
+
+    $ python benchmarks/bench_stats.py
+
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from benchmarks.bugs import make_bugs  # noqa
+from ernest.pipeline import SPRINT_PIPELINE  # noqa
+from ernest.stats import SprintStats  # noqa
+
+
+def per_bug_loop(bugs):
+    total_points = closed_points = closed_bugs = bugs_with_no_points = 0
+    priority_breakdown = {}
+    points_breakdown = {}
+    component_breakdown = {}
+    for bug in bugs:
+        if bug['points'] is None or bug['points'] == '?':
+            bugs_with_no_points += 1
+        else:
+            total_points += bug['points']
+
+        if bug['status'].lower() in ('resolved', 'verified'):
+            if bug['points'] is not None and bug['points'] != '?':
+                closed_points += bug['points']
+            closed_bugs += 1
+
+        priority_breakdown[bug['priority']] = (
+            priority_breakdown.get(bug['priority'], 0) + 1)
+        points_breakdown[bug['points']] = (
+            points_breakdown.get(bug['points'], 0) + 1)
+        component_breakdown[bug['component']] = (
+            component_breakdown.get(bug['component'], 0) + 1)
+
+    if bugs:
+        max([bug.get('last_change_time', 0) for bug in bugs])
+
+    [{'priority': key, 'count': priority_breakdown[key]}
+     for key in sorted(priority_breakdown.keys(),
+                       key=lambda p: p if p != '--' else 'P6')]
+    [{'num': key, 'count': points_breakdown[key]}
+     for key in sorted(points_breakdown.keys(), key=lambda p: p or '?')]
+    [{'name': key, 'count': component_breakdown[key]}
+     for key in sorted(component_breakdown.keys())]
+
+
+def sprint_stats(bugs):
+    SprintStats(bugs).as_dict()
+
+
+def main():
+    print '{0:>8} {1:>14} {2:>14}'.format('bugs', 'loop us/bug', 'stats us/bug')
+    for count in (1000, 5000, 10000):
+        bugs = SPRINT_PIPELINE.run(make_bugs(count))
+        results = []
+        for func in (per_bug_loop, sprint_stats):
+            best = min(timeit.repeat(lambda: func(bugs), number=5, repeat=5))
+            results.append(best / 5 * 1000000 / count)
+        print '{0:>8} {1:>14.2f} {2:>14.2f}'.format(count, *results)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,87 @@
+"""Measures whiteboard parsing.
+
+Compares the old two-regex parser with the single-scan tokenizer and
+the memoized batch API on SUMO-style whiteboards.
+
+Run from the top of the repository::
+
+    $ python benchmarks/bench_whiteboard.py
+
+"""
+import os
+import random
+import re
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..'))
+
+from ernest.bugzilla import parse_whiteboards, tokenize_whiteboard  # noqa
+
+
+WHITEBOARD_KEYVALS_RE = re.compile(r'\b(?P<key>\w)=(?P<val>[^\s]*)')
+WHITEBOARD_FLAGS_RE = re.compile(r'\[(?P<flag>[^\]]+)\]')
+
+
+def two_regex_parse(whiteboard):
+    """The parser before the tokenizer was added"""
+    if not whiteboard:
+        return {}
+
+    wb_data = {'u': '', 'c': '', 's': ''}
+    for key, val in WHITEBOARD_KEYVALS_RE.findall(whiteboard):
+        if val:
+            if key == 'p':
+                try:
+                    val = int(val)
+                except ValueError:
+                    pass
+            wb_data[key] = val
+
+    wb_data['flags'] = WHITEBOARD_FLAGS_RE.findall(whiteboard)
+    return wb_data
+
+
+def make_whiteboards(count, seed=0):
+    """Returns count SUMO-style whiteboards with realistic repetition"""
+    rand = random.Random(seed)
+    users = ['user', 'dev', 'contributor', 'admin']
+    components = ['questions', 'kb', 'aaq', 'search', 'l10n', 'codequality',
+                  'forums', 'dashboards', 'karma', 'army-of-awesome']
+    flags = ['[qa+]', '[qa-]', '[fxos]', '[tracker]', '[perf]',
+             '[needs-design]', '[good first bug]', '[mentor=willkg]']
+    whiteboards = []
+    for _ in range(count):
+        parts = [
+            'u=' + rand.choice(users),
+            'c=' + rand.choice(components),
+            'p=' + rand.choice(['0', '1', '2', '3', '?', '']),
+            's=2014.' + str(rand.randint(1, 3)),
+        ]
+        # Flags usually go at the front or the back.
+        for _ in range(rand.choice([0, 0, 0, 1, 2])):
+            if rand.random() < 0.5:
+                parts.insert(0, rand.choice(flags))
+            else:
+                parts.append(rand.choice(flags))
+        whiteboards.append(' '.join(parts))
+    return whiteboards
+
+
+def main():
+    print '{0:>8} {1:>10} {2:>14} {3:>14} {4:>14}'.format(
+        'bugs', 'distinct', 'two-regex us', 'tokenize us', 'memoized us')
+    for count in (1000, 5000, 10000):
+        whiteboards = make_whiteboards(count)
+        results = []
+        for func in (lambda: map(two_regex_parse, whiteboards),
+                     lambda: map(tokenize_whiteboard, whiteboards),
+                     lambda: parse_whiteboards(whiteboards)):
+            best = min(timeit.repeat(func, number=5, repeat=5))
+            results.append(best / 5 * 1000000 / count)
+        print '{0:>8} {1:>10} {2:>14.2f} {3:>14.2f} {4:>14.2f}'.format(
+            count, len(set(whiteboards)), *results)
+
+
+if __name__ == '__main__':
+    main()
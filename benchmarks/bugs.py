@@ -0,0 +1,52 @@
+"""Generates fake Bugzilla bug data for benchmarks."""
+import random
+
+
+WHITEBOARDS = [
+    'u=user c=questions p=1 s=2014.5',
+    'u=dev c=codequality p=2 s=2014.5 [qa+]',
+    'u=contributor c=kb p=? s=2014.5',
+    '[tracker] u=dev c=search p=3 s=2014.5 [perf] [needs-design]',
+    'u=dev c=aaq s=2014.5',
+    'u=user c=l10n p=1 s=2014.5 [fxos]',
+]
+
+
+def make_bugs(count, seed=0):
+    """Returns a list of count bugs shaped like the sprint query's"""
+    rand = random.Random(seed)
+    assignees = ['dev{0}@example.com'.format(i) for i in range(15)]
+    bugs = []
+    for i in range(count):
+        if rand.random() < 0.1:
+            assigned_to = {'name': 'nobody@mozilla.org',
+                           'real_name': 'Nobody; OK to take it'}
+        else:
+            email = rand.choice(assignees)
+            assigned_to = {'name': email, 'real_name': email.split('@')[0]}
+
+        flags = []
+        if rand.random() < 0.2:
+            flags.append({'name': 'needinfo',
+                          'requestee': {'name': rand.choice(assignees)}})
+
+        groups = []
+        if rand.random() < 0.05:
+            groups.append({'name': 'websites-security'})
+
+        bugs.append({
+            'id': 900000 + i,
+            'priority': rand.choice(['P1', 'P2', 'P3', 'P4', 'P5', '--']),
+            'summary': 'Bug number {0}'.format(i),
+            'status': rand.choice(['NEW', 'ASSIGNED', 'RESOLVED',
+                                   'VERIFIED', 'REOPENED']),
+            'whiteboard': rand.choice(WHITEBOARDS),
+            'last_change_time': '2014-03-{0:02d}T12:00:00Z'.format(
+                rand.randint(1, 28)),
+            'component': 'General',
+            'depends_on': [],
+            'flags': flags,
+            'groups': groups,
+            'assigned_to': assigned_to,
+        })
+    return bugs
@@ -0,0 +1,178 @@
+import hashlib
+import os
+import re
+import threading
+
+from flask import Response, request
+
+from ernest.compression import (brotli, choose_encoding, gzip_compress,
+                                send_static)
+
+
+# Matches /static/ URLs in index.html.
+STATIC_URL_RE = re.compile(
+    r'''(?P<prefix>["'(])/static/(?P<path>[^"'()?#]+)''')
+
+# Precompressed copies made by compress_static.
+COMPRESSED_SUFFIXES = ('.gz', '.br')
+
+_assets_lock = threading.Lock()
+
+
+def fingerprint(path, data):
+    """Returns path with a hash of data before the extension
+
+    >>> fingerprint('js/app.js', 'var x;')
+    'js/app.9d00725eff1f.js'
+
+    """
+    root, ext = os.path.splitext(path)
+    return '{0}.{1}{2}'.format(root, hashlib.md5(data).hexdigest()[:12], ext)
+
+
+class CachedFile(object):
+    """A file held in memory along with compressed copies of it
+
+    :arg data: The contents
+    :arg mimetype: The mimetype to send it with
+
+    """
+    def __init__(self, data, mimetype):
+        self.mimetype = mimetype
+        self.etag = hashlib.md5(data).hexdigest()
+        self.encoded = {'gzip': gzip_compress(data, 9)}
+        if brotli is not None:
+            self.encoded['br'] = brotli.compress(data)
+        self.data = data
+
+    def response(self):
+        """Returns a Response for the file
+
+        The client has to revalidate every time, but gets a 304 if it
+        has the file already.
+
+        """
+        encoding = choose_encoding([enc for enc in ('br', 'gzip')
+                                    if enc in self.encoded])
+        if encoding is None:
+            resp = Response(self.data, mimetype=self.mimetype)
+            resp.set_etag(self.etag)
+        else:
+            resp = Response(self.encoded[encoding], mimetype=self.mimetype)
+            resp.headers['Content-Encoding'] = encoding
+            resp.set_etag('{0}-{1}'.format(self.etag, encoding))
+        resp.vary.add('Accept-Encoding')
+        resp.cache_control.no_cache = True
+        return resp.make_conditional(request)
+
+
+class StaticAssets(object):
+    """Fingerprints static files and holds the app's HTML in memory
+
+    Every file in the static folder gets a fingerprinted name with a
+    hash of its contents in it. Those names can be cached forever
+    since the name changes when the contents do.
+
+    index.html is kept in memory with its /static/ URLs changed to the
+    fingerprinted ones and the partials inlined as ng-template scripts,
+    so Angular has them in its template cache without asking for
+    them. The partials are kept in memory too for anything that does
+    ask for them.
+
+    :arg static_folder: Path to the static folder
+
+    """
+    def __init__(self, static_folder):
+        self.static_folder = static_folder
+        # path -> fingerprinted path
+        self.manifest = {}
+        # fingerprinted path -> path
+        self.originals = {}
+        # name -> CachedFile
+        self.partials = {}
+
+        for dirpath, dirnames, filenames in os.walk(static_folder):
+            for name in filenames:
+                if name.endswith(COMPRESSED_SUFFIXES):
+                    continue
+                full_path = os.path.join(dirpath, name)
+                path = os.path.relpath(full_path, static_folder).replace(
+                    os.sep, '/')
+                with open(full_path, 'rb') as fp:
+                    data = fp.read()
+
+                hashed = fingerprint(path, data)
+                self.manifest[path] = hashed
+                self.originals[hashed] = path
+
+                if path.startswith('partials/'):
+                    self.partials[path[len('partials/'):]] = CachedFile(
+                        data, 'text/html')
+
+        self.index = CachedFile(self.render_index(), 'text/html')
+
+    def url_for(self, path):
+        """Returns the fingerprinted URL of a static file"""
+        return '/static/' + self.manifest.get(path, path)
+
+    def render_index(self):
+        index_path = os.path.join(self.static_folder, 'index.html')
+        with open(index_path, 'rb') as fp:
+            html = fp.read()
+
+        html = STATIC_URL_RE.sub(
+            lambda match: match.group('prefix') + self.url_for(
+                match.group('path')),
+            html)
+
+        templates = []
+        for name in sorted(self.partials):
+            data = self.partials[name].data
+            if '</script' in data:
+                # Can't be inlined. Angular will fetch it.
+                continue
+            templates.append(
+                '<script type="text/ng-template" id="/partials/{0}">'
+                '{1}</script>\n'.format(name, data))
+        return html.replace('</body>', ''.join(templates) + '</body>', 1)
+
+    def send_fingerprinted(self, path, max_age):
+        """Sends a static file by its fingerprinted name
+
+        :arg path: Fingerprinted path relative to the static folder
+        :arg max_age: Seconds it can be cached for
+
+        :returns: Response or None if path isn't a fingerprinted name
+
+        """
+        original = self.originals.get(path)
+        if original is None:
+            return None
+        resp = send_static(os.path.join(self.static_folder, original))
+        resp.headers['Cache-Control'] = (
+            'public, max-age={0}, immutable'.format(max_age))
+        return resp
+
+
+def get_assets(app):
+    """Returns the StaticAssets for the app
+
+    If STATIC_CACHE is off, they're rebuilt every time so changes show
+    up without restarting.
+
+    :arg app: The Flask app
+
+    :returns: StaticAssets
+
+    """
+    if not app.config['STATIC_CACHE']:
+        return StaticAssets(app.static_folder)
+
+    assets = app.extensions.get('ernest_assets')
+    if assets is None:
+        with _assets_lock:
+            assets = app.extensions.get('ernest_assets')
+            if assets is None:
+                assets = StaticAssets(app.static_folder)
+                app.extensions['ernest_assets'] = assets
+    return assets
@@ -1,8 +1,20 @@
 import collections
+import cookielib
+import datetime
 import json
 import re
+import threading
+import time
 
 import requests
+from requests.adapters import HTTPAdapter
+from requests.packages.urllib3.util.retry import Retry
+
+from ernest.cache import (fetch_through, get_bug_cache, get_cache,
+                          hash_identity, make_key)
+from ernest.jsonstream import iterparse
+from ernest.utils import (format_bugzilla_time, parallel_map,
+                          parse_bugzilla_time)
 
 
 def show_me_the_logs():
@@ -28,45 +40,365 @@ def show_me_the_logs():
 # show_me_the_logs()
 
 
-WHITEBOARD_KEYVALS_RE = re.compile(
-    r'\b(?P<key>\w)=(?P<val>[^\s]*)'
+# Matches either a [flag] or a key=val so a whiteboard can be
+# tokenized in one scan.
+WHITEBOARD_TOKENS_RE = re.compile(
+    r'\[(?P<flag>[^\]]+)\]|\b(?P<key>\w)=(?P<val>[^\s]*)'
 )
-WHITEBOARD_FLAGS_RE = re.compile(r'\[(?P<flag>[^\]]+)\]')
+
+# Roughly how many parsed whiteboards to remember.
+WHITEBOARD_MEMO_SIZE = 5000
+
+# Cache key holding the current generation of cached Bugzilla data.
+# Bumping it invalidates everything cached before.
+GENERATION_KEY = 'bugzilla:generation'
+
+
+Whiteboard = collections.namedtuple(
+    'Whiteboard', ['user', 'component', 'sprint', 'points', 'flags', 'other'])
+
+# What an empty whiteboard parses to.
+EMPTY_WHITEBOARD = Whiteboard(None, None, None, None, (), ())
+
+
+def tokenize_whiteboard(whiteboard):
+    """Parses a whiteboard in a single scan
+
+    Text inside a [flag] is part of the flag and isn't also parsed
+    for key=val pairs.
+
+    :arg whiteboard: The whiteboard string
+
+    :returns: A :py:class:`Whiteboard`. 'points' is an int if it's a
+        number, the string otherwise (e.g. '?') and None if there
+        aren't any. 'other' is a tuple of (key, val) pairs for keys
+        other than u, c, s and p.
+
+    """
+    if not whiteboard:
+        return EMPTY_WHITEBOARD
+
+    keyvals = {}
+    flags = []
+    for flag, key, val in WHITEBOARD_TOKENS_RE.findall(whiteboard):
+        if flag:
+            flags.append(flag)
+        elif val:
+            keyvals[key] = val
+
+    points = keyvals.pop('p', None)
+    # FIXME: we're allowing p=? now and ? isn't an int. Checking
+    # isdigit first saves raising ValueError for every p=?.
+    if points is not None and points.isdigit():
+        try:
+            points = int(points)
+        except ValueError:
+            pass
+
+    return Whiteboard(
+        keyvals.pop('u', ''), keyvals.pop('c', ''), keyvals.pop('s', ''),
+        points, tuple(flags),
+        tuple(sorted(keyvals.items())) if keyvals else ())
+
+
+# Parsed whiteboards are memoized in two generations. Lookups check
+# the current one and then the previous one, promoting hits. When the
+# current one fills up it becomes the previous one and the old
+# previous one is dropped. That approximates an LRU, but every
+# operation is a single dict operation, so it's safe across threads
+# without a lock.
+_whiteboard_memo = [{}, {}]
+
+
+def whiteboard_data(whiteboard):
+    """Memoized :py:func:`tokenize_whiteboard`"""
+    current, previous = _whiteboard_memo
+    try:
+        return current[whiteboard]
+    except KeyError:
+        pass
+
+    data = previous.get(whiteboard)
+    if data is None:
+        data = tokenize_whiteboard(whiteboard)
+
+    if len(current) >= WHITEBOARD_MEMO_SIZE:
+        _whiteboard_memo[:] = [{}, current]
+        current = _whiteboard_memo[0]
+    current[whiteboard] = data
+    return data
+
+
+def parse_whiteboards(whiteboards):
+    """Parses a list of whiteboards
+
+    Whiteboards rarely change and many bugs in a sprint share the
+    same one, so the results are memoized.
+
+    :arg whiteboards: List of whiteboard strings
+
+    :returns: List of :py:class:`Whiteboard` in the same order. These
+        are shared between calls, so they're immutable.
+
+    """
+    return map(whiteboard_data, whiteboards)
+
+
+def parse_whiteboard(whiteboard):
+    """Parses key=val pairs and [flags] out of a whiteboard
+
+    :arg whiteboard: The whiteboard string
+
+    :returns: Dict with 'u', 'c', 's' and 'flags' keys and a 'p' key
+        if there are points, or an empty dict if the whiteboard is
+        empty
+
+    """
+    data = whiteboard_data(whiteboard)
+    if data is EMPTY_WHITEBOARD:
+        return {}
+
+    wb_data = dict(data.other)
+    wb_data.update({
+        'u': data.user,
+        'c': data.component,
+        's': data.sprint,
+        'flags': list(data.flags),
+    })
+    if data.points is not None:
+        wb_data['p'] = data.points
+    return wb_data
 
 
 class BugzillaError(Exception):
     pass
 
 
+class NoCookiesPolicy(cookielib.DefaultCookiePolicy):
+    """Cookie policy that never stores or sends cookies
+
+    The session is shared by every user of a process, so it must never
+    hold on to a Bugzilla cookie from one user's response and send it
+    along with another user's request. Auth is passed explicitly as
+    query parameters instead.
+
+    """
+    def set_ok(self, cookie, request):
+        return False
+
+    def return_ok(self, cookie, request):
+        return False
+
+
+_session_lock = threading.Lock()
+
+
+def build_session(config):
+    """Builds a requests Session with a pooled, retrying adapter
+
+    :arg config: The app config to pull the BUGZILLA_POOL_* and
+        BUGZILLA_RETRY_* settings from
+
+    :returns: A requests Session
+
+    """
+    session = requests.Session()
+    session.cookies.set_policy(NoCookiesPolicy())
+
+    adapter = HTTPAdapter(
+        pool_connections=config['BUGZILLA_POOL_CONNECTIONS'],
+        pool_maxsize=config['BUGZILLA_POOL_MAXSIZE'],
+        pool_block=config['BUGZILLA_POOL_BLOCK'],
+        max_retries=Retry(
+            total=config['BUGZILLA_RETRY_TOTAL'],
+            backoff_factor=config['BUGZILLA_RETRY_BACKOFF'],
+        )
+    )
+    session.mount('http://', adapter)
+    session.mount('https://', adapter)
+    return session
+
+
+def get_session(app):
+    """Returns the Session shared by everything in this process
+
+    The session is created lazily on first use so that gunicorn
+    workers each get their own connection pool after forking rather
+    than sharing sockets with the parent.
+
+    :arg app: The Flask app
+
+    :returns: A requests Session
+
+    """
+    session = app.extensions.get('bugzilla_session')
+    if session is None:
+        with _session_lock:
+            session = app.extensions.get('bugzilla_session')
+            if session is None:
+                session = build_session(app.config)
+                app.extensions['bugzilla_session'] = session
+    return session
+
+
+def bug_changed(old_bug, new_bug):
+    """Returns whether a bug changed between two fetches of it
+
+    This can only tell if both fetches included last_change_time.
+    Otherwise it assumes the bug didn't change.
+
+    """
+    old_time = old_bug.get('last_change_time')
+    new_time = new_bug.get('last_change_time')
+    return (old_time is not None and new_time is not None
+            and old_time != new_time)
+
+
+class BugIdentityMap(object):
+    """Keeps track of which fields are known for which bugs
+
+    Bugs are held for the life of the map and written through to the
+    cache so later requests by the same user can use them too. When
+    the same bug is added again with different fields, the fields are
+    merged unless the bug changed in between.
+
+    :arg cache: The cache to write through to
+    :arg namespace: Namespace for cache keys
+    :arg identity: The hashed auth identity the bugs were fetched as
+    :arg timeout: Seconds bugs are cached for
+
+    """
+    def __init__(self, cache, namespace, identity, timeout):
+        self.cache = cache
+        self.namespace = namespace
+        self.identity = identity
+        self.timeout = timeout
+        self._entries = {}
+        self._lock = threading.Lock()
+
+    def _key(self, id_):
+        return make_key(self.namespace, {'id': id_}, self.identity)
+
+    def get_many(self, ids):
+        """Returns a dict of bug id -> (fields, bug) for known bugs"""
+        with self._lock:
+            found = dict((id_, self._entries[id_])
+                         for id_ in ids if id_ in self._entries)
+
+        missing = [id_ for id_ in ids if id_ not in found]
+        if missing:
+            key_to_id = dict((self._key(id_), id_) for id_ in missing)
+            cached = self.cache.get_many(key_to_id.keys())
+            with self._lock:
+                for key, entry in cached.items():
+                    id_ = key_to_id[key]
+                    found[id_] = self._entries.setdefault(id_, entry)
+
+        return found
+
+    def add(self, bugs, fields):
+        """Adds bugs that were fetched with the given fields"""
+        fields = frozenset(fields)
+        by_id = dict((bug['id'], bug) for bug in bugs)
+        known = self.get_many(by_id.keys())
+
+        to_cache = {}
+        with self._lock:
+            for id_, bug in by_id.items():
+                old = known.get(id_)
+                if old and not bug_changed(old[1], bug):
+                    # Bugzilla leaves out empty fields, so drop what we
+                    # knew for the fields we just fetched before
+                    # merging.
+                    merged = dict((key, val) for key, val in old[1].items()
+                                  if key not in fields)
+                    merged.update(bug)
+                    entry = (old[0] | fields, merged)
+                else:
+                    entry = (fields, dict(bug))
+
+                self._entries[id_] = entry
+                to_cache[self._key(id_)] = entry
+
+        self.cache.set_many(to_cache, self.timeout)
+
+
+def is_closed(status):
+    return status.lower() in ('resolved', 'verified')
+
+
+def mark_is_blocked(bugs, fetch_statuses):
+    """Adds 'is_blocked' and 'open_blockers' to all bugs
+
+    Goes through the bugs and generates a set of bug ids from the
+    depends_on field. Then it figures out whether those bugs are
+    open or closed and sets the 'is_blocked' field accordingly.
+
+    It does a bunch of loops so that it can do everything it needs
+    with at most one call to fetch_statuses.
+
+    :arg bugs: The list of bugs to operate on
+    :arg fetch_statuses: Function taking a list of bug ids and
+        returning a dict of bug id -> status. Bugs it leaves out are
+        assumed to be ones the user can't see.
+
+    :returns: The bugs with the 'is_blocked' field set to True or
+        False
+
+    """
+
+    id_to_status = {}
+    blockers = set()
+
+    # Go through all the bugs and initialize the 'is_blocked' field
+    # to False, build up the id_to_status map and add any bugs
+    # that the bug depends on to the blockers set.
+    for bug in bugs:
+        bug['is_blocked'] = False
+        bug['open_blockers'] = []
+        id_to_status[bug['id']] = bug['status']
+        blockers.update(bug.get('depends_on', []))
+
+    blockers = [bug for bug in blockers
+                if not is_closed(id_to_status.get(bug, ''))]
+
+    if not blockers:
+        # No blockers, so nothing to do!
+        return bugs
+
+    id_to_status.update(fetch_statuses(blockers))
+
+    # Go through all the original bugs and set the 'is_blocked' field
+    # if any of the bugs it depends on is not closed.
+    for bug in bugs:
+        for blocker in bug.get('depends_on', []):
+            try:
+                if not is_closed(id_to_status[blocker]):
+                    bug['is_blocked'] = True
+                    bug['open_blockers'].append(blocker)
+            except KeyError:
+                # FIXME: This most likely means that the user
+                # viewing the bug list doesn't have access to this
+                # blocker and therefore cannot see it. I don't
+                # know what the right thing to do here is. So I'm
+                # going to ignore it for now.
+                pass
+
+    return bugs
+
+
 class BugzillaTracker(object):
     def __init__(self, app):
         self.app = app
         self.bzurl = app.config['BUGZILLA_API_URL']
+        self.session = get_session(app)
+        self.cache = get_cache(app)
+        self.bug_cache = get_bug_cache(app)
+        self._identity_maps = {}
+        self._identity_maps_lock = threading.Lock()
 
     def parse_whiteboard(self, whiteboard):
-        if not whiteboard:
-            return {}
-
-        wb_data = {
-            'u': '',
-            'c': '',
-            's': ''
-        }
-
-        keyvals = WHITEBOARD_KEYVALS_RE.findall(whiteboard)
-        for key, val in keyvals:
-            if val:
-                if key == 'p':
-                    try:
-                        val = int(val)
-                    except ValueError:
-                        # FIXME: we're allowing p=? now and ? isn't an int
-                        pass
-                wb_data[key] = val
-
-        wb_data['flags'] = WHITEBOARD_FLAGS_RE.findall(whiteboard)
-
-        return wb_data
+        return parse_whiteboard(whiteboard)
 
     def augment_with_auth(self, request_arguments, userid, cookie):
         if userid and cookie:
@@ -77,7 +409,7 @@ class BugzillaTracker(object):
         path = str(path)
         request_arguments = dict(request.args)
         self.augment_with_auth(request_arguments, userid, cookie)
-        r = requests.request(
+        r = self.session.request(
             request.method,
             self.bzurl + '/{0}'.format(path),
             params=request_arguments,
@@ -86,18 +418,137 @@ class BugzillaTracker(object):
         )
         return r.text
 
+    def cache_generation(self):
+        """Returns the current generation of cached Bugzilla data"""
+        generation = self.cache.get(GENERATION_KEY)
+        if generation is None:
+            # Either nothing has been cached yet or the generation
+            # was evicted. Either way, start a new one so nothing
+            # cached under an older generation is used.
+            generation = self.invalidate_cache()
+        return generation
+
+    def invalidate_cache(self):
+        """Invalidates all cached Bugzilla data
+
+        :returns: The new generation
+
+        """
+        generation = repr(time.time())
+        self.cache.set(GENERATION_KEY, generation, timeout=0)
+        return generation
+
     def is_closed(self, status):
-        return status.lower() in ('resolved', 'verified')
+        return is_closed(status)
+
+    def identity_map(self, userid=None, cookie=None):
+        """Returns the bug identity map for a Bugzilla login
+
+        There's one map per login for the life of this tracker, which
+        is usually a single request.
+
+        """
+        identity = hash_identity(userid, cookie)
+        with self._identity_maps_lock:
+            bug_map = self._identity_maps.get(identity)
+            if bug_map is None:
+                bug_map = BugIdentityMap(
+                    self.bug_cache,
+                    'bugzilla:{0}:bugs'.format(self.cache_generation()),
+                    identity,
+                    self.app.config['BUGZILLA_BUG_CACHE_TIMEOUT'])
+                self._identity_maps[identity] = bug_map
+        return bug_map
+
+    def fetch_bugs_by_id(self, ids, fields, userid=None, cookie=None,
+                         refresh=False, use_cache=True):
+        """Fetches bugs by id, only asking Bugzilla for what's not known
+
+        Bugs are looked up in the identity map for the login first.
+        Then the bugs that are missing or are missing some of the
+        fields are fetched with at most one Bugzilla API request for
+        just the missing fields. That request is split if there are
+        many ids.
+
+        :arg ids: List of bug ids
+        :arg fields: Fields to fetch
+        :arg userid: (Optional) Bugzilla username
+        :arg cookie: (Optional) Bugzilla cookie for userid
+        :arg refresh: (Optional) If True, fetches all the bugs from
+            Bugzilla
+        :arg use_cache: (Optional) If False, fetches all the bugs from
+            Bugzilla without reading or writing the identity map or the
+            response cache
+
+        :returns: List of bugs in the same order as ids with only the
+            requested fields. Bugs the user can't see are left out.
+
+        """
+        ids = list(collections.OrderedDict.fromkeys(ids))
+        fields = frozenset(fields) | frozenset(['id'])
+        if not use_cache:
+            bugs = self._fetch_bugs(
+                ids=ids, userid=userid, cookie=cookie, fields=sorted(fields),
+                use_cache=False)['bugs']
+            by_id = dict((bug['id'], bug) for bug in bugs)
+            return [by_id[id_] for id_ in ids if id_ in by_id]
+
+        bug_map = self.identity_map(userid, cookie)
+
+        known = {} if refresh else bug_map.get_many(ids)
+        stale = [id_ for id_ in ids
+                 if id_ not in known or not fields <= known[id_][0]]
+
+        if stale:
+            if all(id_ in known for id_ in stale):
+                missing_fields = frozenset(['id'])
+                for id_ in stale:
+                    missing_fields |= fields - known[id_][0]
+            else:
+                missing_fields = fields
+
+            bug_data = self._fetch_bugs(
+                ids=stale,
+                userid=userid,
+                cookie=cookie,
+                fields=sorted(missing_fields),
+                refresh=refresh)
+            bug_map.add(bug_data['bugs'], missing_fields)
+            known = bug_map.get_many(ids)
+
+            # Bugs Bugzilla left out can't be seen anymore, whatever
+            # the identity map remembers about them.
+            returned = set(bug['id'] for bug in bug_data['bugs'])
+            for id_ in stale:
+                if id_ not in returned:
+                    known.pop(id_, None)
+
+        return [
+            dict((key, val) for key, val in known[id_][1].items()
+                 if key in fields)
+            for id_ in ids if id_ in known
+        ]
+
+    def fetch_statuses(self, ids, userid=None, cookie=None):
+        """Returns the status of each of the given bugs
+
+        :arg ids: List of bug ids
+        :arg userid: (Optional) Bugzilla username
+        :arg cookie: (Optional) Bugzilla cookie for userid
+
+        :returns: Dict of bug id -> status. Bugs the user can't see
+            are left out.
+
+        """
+        bugs = self.fetch_bugs_by_id(ids, ('id', 'status'), userid, cookie)
+        return dict((bug['id'], bug['status']) for bug in bugs)
 
     def mark_is_blocked(self, bugs, userid=None, cookie=None):
         """Adds 'is_blocked' to all bugs
 
-        Goes through the bugs and generates a set of bug ids from the
-        depends_on field. Then it figures out whether those bugs are
-        open or closed and sets the 'is_blocked' field accordingly.
-
-        It does a bunch of loops so that it can do everything it needs
-        with at most one additional Bugzilla API request.
+        Blocker statuses come from the identity map, so often this
+        doesn't need to ask Bugzilla anything. See
+        :py:func:`mark_is_blocked`.
 
         :arg bugs: The list of bugs to operate on
         :arg userid: (Optional) Bugzilla username
@@ -107,61 +558,37 @@ class BugzillaTracker(object):
             False
 
         """
-
-        id_to_status = {}
-        blockers = set()
-
-        # Go through all the bugs and initialize the 'is_blocked' field
-        # to False, build up the id_to_status map and add any bugs
-        # that the bug depends on to the blockers set.
-        for bug in bugs:
-            bug['is_blocked'] = False
-            bug['open_blockers'] = []
-            id_to_status[bug['id']] = bug['status']
-            blockers.update(bug.get('depends_on', []))
-
-        blockers = [bug for bug in blockers
-                    if not self.is_closed(id_to_status.get(bug, ''))]
-
-        if not blockers:
-            # No blockers, so nothing to do!
-            return bugs
-
-        blocker_bugs = self._fetch_bugs(
-            ids=list(blockers),
-            userid=userid,
-            cookie=cookie,
-            fields=('id', 'status'))
-
-        for bug in blocker_bugs['bugs']:
-            id_to_status[bug['id']] = bug['status']
-
-        # Go through all the original bugs and set the 'is_blocked' field
-        # if any of the bugs it depends on is not closed.
-        for bug in bugs:
-            for blocker in bug.get('depends_on', []):
-                try:
-                    if not self.is_closed(id_to_status[blocker]):
-                        bug['is_blocked'] = True
-                        bug['open_blockers'].append(blocker)
-                except KeyError:
-                    # FIXME: This most likely means that the user
-                    # viewing the bug list doesn't have access to this
-                    # blocker and therefore cannot see it. I don't
-                    # know what the right thing to do here is. So I'm
-                    # going to ignore it for now.
-                    pass
-
-        return bugs
+        return mark_is_blocked(
+            bugs, lambda ids: self.fetch_statuses(ids, userid, cookie))
 
     def fetch_bugs(self, fields, components=None, sprint=None,
                    userid=None, cookie=None, changed_after=None,
-                   summary=None, status=None, bucket_requests=3):
+                   summary=None, status=None, bucket_requests=3,
+                   refresh=False, concurrency=None, use_cache=True):
+        """Fetches bugs for a list of components
 
-        combined = collections.defaultdict(list)
-        for i in range(0, len(components), bucket_requests):
-            some_components = components[i:i + bucket_requests]
-            bug_data = self._fetch_bugs(
+        Components are split into buckets of ``bucket_requests`` and
+        each bucket is fetched with a separate Bugzilla API request.
+        Up to ``concurrency`` of those requests run at the same time.
+        Results are combined in bucket order.
+
+        :arg concurrency: (Optional) Maximum number of concurrent
+            requests. Defaults to BUGZILLA_MAX_CONCURRENCY.
+        :arg use_cache: (Optional) If False, responses are neither
+            read from nor written to the cache. See
+            :py:meth:`_fetch_bugs`.
+
+        :returns: Dict of lists of combined results
+
+        :raises BugzillaError: If any request fails. Buckets that
+            haven't been started yet are skipped.
+
+        """
+        if concurrency is None:
+            concurrency = self.app.config['BUGZILLA_MAX_CONCURRENCY']
+
+        def fetch_bucket(some_components):
+            return self._fetch_bugs(
                 components=some_components,
                 sprint=sprint,
                 fields=fields,
@@ -170,7 +597,15 @@ class BugzillaTracker(object):
                 changed_after=changed_after,
                 summary=summary,
                 status=status,
+                refresh=refresh,
+                use_cache=use_cache,
             )
+
+        buckets = [components[i:i + bucket_requests]
+                   for i in range(0, len(components), bucket_requests)]
+
+        combined = collections.defaultdict(list)
+        for bug_data in parallel_map(fetch_bucket, buckets, concurrency):
             for key in bug_data:
                 if key == 'bugs' and changed_after:
                     # For some ungodly reason, even if you pass
@@ -194,15 +629,181 @@ class BugzillaTracker(object):
 
         return combined
 
+    def fetch_sprint_bugs(self, fields, components, sprint, userid=None,
+                          cookie=None, prefetch_blockers=False, max_age=0):
+        """Returns all the bugs in a sprint using an incremental snapshot
+
+        The first call for a sprint fetches all its bugs and stores a
+        snapshot of them in the cache along with a watermark of the
+        latest ``last_change_time``. Later calls only ask Bugzilla for
+        bugs changed after the watermark and merge them into the
+        snapshot.
+
+        Since ``changed_after`` misses some changes (whiteboard edits
+        don't always bump ``last_change_time`` and bugs moved out of
+        the sprint don't show up in the delta at all), the snapshot
+        expires and is rebuilt from scratch every
+        SPRINT_SNAPSHOT_RESYNC seconds.
+
+        Snapshots are per Bugzilla login just like cached responses.
+
+        If ``prefetch_blockers`` is True, the statuses of the bugs that
+        the snapshot's bugs depend on are fetched at the same time as
+        the sprint's bugs. That warms the identity map, so a
+        :py:meth:`mark_is_blocked` call afterwards only has to fetch
+        statuses for dependencies that are new.
+
+        The bugs fetched are added to the identity map too.
+
+        If the snapshot was brought up to date less than ``max_age``
+        seconds ago, e.g. by ``manage.py refresh_sprints``, it's
+        returned as is without asking Bugzilla anything.
+
+        :arg fields: Fields to fetch. 'id' and 'last_change_time' are
+            always fetched.
+        :arg components: List of product/component dicts
+        :arg sprint: The sprint name
+        :arg userid: (Optional) Bugzilla username
+        :arg cookie: (Optional) Bugzilla cookie for userid
+        :arg prefetch_blockers: (Optional) Whether to prefetch blocker
+            statuses. Requires 'depends_on' in fields.
+        :arg max_age: (Optional) Seconds since it was last brought up
+            to date that the snapshot can be used without fetching
+            changes.
+
+        :returns: List of bugs
+
+        """
+        fields = tuple(fields)
+        for field in ('id', 'last_change_time'):
+            if field not in fields:
+                fields = fields + (field,)
+
+        resync = self.app.config['SPRINT_SNAPSHOT_RESYNC']
+        snapshot_key = make_key(
+            'bugzilla:{0}:sprint'.format(self.cache_generation()),
+            {'fields': fields, 'components': components, 'sprint': sprint},
+            hash_identity(userid, cookie))
+
+        now = time.time()
+        snapshot = self.cache.get(snapshot_key)
+        previous_bugs = snapshot['bugs'] if snapshot else {}
+        if snapshot is None or now - snapshot['full_sync_at'] >= resync:
+            snapshot = {
+                'bugs': {},
+                'watermark': None,
+                'full_sync_at': now,
+                'synced_at': now,
+            }
+        elif now - snapshot.get('synced_at', 0) < max_age:
+            return previous_bugs.values()
+
+        changed_after = snapshot['watermark']
+        watermark = parse_bugzilla_time(changed_after)
+        if watermark is not None:
+            # Bugs changed in the same second as the latest one we
+            # have aren't after the watermark, so go back a second to
+            # pick them up. Merging the ones we have again is harmless.
+            changed_after = format_bugzilla_time(
+                watermark - datetime.timedelta(seconds=1))
+
+        def fetch_changes():
+            return self.fetch_bugs(
+                fields=fields,
+                components=components,
+                sprint=sprint,
+                userid=userid,
+                cookie=cookie,
+                changed_after=changed_after,
+            )
+
+        tasks = [fetch_changes]
+        if prefetch_blockers:
+            # Guess at the blockers using the bugs we already know
+            # about--they rarely change between fetches.
+            blockers = set()
+            for bug in previous_bugs.values():
+                blockers.update(bug.get('depends_on', []))
+            blockers = [id_ for id_ in blockers if id_ not in previous_bugs]
+            if blockers:
+                tasks.append(
+                    lambda: self.fetch_statuses(blockers, userid, cookie))
+
+        bug_data = parallel_map(lambda task: task(), tasks, len(tasks))[0]
+
+        self.identity_map(userid, cookie).add(bug_data['bugs'], fields)
+
+        bugs = snapshot['bugs']
+        for bug in bug_data['bugs']:
+            bugs[bug['id']] = bug
+            if (snapshot['watermark'] is None
+                    or bug['last_change_time'] > snapshot['watermark']):
+                snapshot['watermark'] = bug['last_change_time']
+
+        snapshot['synced_at'] = now
+
+        # Keep the snapshot around past when it's due for a full
+        # resync so its bugs can be used to prefetch blockers.
+        self.cache.set(snapshot_key, snapshot, resync * 2)
+
+        return bugs.values()
+
     def fetch_bug(self, id_, userid=None, cookie=None, refresh=False,
                   fields=None):
-        # @refresh is currently not implemented
-        return self._fetch_bugs(ids=[id_], userid=userid, cookie=cookie,
-                                fields=fields)
+        try:
+            id_ = int(id_)
+        except ValueError:
+            # It's an alias, so it can't be looked up in the identity
+            # map.
+            is_alias = True
+        else:
+            is_alias = False
+
+        if fields is None or is_alias:
+            return self._fetch_bugs(ids=[id_], userid=userid, cookie=cookie,
+                                    fields=fields, refresh=refresh)
+
+        return {
+            'bugs': self.fetch_bugs_by_id(
+                [id_], fields, userid=userid, cookie=cookie, refresh=refresh)
+        }
 
     def _fetch_bugs(self, ids=None, components=None, sprint=None, fields=None,
                     userid=None, cookie=None, changed_after=None, summary=None,
-                    status=None):
+                    status=None, refresh=False, use_cache=True):
+        """Fetches bugs from the Bugzilla API
+
+        Responses are cached for BUGZILLA_CACHE_TIMEOUT seconds keyed on
+        the query and the auth identity. After that they're served
+        stale for BUGZILLA_CACHE_STALE seconds while one caller
+        refreshes them, and for BUGZILLA_CACHE_MAX_STALE seconds if
+        Bugzilla is failing. Identical queries in flight at the same
+        time are only sent to Bugzilla once. See
+        :py:func:`ernest.cache.fetch_through`.
+
+        If there are more than BUGZILLA_MAX_IDS_PER_REQUEST ids, they're
+        split across several concurrent requests and the results are
+        merged. That keeps urls for bugs with hundreds of dependencies
+        under server limits.
+
+        :arg refresh: If True, skips the cache lookup and fetches from
+            Bugzilla. The result is still cached.
+        :arg use_cache: If False, fetches from Bugzilla and doesn't
+            cache the result. For callers like the bug mirror that
+            fetch whole products and never read the responses again.
+
+        """
+        if ids:
+            # Drop duplicate ids, but keep the order.
+            ids = list(collections.OrderedDict.fromkeys(ids))
+            max_ids = self.app.config['BUGZILLA_MAX_IDS_PER_REQUEST']
+            if len(ids) > max_ids:
+                return self._fetch_bugs_in_chunks(
+                    ids, max_ids, components=components, sprint=sprint,
+                    fields=fields, userid=userid, cookie=cookie,
+                    changed_after=changed_after, summary=summary,
+                    status=status, refresh=refresh, use_cache=use_cache)
+
         params = {}
 
         if fields:
@@ -227,8 +828,6 @@ class BugzillaTracker(object):
         if status:
             params['status'] = status
 
-        self.augment_with_auth(params, userid, cookie)
-
         if changed_after:
             params['changed_after'] = changed_after
 
@@ -237,16 +836,85 @@ class BugzillaTracker(object):
         if ids:
             params['id'] = ','.join(map(str, ids))
 
-        r = requests.request(
-            'GET',
-            url,
-            params=params,
-            timeout=60.0
-        )
-        if r.status_code != 200:
-            raise BugzillaError(r.text)
+        cache_key = make_key(
+            'bugzilla:{0}:response'.format(self.cache_generation()),
+            params,
+            hash_identity(userid, cookie))
 
-        return json.loads(r.text)
+        def fetch():
+            self.augment_with_auth(params, userid, cookie)
+
+            r = self.session.request(
+                'GET',
+                url,
+                params=params,
+                timeout=60.0,
+                stream=True
+            )
+            if r.status_code != 200:
+                raise BugzillaError(r.text)
+
+            return self._read_bugs(r)
+
+        if not use_cache:
+            return fetch()
+
+        config = self.app.config
+        return fetch_through(
+            self.cache, cache_key, fetch,
+            timeout=config['BUGZILLA_CACHE_TIMEOUT'],
+            stale=config['BUGZILLA_CACHE_STALE'],
+            max_stale=config['BUGZILLA_CACHE_MAX_STALE'],
+            refresh=refresh)
+
+    def _read_bugs(self, response):
+        """Decodes a streamed bug list response
+
+        The bugs are decoded one at a time as the body is read, so the
+        body is never held in memory as a whole, neither as bytes nor
+        as text.
+
+        :arg response: requests Response made with ``stream=True``
+
+        :returns: The response as a dict
+
+        :raises ValueError: if the response isn't valid JSON
+
+        """
+        chunks = response.iter_content(
+            self.app.config['BUGZILLA_STREAM_CHUNK_SIZE'])
+
+        bug_data = {'bugs': []}
+        bugs = bug_data['bugs']
+        for key, value in iterparse(chunks, 'bugs'):
+            if key == 'bugs':
+                bugs.append(value)
+            else:
+                bug_data[key] = value
+        return bug_data
+
+    def _fetch_bugs_in_chunks(self, ids, chunk_size, **kwargs):
+        """Fetches bugs by id using one request per chunk of ids
+
+        :arg ids: List of unique bug ids
+        :arg chunk_size: Maximum number of ids per request
+        :arg kwargs: Other arguments for :py:meth:`_fetch_bugs`
+
+        :returns: Dict of lists of combined results
+
+        """
+        chunks = [ids[i:i + chunk_size]
+                  for i in range(0, len(ids), chunk_size)]
+        results = parallel_map(
+            lambda chunk: self._fetch_bugs(ids=chunk, **kwargs),
+            chunks,
+            self.app.config['BUGZILLA_MAX_CONCURRENCY'])
+
+        combined = collections.defaultdict(list)
+        for bug_data in results:
+            for key in bug_data:
+                combined[key].extend(bug_data[key])
+        return combined
 
     def fetch_comments(self, bugid, userid=None, cookie=None):
         params = {}
@@ -254,7 +922,7 @@ class BugzillaTracker(object):
 
         url = '{0}/bug/{1}/comment'.format(self.bzurl, bugid)
 
-        r = requests.request(
+        r = self.session.request(
             'GET',
             url,
             params=params,
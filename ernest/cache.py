@@ -0,0 +1,508 @@
+import copy
+import cPickle as pickle
+import hashlib
+import json
+import logging
+import sys
+import threading
+import time
+from collections import OrderedDict
+
+
+log = logging.getLogger(__name__)
+
+
+def hash_identity(userid, cookie):
+    """Returns an opaque hash of a Bugzilla auth identity
+
+    Cache keys include this so that data one user is allowed to see
+    (e.g. confidential bugs) is never served to another user. The raw
+    cookie never ends up in a key.
+
+    """
+    if not (userid and cookie):
+        return 'anonymous'
+    return hashlib.sha1(
+        u'{0}:{1}'.format(userid, cookie).encode('utf-8')).hexdigest()
+
+
+def make_key(namespace, params, identity):
+    """Builds a cache key from a namespace, query params and identity
+
+    Params are normalized so that the same query built in a different
+    order maps to the same key.
+
+    :arg namespace: A string prefix for the kind of thing being cached
+    :arg params: Dict of query params
+    :arg identity: The result of :py:func:`hash_identity`
+
+    :returns: A string key that's safe to use with memcached
+
+    """
+    normalized = []
+    for key, val in sorted(params.items()):
+        if isinstance(val, (list, tuple, set)):
+            val = sorted(val)
+        normalized.append([key, val])
+
+    digest = hashlib.sha1(
+        json.dumps([identity, normalized], sort_keys=True)).hexdigest()
+    return '{0}:{1}'.format(namespace, digest)
+
+
+class NullCache(object):
+    """Cache that doesn't cache anything"""
+    def __init__(self, default_timeout=300):
+        self.default_timeout = default_timeout
+
+    def get(self, key):
+        return None
+
+    def get_many(self, keys):
+        return {}
+
+    def set(self, key, value, timeout=None):
+        pass
+
+    def set_many(self, mapping, timeout=None):
+        pass
+
+    def add(self, key, value, timeout=None):
+        return True
+
+    def delete(self, key):
+        pass
+
+    def clear(self):
+        pass
+
+
+class LRUCache(object):
+    """In-process least-recently-used cache with expiration
+
+    Values are pickled on the way in and unpickled on the way out so
+    callers can mutate what they get back without changing what's in
+    the cache. That matches how the memcached backend behaves.
+
+    Items set with a timeout of 0 never expire and are never evicted
+    to make room for others. Those are version stamps like the
+    Bugzilla cache generation, which everything else is keyed on, so
+    losing one throws away the whole cache. Don't set many of them.
+
+    :arg maxsize: Maximum number of items to hold, not counting ones
+        that never expire
+    :arg default_timeout: Seconds an item lives unless ``set`` is
+        given a timeout
+
+    """
+    def __init__(self, maxsize=500, default_timeout=300):
+        self.maxsize = maxsize
+        self.default_timeout = default_timeout
+        self._data = OrderedDict()
+        # key -> pickled value for items that never expire
+        self._pinned = {}
+        self._lock = threading.RLock()
+
+    def get(self, key):
+        with self._lock:
+            if key in self._pinned:
+                return pickle.loads(self._pinned[key])
+            try:
+                expires, value = self._data.pop(key)
+            except KeyError:
+                return None
+
+            if expires and expires < time.time():
+                return None
+
+            # Re-insert so it's the most recently used.
+            self._data[key] = (expires, value)
+
+        return pickle.loads(value)
+
+    def get_many(self, keys):
+        """Returns a dict of key -> value for the keys that are cached"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        expires = time.time() + timeout if timeout else 0
+        value = pickle.dumps(value, pickle.HIGHEST_PROTOCOL)
+
+        with self._lock:
+            self._data.pop(key, None)
+            self._pinned.pop(key, None)
+            if not expires:
+                self._pinned[key] = value
+                return
+            self._data[key] = (expires, value)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def set_many(self, mapping, timeout=None):
+        for key, value in mapping.items():
+            self.set(key, value, timeout)
+
+    def add(self, key, value, timeout=None):
+        """Sets key only if it's not already set
+
+        :returns: Whether it was set
+
+        """
+        with self._lock:
+            if key in self._pinned:
+                return False
+            item = self._data.get(key)
+            if item is not None and not (item[0] and item[0] < time.time()):
+                return False
+            self.set(key, value, timeout)
+        return True
+
+    def delete(self, key):
+        with self._lock:
+            self._data.pop(key, None)
+            self._pinned.pop(key, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+            self._pinned.clear()
+
+
+class MemcachedCache(object):
+    """Memcached cache using pylibmc
+
+    Supports SASL auth so it works with MemCachier on Heroku. Errors
+    talking to memcached are logged and treated as misses so that a
+    memcached outage doesn't take the site down with it.
+
+    :arg servers: List of ``host:port`` strings
+    :arg username: (Optional) SASL username
+    :arg password: (Optional) SASL password
+    :arg default_timeout: Seconds an item lives unless ``set`` is
+        given a timeout
+    :arg key_prefix: String prepended to every key
+    :arg pool_size: Number of memcached connections to share between
+        the threads or greenlets in this process
+
+    """
+    def __init__(self, servers, username=None, password=None,
+                 default_timeout=300, key_prefix='ernest:', pool_size=10):
+        import pylibmc
+
+        self.default_timeout = default_timeout
+        self.key_prefix = key_prefix
+        self._errors = pylibmc.Error
+
+        kwargs = {'binary': True}
+        if username and password:
+            kwargs['username'] = username
+            kwargs['password'] = password
+
+        client = pylibmc.Client(servers, **kwargs)
+        client.behaviors = {'tcp_nodelay': True, 'ketama': True}
+        # pylibmc clients aren't thread-safe. Rather than a clone per
+        # thread--which under gevent is a connection per greenlet--
+        # callers borrow one of a fixed number of clones and wait for
+        # one to come back when they're all in use.
+        self._pool = pylibmc.ClientPool()
+        self._pool.fill(client, pool_size)
+
+    def reserve(self):
+        """Returns a context manager that lends out a pooled client"""
+        return self._pool.reserve(block=True)
+
+    def get(self, key):
+        try:
+            with self.reserve() as client:
+                return client.get(self.key_prefix + key)
+        except self._errors:
+            log.exception('memcached get failed')
+            return None
+
+    def get_many(self, keys):
+        try:
+            with self.reserve() as client:
+                return client.get_multi(keys, key_prefix=self.key_prefix)
+        except self._errors:
+            log.exception('memcached get_multi failed')
+            return {}
+
+    def set(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        try:
+            with self.reserve() as client:
+                client.set(self.key_prefix + key, value, time=timeout)
+        except self._errors:
+            log.exception('memcached set failed')
+
+    def set_many(self, mapping, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        try:
+            with self.reserve() as client:
+                client.set_multi(
+                    mapping, time=timeout, key_prefix=self.key_prefix)
+        except self._errors:
+            log.exception('memcached set_multi failed')
+
+    def add(self, key, value, timeout=None):
+        if timeout is None:
+            timeout = self.default_timeout
+        try:
+            with self.reserve() as client:
+                return client.add(
+                    self.key_prefix + key, value, time=timeout)
+        except self._errors:
+            log.exception('memcached add failed')
+            # Better for everyone to go ahead than for no one to.
+            return True
+
+    def delete(self, key):
+        try:
+            with self.reserve() as client:
+                client.delete(self.key_prefix + key)
+        except self._errors:
+            log.exception('memcached delete failed')
+
+    def clear(self):
+        try:
+            with self.reserve() as client:
+                client.flush_all()
+        except self._errors:
+            log.exception('memcached flush failed')
+
+
+class SingleFlight(object):
+    """Coalesces concurrent calls for the same key within a process
+
+    The first caller for a key makes the call. Callers that come along
+    while it's in flight wait for it and get the same result or
+    exception.
+
+    """
+    def __init__(self):
+        self._lock = threading.Lock()
+        # key -> [threading.Event, result, exc_info]
+        self._calls = {}
+
+    def in_flight(self, key):
+        return key in self._calls
+
+    def do(self, key, func):
+        """Calls func or waits for the call for key in flight
+
+        :returns: (what func returned, whether it was shared with the
+            caller that made the call)
+
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            leader = call is None
+            if leader:
+                call = self._calls[key] = [threading.Event(), None, None]
+
+        if not leader:
+            call[0].wait()
+            if call[2] is not None:
+                raise call[2][0], call[2][1], call[2][2]
+            return call[1], True
+
+        try:
+            call[1] = func()
+        except Exception:
+            call[2] = sys.exc_info()
+            raise
+        finally:
+            with self._lock:
+                del self._calls[key]
+            call[0].set()
+        return call[1], False
+
+
+_singleflight = SingleFlight()
+
+
+def fetch_through(cache, key, fetch, timeout, stale=0, max_stale=0,
+                  lock_timeout=60, refresh=False):
+    """Returns a cached value, calling fetch to get it if need be
+
+    Values are fresh for ``timeout`` seconds. Once they're stale:
+
+    * for ``stale`` seconds, the stale value is returned while one
+      caller refreshes it
+    * for ``max_stale`` seconds, the stale value is returned if
+      refreshing it fails
+
+    Concurrent fetches of the same key are coalesced into one. Within
+    a process, callers wait for the one in flight. Across processes,
+    the one that gets a lock in the cache fetches and the others wait
+    for the value to show up in the cache for up to ``lock_timeout``
+    seconds.
+
+    :arg cache: The cache
+    :arg key: The cache key
+    :arg fetch: Function taking no arguments that returns the value
+    :arg timeout: Seconds the value is fresh for
+    :arg stale: Seconds after that it's served while being refreshed
+    :arg max_stale: Seconds after that it's served if refreshing fails
+    :arg lock_timeout: Seconds the cross-process lock is held for at
+        most
+    :arg refresh: Whether to fetch regardless of what's cached
+
+    :returns: The value
+
+    """
+    lock_key = key + ':lock'
+    entry = None if refresh else cache.get(key)
+    now = time.time()
+
+    serve_stale = False
+    if entry is not None:
+        fresh_until, value = entry
+        if now < fresh_until:
+            return value
+        serve_stale = now < fresh_until + stale
+        if serve_stale and _singleflight.in_flight(key):
+            # Someone in this process is refreshing it.
+            return value
+
+    def fetch_and_store():
+        # Only the caller that fetches takes the lock, so it's always
+        # the one that releases it.
+        locked = cache.add(lock_key, True, lock_timeout)
+        if not locked and serve_stale:
+            # Another process is refreshing it.
+            return entry[1]
+        if not locked:
+            # Another process is fetching it. Wait for that.
+            deadline = time.time() + lock_timeout
+            while time.time() < deadline:
+                time.sleep(0.05)
+                waited_for = cache.get(key)
+                if waited_for is not None and waited_for[0] > now:
+                    return waited_for[1]
+                if cache.get(lock_key) is None:
+                    break
+
+        try:
+            value = fetch()
+            cache.set(key, (time.time() + timeout, value),
+                      timeout + max(stale, max_stale))
+            return value
+        finally:
+            if locked:
+                cache.delete(lock_key)
+
+    try:
+        value, shared = _singleflight.do(key, fetch_and_store)
+    except Exception:
+        if entry is not None and now < entry[0] + max(stale, max_stale):
+            log.exception('Fetching %s failed, using stale value', key)
+            return entry[1]
+        raise
+
+    # Everyone else gets a value of their own to change like they
+    # would from the cache.
+    return copy.deepcopy(value) if shared else value
+
+
+_cache_lock = threading.Lock()
+
+
+def build_cache(config):
+    """Builds a cache from the CACHE_* settings
+
+    :arg config: The app config
+
+    :returns: A cache object
+
+    :raises ValueError: if CACHE_TYPE isn't a known cache type
+
+    """
+    cache_type = config['CACHE_TYPE']
+    timeout = config['CACHE_DEFAULT_TIMEOUT']
+
+    if cache_type == 'null':
+        return NullCache(default_timeout=timeout)
+
+    if cache_type == 'lru':
+        return LRUCache(
+            maxsize=config['CACHE_LRU_MAXSIZE'],
+            default_timeout=timeout)
+
+    if cache_type == 'memcached':
+        try:
+            return MemcachedCache(
+                servers=[server
+                         for server in config['CACHE_MEMCACHED_SERVERS']
+                         if server],
+                username=config.get('CACHE_MEMCACHED_USERNAME'),
+                password=config.get('CACHE_MEMCACHED_PASSWORD'),
+                default_timeout=timeout,
+                key_prefix=config['CACHE_KEY_PREFIX'],
+                pool_size=config['CACHE_MEMCACHED_POOL_SIZE'])
+        except ImportError:
+            # Better a cache per process than every request failing.
+            log.warning('pylibmc is not installed, so using an in-process '
+                        'cache rather than memcached')
+            return LRUCache(
+                maxsize=config['CACHE_LRU_MAXSIZE'],
+                default_timeout=timeout)
+
+    raise ValueError('Unknown CACHE_TYPE "{0}"'.format(cache_type))
+
+
+def get_cache(app):
+    """Returns the cache shared by everything in this process
+
+    :arg app: The Flask app
+
+    :returns: A cache object
+
+    """
+    cache = app.extensions.get('ernest_cache')
+    if cache is None:
+        with _cache_lock:
+            cache = app.extensions.get('ernest_cache')
+            if cache is None:
+                cache = build_cache(app.config)
+                app.extensions['ernest_cache'] = cache
+    return cache
+
+
+def get_bug_cache(app):
+    """Returns the cache bug identity maps write through to
+
+    Identity maps cache an entry per bug. An LRUCache counts entries
+    rather than bytes, so sharing it would let a single big sprint
+    evict every cached response and snapshot. When the cache is an
+    LRUCache, bugs get one of their own holding at most
+    CACHE_LRU_BUG_MAXSIZE of them. Otherwise it's the shared cache.
+
+    :arg app: The Flask app
+
+    :returns: A cache object
+
+    """
+    cache = get_cache(app)
+    if not isinstance(cache, LRUCache):
+        return cache
+
+    bug_cache = app.extensions.get('ernest_bug_cache')
+    if bug_cache is None:
+        with _cache_lock:
+            bug_cache = app.extensions.get('ernest_bug_cache')
+            if bug_cache is None:
+                bug_cache = LRUCache(
+                    maxsize=app.config['CACHE_LRU_BUG_MAXSIZE'],
+                    default_timeout=cache.default_timeout)
+                app.extensions['ernest_bug_cache'] = bug_cache
+    return bug_cache
@@ -0,0 +1,182 @@
+import gzip
+import mimetypes
+import os
+import zlib
+
+from flask import request, send_file
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+
+# Content-Encoding -> file suffix in the order we prefer them.
+ENCODINGS = (('br', '.br'), ('gzip', '.gz'))
+
+# Mimetypes worth compressing on the fly.
+COMPRESSIBLE_MIMETYPES = frozenset([
+    'application/json',
+    'application/x-ndjson',
+])
+
+# Static files compress_static makes compressed copies of.
+STATIC_EXTENSIONS = ('.css', '.html', '.js', '.json', '.svg', '.txt')
+
+
+def choose_encoding(available):
+    """Returns the encoding to use for the response or None
+
+    :arg available: Encodings we can produce, in order of preference
+
+    """
+    accept = request.accept_encodings
+    for encoding in available:
+        if accept[encoding]:
+            return encoding
+    return None
+
+
+def gzip_compress(data, level):
+    # wbits of 16 + MAX_WBITS gets zlib to write gzip headers.
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    return compressor.compress(data) + compressor.flush()
+
+
+def gzip_stream(chunks, level):
+    """Compresses chunks, flushing after each one so they're not held
+    back waiting for more"""
+    compressor = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+    for chunk in chunks:
+        if isinstance(chunk, unicode):
+            chunk = chunk.encode('utf-8')
+        data = compressor.compress(chunk) + compressor.flush(zlib.Z_SYNC_FLUSH)
+        if data:
+            yield data
+    yield compressor.flush()
+
+
+def compress_response(response, config):
+    """Compresses a response if the client accepts it
+
+    Responses smaller than COMPRESS_MIN_SIZE aren't worth it and are
+    left alone. Streamed responses are gzipped as they're sent since
+    that's the encoding that can be flushed a chunk at a time.
+
+    The encoding is appended to the ETag so the compressed and plain
+    versions have different ETags. ernest.utils.not_modified knows to
+    look for those.
+
+    :arg response: The Response
+    :arg config: The app config
+
+    :returns: The response
+
+    """
+    if (response.status_code != 200
+            or response.direct_passthrough
+            or 'Content-Encoding' in response.headers
+            or response.mimetype not in COMPRESSIBLE_MIMETYPES):
+        return response
+
+    response.vary.add('Accept-Encoding')
+
+    if response.is_streamed:
+        encoding = choose_encoding(['gzip'])
+        if encoding is None:
+            return response
+        response.response = gzip_stream(
+            response.response, config['COMPRESS_GZIP_LEVEL'])
+        response.headers.pop('Content-Length', None)
+
+    else:
+        data = response.get_data()
+        if len(data) < config['COMPRESS_MIN_SIZE']:
+            return response
+        encoding = choose_encoding(
+            ['br', 'gzip'] if brotli is not None else ['gzip'])
+        if encoding is None:
+            return response
+        if encoding == 'br':
+            data = brotli.compress(
+                data, quality=config['COMPRESS_BROTLI_QUALITY'])
+        else:
+            data = gzip_compress(data, config['COMPRESS_GZIP_LEVEL'])
+        response.set_data(data)
+
+    response.headers['Content-Encoding'] = encoding
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag('{0}-{1}'.format(etag, encoding), weak)
+    return response
+
+
+def send_static(filename, **kwargs):
+    """Sends a static file or a precompressed copy of it
+
+    Picks filename + '.br' or filename + '.gz' if compress_static made
+    one and the client accepts that encoding.
+
+    :arg filename: Absolute path of the file
+    :arg kwargs: Passed on to send_file
+
+    """
+    kwargs.setdefault('mimetype', mimetypes.guess_type(filename)[0])
+    for encoding, suffix in ENCODINGS:
+        if (request.accept_encodings[encoding]
+                and os.path.isfile(filename + suffix)):
+            response = send_file(filename + suffix, **kwargs)
+            response.headers['Content-Encoding'] = encoding
+            response.vary.add('Accept-Encoding')
+            return response
+
+    response = send_file(filename, **kwargs)
+    response.vary.add('Accept-Encoding')
+    return response
+
+
+def compress_static(static_folder, min_size):
+    """Writes .gz and .br copies of compressible static files
+
+    Copies that are newer than the original are left alone. .br copies
+    are only made if brotli is installed.
+
+    :arg static_folder: Directory to look for files in
+    :arg min_size: Files smaller than this many bytes are skipped
+
+    :returns: List of the paths written
+
+    """
+    written = []
+    for dirpath, dirnames, filenames in os.walk(static_folder):
+        for name in filenames:
+            if not name.endswith(STATIC_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, name)
+            if os.path.getsize(path) < min_size:
+                continue
+            mtime = os.path.getmtime(path)
+
+            with open(path, 'rb') as fp:
+                data = fp.read()
+
+            for encoding, suffix in ENCODINGS:
+                if encoding == 'br' and brotli is None:
+                    continue
+                target = path + suffix
+                if (os.path.exists(target)
+                        and os.path.getmtime(target) >= mtime):
+                    continue
+
+                if encoding == 'br':
+                    with open(target, 'wb') as fp:
+                        fp.write(brotli.compress(data))
+                else:
+                    # mtime=0 so the output only changes when the file
+                    # does.
+                    with open(target, 'wb') as raw:
+                        with gzip.GzipFile(
+                                name, 'wb', 9, raw, mtime=0) as fp:
+                            fp.write(data)
+                written.append(target)
+    return written
@@ -0,0 +1,94 @@
+import json
+
+from flask import current_app
+from flask.json import JSONEncoder as FlaskJSONEncoder
+from sqlalchemy import event
+
+
+# type -> function returning something json can encode
+_encoders = {}
+
+_flask_encoder = FlaskJSONEncoder()
+
+
+def register_encoder(type_, encoder):
+    """Registers the function that encodes instances of a type
+
+    Lookups are on the exact type, so subclasses need registering too.
+
+    :arg type_: The type
+    :arg encoder: Function taking an instance and returning something
+        JSON can encode
+
+    """
+    _encoders[type_] = encoder
+
+
+def encode_default(obj):
+    """Returns a JSON-encodable version of obj
+
+    This is the default hook for the encoders. Types are looked up in
+    the registry. Types that aren't registered but have a ``__json__``
+    method get registered the first time they're seen, so the
+    attribute lookup happens once per type rather than once per
+    object. Anything else goes to Flask's encoder, which handles
+    dates and the like.
+
+    :raises TypeError: if obj can't be encoded
+
+    """
+    type_ = type(obj)
+    encoder = _encoders.get(type_)
+    if encoder is None:
+        if not hasattr(type_, '__json__'):
+            return _flask_encoder.default(obj)
+        encoder = type_.__json__
+        register_encoder(type_, encoder)
+    return encoder(obj)
+
+
+_stdlib_encoder = json.JSONEncoder(
+    default=encode_default, separators=(',', ':'))
+
+
+def dumps(obj):
+    """Encodes obj as compact JSON with the stdlib's C encoder
+
+    Keys aren't sorted and the output isn't indented since both force
+    the stdlib onto its much slower pure Python encoder.
+
+    """
+    return _stdlib_encoder.encode(obj)
+
+
+def jsonify(*args, **kwargs):
+    """Like flask.jsonify but encodes with dumps"""
+    return current_app.response_class(
+        dumps(dict(*args, **kwargs)), mimetype='application/json')
+
+
+def cache_json(cls):
+    """Class decorator that caches what a model's ``__json__`` returns
+
+    The cached value is dropped when any column attribute is set and
+    when the instance is expired or refreshed by the session. Callers
+    must not change the dict they get back.
+
+    """
+    make_json = cls.__json__
+
+    def __json__(self):
+        data = self.__dict__.get('_cached_json')
+        if data is None:
+            data = self.__dict__['_cached_json'] = make_json(self)
+        return data
+
+    def invalidate(target, *args):
+        target.__dict__.pop('_cached_json', None)
+
+    cls.__json__ = __json__
+    for column in cls.__table__.columns:
+        event.listen(getattr(cls, column.key), 'set', invalidate)
+    event.listen(cls, 'expire', invalidate)
+    event.listen(cls, 'refresh', invalidate)
+    return cls
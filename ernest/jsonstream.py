@@ -0,0 +1,254 @@
+import codecs
+import json
+import re
+
+
+WHITESPACE = u' \t\n\r'
+NUMBER_CHARS = u'0123456789.eE+-'
+
+_decoder = json.JSONDecoder()
+
+_STRING_SPECIAL_RE = re.compile(u'["\\\\]')
+_STRUCTURE_RE = re.compile(u'[][{}"]')
+
+
+class ValueScanner(object):
+    """Finds where an array, object or string ends without decoding it
+
+    Text is fed in pieces and the scanner picks up where it left off,
+    so each character is only looked at once however many pieces the
+    value is split across.
+
+    """
+    def __init__(self):
+        self.depth = 0
+        self.in_string = False
+        # Whether the last piece ended with a backslash in a string
+        self.escape = False
+
+    def scan(self, text, pos):
+        """Scans text from pos
+
+        :returns: The index just past the end of the value or None if
+            it doesn't end in text
+
+        """
+        end = len(text)
+        while True:
+            if self.escape:
+                if pos >= end:
+                    return None
+                pos += 1
+                self.escape = False
+
+            if self.in_string:
+                match = _STRING_SPECIAL_RE.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                if match.group() == u'\\':
+                    self.escape = True
+                    continue
+                self.in_string = False
+                if self.depth == 0:
+                    return pos
+            else:
+                match = _STRUCTURE_RE.search(text, pos)
+                if match is None:
+                    return None
+                pos = match.end()
+                char = match.group()
+                if char == u'"':
+                    self.in_string = True
+                elif char in u'[{':
+                    self.depth += 1
+                else:
+                    self.depth -= 1
+                    if self.depth == 0:
+                        return pos
+
+
+class ChunkBuffer(object):
+    """Text buffer fed from an iterable of chunks
+
+    Text before the current position is dropped whenever more is read,
+    so the buffer holds roughly one chunk plus whatever value is being
+    decoded.
+
+    :arg chunks: Iterable of byte strings of utf-8 encoded text or
+        unicode strings
+
+    """
+    def __init__(self, chunks):
+        self._chunks = iter(chunks)
+        self._decoder = codecs.getincrementaldecoder('utf-8')()
+        self.text = u''
+        self.pos = 0
+        self.eof = False
+
+    def read(self):
+        """Returns the next chunk as text without adding it to the buffer
+
+        :returns: The text or None if there was nothing left to read
+
+        """
+        if self.eof:
+            return None
+
+        try:
+            chunk = next(self._chunks)
+        except StopIteration:
+            self.eof = True
+            # Raises if the input ends partway through a character.
+            self._decoder.decode(b'', final=True)
+            return None
+
+        if isinstance(chunk, str):
+            chunk = self._decoder.decode(chunk)
+        return chunk
+
+    def fill(self):
+        """Reads the next chunk into the buffer
+
+        :returns: False if there was nothing left to read
+
+        """
+        if self.pos:
+            self.text = self.text[self.pos:]
+            self.pos = 0
+
+        chunk = self.read()
+        if chunk is None:
+            return False
+        self.text += chunk
+        return True
+
+    def peek(self):
+        """Skips whitespace and returns the next character
+
+        :returns: The next character or None at the end of the input
+
+        """
+        while True:
+            text, pos = self.text, self.pos
+            end = len(text)
+            while pos < end and text[pos] in WHITESPACE:
+                pos += 1
+            self.pos = pos
+            if pos < end:
+                return text[pos]
+            if not self.fill():
+                return None
+
+    def expect(self, chars):
+        """Consumes the next character which must be one of chars
+
+        :returns: The character
+
+        :raises ValueError: if it's something else
+
+        """
+        char = self.peek()
+        if char is None or char not in chars:
+            raise ValueError('Expected one of {0!r} but got {1!r}'.format(
+                chars, char))
+        self.pos += 1
+        return char
+
+    def _is_partial(self, end):
+        """Whether a value ending at end might continue in the next chunk
+
+        A number at the end of the text might have more digits to
+        come and one followed by '.' or 'e' was cut off before its
+        fraction or exponent.
+
+        """
+        return end >= len(self.text) or self.text[end] in NUMBER_CHARS
+
+    def value(self):
+        """Decodes the next JSON value
+
+        Arrays, objects and strings are scanned for their end as
+        chunks come in and then decoded once, so a value split across
+        many chunks takes time in proportion to its length.
+
+        :raises ValueError: if the JSON is invalid
+
+        """
+        if self.peek() in (u'[', u'{', u'"'):
+            scanner = ValueScanner()
+            end = scanner.scan(self.text, self.pos)
+            if end is None:
+                # Gather the rest of the value and join it once.
+                pieces = [self.text[self.pos:]]
+                while end is None:
+                    chunk = self.read()
+                    if chunk is None:
+                        raise ValueError('Unexpected end of input')
+                    pieces.append(chunk)
+                    end = scanner.scan(chunk, 0)
+                self.text = u''.join(pieces)
+                self.pos = 0
+
+            val, self.pos = _decoder.raw_decode(self.text, self.pos)
+            return val
+
+        # Everything else is short, so just try decoding it until
+        # there's enough text.
+        while True:
+            try:
+                val, end = _decoder.raw_decode(self.text, self.pos)
+            except ValueError:
+                # Probably need more text. If there isn't any, it's
+                # invalid.
+                if self.fill():
+                    continue
+                raise
+
+            if self._is_partial(end) and self.fill():
+                # Numbers can continue into the next chunk.
+                continue
+
+            self.pos = end
+            return val
+
+
+def iterparse(chunks, array_key):
+    """Parses a JSON object incrementally
+
+    The members of the object are yielded as they're decoded. The
+    array under ``array_key`` is yielded item by item so it's never
+    held in memory all at once.
+
+    :arg chunks: Iterable of utf-8 encoded chunks of a JSON object
+    :arg array_key: Key of the array to yield item by item
+
+    :returns: Generator of (key, value) for each member of the object
+        and (array_key, item) for each item in the array
+
+    :raises ValueError: if the JSON is invalid
+
+    """
+    buf = ChunkBuffer(chunks)
+    buf.expect(u'{')
+    if buf.peek() == u'}':
+        return
+
+    while True:
+        key = buf.value()
+        buf.expect(u':')
+
+        if key == array_key and buf.peek() == u'[':
+            buf.expect(u'[')
+            if buf.peek() == u']':
+                buf.expect(u']')
+            else:
+                while True:
+                    yield key, buf.value()
+                    if buf.expect(u',]') == u']':
+                        break
+        else:
+            yield key, buf.value()
+
+        if buf.expect(u',}') == u'}':
+            return
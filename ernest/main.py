@@ -1,21 +1,39 @@
+import collections
 import os
 import re
+import threading
 
 import requests
 
-from flask import (Flask, request, make_response, abort, jsonify,
+from flask import (Flask, request, make_response, abort, safe_join,
                    send_file, session, json)
 from flask.views import MethodView
-from flask.ext.sqlalchemy import SQLAlchemy
+from flask.ext.sqlalchemy import SignallingSession, SQLAlchemy
 
 from flask_sslify import SSLify
+from sqlalchemy import and_, exists, false, or_, union_all
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.attributes import set_committed_value
 from sqlalchemy.orm.exc import NoResultFound
+from werkzeug.exceptions import HTTPException
+from werkzeug.http import generate_etag
 from werkzeug.routing import BaseConverter
 
-from .bugzilla import BugzillaTracker
+from .assets import get_assets
+from .bugzilla import (EMPTY_WHITEBOARD, BugzillaTracker, Whiteboard,
+                       mark_is_blocked, whiteboard_data)
+from .cache import get_cache, hash_identity
+from .compression import compress_response, send_static
+from .encoding import cache_json, encode_default, jsonify
+from .metadata import Metadata, MetadataCache, bump_version, watch_models
+from .pipeline import BUG_DETAILS_PIPELINE, SPRINT_PIPELINE, TRACKER_PIPELINE
+from .push import event_stream, get_pollers
+from .stats import SprintStats, priority_key
 from .version import VERSION, VERSION_RAW
-from .utils import gravatar_url, smart_date
+from .utils import (format_bugzilla_time, make_etag, not_modified,
+                    parallel_map, parse_bugzilla_time, set_validators,
+                    smart_date, stream_jsonify, stream_requested)
 
 
 # ----------------------------------------
@@ -25,6 +43,64 @@ from .utils import gravatar_url, smart_date
 DAY = 60 * 60 * 24
 MONTH = DAY * 30
 
+# Fields the sprint page needs. The background refresher fetches the
+# same ones so the views find its snapshots.
+SPRINT_BUG_FIELDS = (
+    'id',
+    'priority',
+    'summary',
+    'status',
+    'whiteboard',
+    'last_change_time',
+    'component',
+    'depends_on',
+    'flags',
+    'groups',
+    'assigned_to',
+)
+
+# Fields and statuses of the [tracker] bugs on the project page.
+TRACKER_BUG_FIELDS = (
+    'id',
+    'priority',
+    'summary',
+    'last_change_time',
+    'depends_on',
+    'target_milestone',
+)
+TRACKER_STATUSES = ['UNCONFIRMED', 'NEW', 'ASSIGNED', 'REOPENED']
+
+# Fields the bug details page needs for the bug and its blockers.
+BUG_DETAILS_FIELDS = (
+    'id',
+    'priority',
+    'summary',
+    'status',
+    'whiteboard',
+    'last_change_time',
+    'product',
+    'component',
+    'depends_on',
+    'target_milestone',
+    'flags',
+    'comments',
+    'assigned_to',
+    'reported',
+)
+BLOCKER_BUG_FIELDS = (
+    'id',
+    'priority',
+    'summary',
+    'status',
+    'whiteboard',
+    'last_change_time',
+    'component',
+    'depends_on',
+    'flags',
+    'groups',
+    'assigned_to',
+)
+
 
 # ----------------------------------------
 # Flask app setup and configuration
@@ -78,11 +154,10 @@ def slugify(text, delim=u'-'):
 
 
 class ExtensibleJSONEncoder(json.JSONEncoder):
-    """A JSON decoder that will check for a .__json__ methon on objects."""
+    """A JSON encoder that uses .__json__ methods and the registry in
+    ernest.encoding."""
     def default(self, obj):
-        if hasattr(obj, '__json__'):
-            return obj.__json__()
-        return super(ExtensibleJSONEncoder, self).default(obj)
+        return encode_default(obj)
 
 
 app.json_encoder = ExtensibleJSONEncoder
@@ -93,6 +168,7 @@ app.json_encoder = ExtensibleJSONEncoder
 # ----------------------------------------
 
 
+@cache_json
 class Project(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(20), unique=True)
@@ -112,6 +188,22 @@ class Project(db.Model):
     def __repr__(self):
         return '<Project {0}>'.format(self.name)
 
+    @classmethod
+    def with_admin(cls, slug, username):
+        """Returns (project, whether username is an admin of it)
+
+        :raises NoResultFound: if there's no project with that slug
+
+        """
+        project, admin = (db.session.query(cls, admin_clause(username))
+                          .filter(cls.slug == slug)
+                          .one())
+        return project, bool(admin)
+
+    def bugzilla_components(self):
+        """Returns the product/component dicts for Bugzilla queries"""
+        return [{'product': self.bugzilla_product, 'component': '__ANY__'}]
+
     def __json__(self):
         return {
             'id': self.id,
@@ -139,6 +231,16 @@ class ProjectAdmin(db.Model):
         return '<ProjectAdmin {0}>'.format(self.account)
 
 
+def admin_clause(username):
+    """Returns an EXISTS clause for whether username is an admin of
+    the Project in the query it's used in"""
+    if not username:
+        return false()
+    return exists().where(and_(ProjectAdmin.project_id == Project.id,
+                               ProjectAdmin.account == username))
+
+
+@cache_json
 class Sprint(db.Model):
     id = db.Column(db.Integer, primary_key=True)
     name = db.Column(db.String(20))
@@ -154,6 +256,8 @@ class Sprint(db.Model):
 
     __table_args__ = (
         db.UniqueConstraint('project_id', 'name', name='_project_sprint_uc'),
+        db.Index('ix_sprint_project_id_start_date_name',
+                 'project_id', 'start_date', 'name'),
     )
 
     def __init__(self, project_id, name):
@@ -164,6 +268,79 @@ class Sprint(db.Model):
     def __repr__(self):
         return '<Sprint {0}:{1}>'.format(self.project, self.name)
 
+    @classmethod
+    def with_project(cls, projectslug, sprintslug, username):
+        """Returns (project, sprint, whether username is an admin of
+        the project) in one query
+
+        :raises NoResultFound: if there's no such sprint
+
+        """
+        project, sprint, admin = (
+            db.session.query(Project, cls, admin_clause(username))
+            .join(cls, cls.project_id == Project.id)
+            .filter(Project.slug == projectslug, cls.slug == sprintslug)
+            .one())
+        return project, sprint, bool(admin)
+
+    def order_key(self):
+        """Sort key for a project's sprints: sprints without a start
+        date first, then by (start_date, name)"""
+        return (self.start_date is not None, self.start_date, self.name)
+
+    def neighbors(self):
+        """Returns (previous sprint, next sprint) in :py:meth:`order_key`
+        order
+
+        Either can be None. Both are ordered LIMIT 1 queries on the
+        (project_id, start_date, name) index, sent as one UNION ALL.
+        Sprints without a start date are queried separately when
+        needed since databases don't agree on where NULLs sort.
+
+        """
+        cls = type(self)
+        query = db.session.query(cls).filter(
+            cls.project_id == self.project_id)
+        no_date = cls.start_date.is_(None)
+        forwards = (cls.start_date, cls.name)
+        backwards = (cls.start_date.desc(), cls.name.desc())
+
+        if self.start_date is None:
+            before = and_(no_date, cls.name < self.name)
+            after = and_(no_date, cls.name > self.name)
+        else:
+            before = or_(cls.start_date < self.start_date,
+                         and_(cls.start_date == self.start_date,
+                              cls.name < self.name))
+            after = or_(cls.start_date > self.start_date,
+                        and_(cls.start_date == self.start_date,
+                             cls.name > self.name))
+
+        candidates = db.session.query(cls).from_statement(union_all(
+            query.filter(before).order_by(*backwards).limit(1)
+            .subquery().select(),
+            query.filter(after).order_by(*forwards).limit(1)
+            .subquery().select(),
+        )).all()
+
+        key = self.order_key()
+        prev_sprint = next_sprint = None
+        for sprint in candidates:
+            if sprint.order_key() < key:
+                prev_sprint = sprint
+            else:
+                next_sprint = sprint
+
+        if prev_sprint is None and self.start_date is not None:
+            prev_sprint = (query.filter(no_date)
+                           .order_by(cls.name.desc())
+                           .first())
+        if next_sprint is None and self.start_date is None:
+            next_sprint = (query.filter(cls.start_date.isnot(None))
+                           .order_by(*forwards)
+                           .first())
+        return prev_sprint, next_sprint
+
     def __json__(self):
         return {
             'id': self.id,
@@ -176,6 +353,289 @@ class Sprint(db.Model):
         }
 
 
+class Bug(db.Model):
+    """A bug in the local mirror of Bugzilla
+
+    See ernest/mirror.py for how it's kept up to date. Only public
+    bugs are mirrored.
+
+    """
+    id = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    product = db.Column(db.String(100))
+    component = db.Column(db.String(100))
+    status = db.Column(db.String(20))
+    priority = db.Column(db.String(10))
+    summary = db.Column(db.Text)
+    whiteboard = db.Column(db.Text)
+    target_milestone = db.Column(db.String(50))
+    assigned_to = db.Column(db.String(255))
+    assigned_to_real_name = db.Column(db.String(255))
+    # Space separated group names.
+    groups = db.Column(db.Text)
+    last_change_time = db.Column(db.DateTime)
+
+    # What's in the whiteboard, parsed when the bug is stored so it
+    # can be queried and doesn't need parsing again. points is only
+    # set when p= is a number and points_text holds anything else,
+    # e.g. '?'.
+    sprint = db.Column(db.String(50))
+    wb_user = db.Column(db.String(100))
+    wb_component = db.Column(db.String(100))
+    points = db.Column(db.Integer)
+    points_text = db.Column(db.String(20))
+
+    dependencies = db.relationship(
+        'BugDependency', cascade='all, delete-orphan')
+    flags = db.relationship('BugFlag', cascade='all, delete-orphan')
+    whiteboard_flags = db.relationship(
+        'BugWhiteboardFlag', cascade='all, delete-orphan',
+        order_by='BugWhiteboardFlag.position')
+
+    __table_args__ = (
+        db.Index('ix_bug_product_sprint', 'product', 'sprint'),
+        db.Index('ix_bug_product_status', 'product', 'status'),
+        db.Index('ix_bug_product_last_change_time',
+                 'product', 'last_change_time'),
+    )
+
+    def __repr__(self):
+        return '<Bug {0}>'.format(self.id)
+
+    def update_from_bugzilla(self, data):
+        """Updates the bug with fields from the Bugzilla API
+
+        Fields that aren't in data are left alone.
+
+        """
+        for field in ('product', 'component', 'status', 'priority',
+                      'summary', 'target_milestone'):
+            if field in data:
+                setattr(self, field, data[field])
+
+        if 'whiteboard' in data:
+            self.whiteboard = data['whiteboard']
+            wb_data = whiteboard_data(data['whiteboard'])
+            self.sprint = wb_data.sprint or None
+            self.wb_user = wb_data.user or None
+            self.wb_component = wb_data.component or None
+            if isinstance(wb_data.points, int):
+                self.points, self.points_text = wb_data.points, None
+            else:
+                self.points, self.points_text = None, wb_data.points
+            self.whiteboard_flags = [
+                BugWhiteboardFlag(bug_id=self.id, name=name, position=i)
+                for i, name in enumerate(wb_data.flags)
+            ]
+
+        if 'assigned_to' in data:
+            self.assigned_to = data['assigned_to'].get('name')
+            self.assigned_to_real_name = data['assigned_to'].get('real_name')
+
+        if 'groups' in data:
+            self.groups = ' '.join(group['name'] for group in data['groups'])
+
+        if 'last_change_time' in data:
+            self.last_change_time = parse_bugzilla_time(
+                data['last_change_time'])
+
+        if 'depends_on' in data:
+            self.dependencies = [
+                BugDependency(bug_id=self.id, depends_on=depends_on)
+                for depends_on in set(data['depends_on'])
+            ]
+
+        if 'flags' in data:
+            self.flags = [
+                BugFlag(
+                    bug_id=self.id,
+                    name=flag['name'],
+                    status=flag.get('status'),
+                    requestee=flag.get('requestee', {}).get('name'),
+                    setter=flag.get('setter', {}).get('name'))
+                for flag in data['flags']
+            ]
+
+    def whiteboard_data(self):
+        """Returns the parsed whiteboard from the columns
+
+        Like :py:func:`ernest.bugzilla.whiteboard_data` except that
+        'other' is always empty since it isn't stored.
+
+        """
+        if not self.whiteboard:
+            return EMPTY_WHITEBOARD
+        return Whiteboard(
+            self.wb_user or '', self.wb_component or '', self.sprint or '',
+            self.points if self.points is not None else self.points_text,
+            tuple(flag.name for flag in self.whiteboard_flags), ())
+
+    def to_bugzilla(self, fields=None):
+        """Returns the bug shaped like it comes from the Bugzilla API
+
+        If the whiteboard is included, the parsed whiteboard is too
+        under '_whiteboard' so the pipeline doesn't parse it again.
+
+        :arg fields: (Optional) Fields to include. Defaults to all of
+            them.
+
+        """
+        flags = []
+        for flag in self.flags:
+            flag_data = {'name': flag.name, 'status': flag.status}
+            if flag.requestee:
+                flag_data['requestee'] = {'name': flag.requestee}
+            if flag.setter:
+                flag_data['setter'] = {'name': flag.setter}
+            flags.append(flag_data)
+
+        data = {
+            'id': self.id,
+            'product': self.product,
+            'component': self.component,
+            'status': self.status,
+            'priority': self.priority,
+            'summary': self.summary,
+            'whiteboard': self.whiteboard or '',
+            'target_milestone': self.target_milestone,
+            'assigned_to': {
+                'name': self.assigned_to,
+                'real_name': self.assigned_to_real_name or '',
+            },
+            'groups': [{'name': name}
+                       for name in (self.groups or '').split()],
+            'last_change_time': format_bugzilla_time(self.last_change_time),
+            'depends_on': sorted(dep.depends_on
+                                 for dep in self.dependencies),
+            'flags': flags,
+        }
+        if fields is not None:
+            data = dict((field, data[field]) for field in fields
+                        if field in data)
+        if 'whiteboard' in data:
+            data['_whiteboard'] = self.whiteboard_data()
+        return data
+
+    @classmethod
+    def query_with_related(cls):
+        """Query that loads dependencies and flags with a query each
+        rather than a query each per bug"""
+        return db.session.query(cls).options(
+            db.subqueryload(cls.dependencies), db.subqueryload(cls.flags),
+            db.subqueryload(cls.whiteboard_flags))
+
+    @classmethod
+    def sprint_bugs(cls, product, sprint, fields=None):
+        """Returns the mirrored bugs in a sprint in Bugzilla API form"""
+        return [bug.to_bugzilla(fields) for bug in (
+            cls.query_with_related()
+            .filter(cls.product == product, cls.sprint == sprint))]
+
+    @classmethod
+    def tracker_bugs(cls, product, statuses, fields=None):
+        """Returns the mirrored [tracker] bugs in Bugzilla API form"""
+        return [bug.to_bugzilla(fields) for bug in (
+            cls.query_with_related()
+            .filter(cls.product == product,
+                    cls.status.in_(statuses),
+                    cls.summary.contains('[tracker]')))]
+
+    @classmethod
+    def bugs_by_id(cls, ids, fields=None):
+        """Returns the mirrored bugs with the given ids in Bugzilla API
+        form in the order of ids. Bugs that aren't mirrored are left
+        out."""
+        bugs = {}
+        for bug in cls.query_with_related().filter(cls.id.in_(ids)):
+            bugs[bug.id] = bug.to_bugzilla(fields)
+        return [bugs[id_] for id_ in ids if id_ in bugs]
+
+    @classmethod
+    def statuses(cls, ids):
+        """Returns a dict of id -> status for mirrored bugs"""
+        return dict(db.session.query(cls.id, cls.status)
+                    .filter(cls.id.in_(ids)))
+
+
+class BugDependency(db.Model):
+    bug_id = db.Column(
+        db.Integer, db.ForeignKey('bug.id', ondelete='CASCADE'),
+        primary_key=True)
+    depends_on = db.Column(db.Integer, primary_key=True,
+                           autoincrement=False)
+
+
+class BugFlag(db.Model):
+    id = db.Column(db.Integer, primary_key=True)
+    bug_id = db.Column(
+        db.Integer, db.ForeignKey('bug.id', ondelete='CASCADE'),
+        index=True)
+    name = db.Column(db.String(50))
+    status = db.Column(db.String(5))
+    requestee = db.Column(db.String(255))
+    setter = db.Column(db.String(255))
+
+
+class BugWhiteboardFlag(db.Model):
+    """A [flag] in a mirrored bug's whiteboard"""
+    bug_id = db.Column(
+        db.Integer, db.ForeignKey('bug.id', ondelete='CASCADE'),
+        primary_key=True)
+    # Where it is in the whiteboard, to keep them in order.
+    position = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    name = db.Column(db.String(100))
+
+
+# ----------------------------------------
+# Metadata cache
+# ----------------------------------------
+
+_metadata_lock = threading.Lock()
+
+
+def load_metadata():
+    """Loads a Metadata snapshot of all the projects, sprints and admins
+
+    It uses a session of its own so the objects aren't shared with
+    the request's session.
+
+    """
+    load_session = Session(bind=db.engine)
+    try:
+        projects = load_session.query(Project).all()
+        sprints = load_session.query(Sprint).all()
+        admins = load_session.query(
+            ProjectAdmin.project_id, ProjectAdmin.account).all()
+    finally:
+        load_session.close()
+
+    projects_by_id = dict((project.id, project) for project in projects)
+    for sprint in sprints:
+        set_committed_value(
+            sprint, 'project', projects_by_id.get(sprint.project_id))
+    return Metadata(projects, sprints, admins)
+
+
+def get_metadata():
+    """Returns the current Metadata or None if METADATA_CACHE is off"""
+    if not app.config['METADATA_CACHE']:
+        return None
+
+    metadata_cache = app.extensions.get('ernest_metadata')
+    if metadata_cache is None:
+        with _metadata_lock:
+            metadata_cache = app.extensions.get('ernest_metadata')
+            if metadata_cache is None:
+                metadata_cache = MetadataCache(
+                    get_cache(app), load_metadata,
+                    app.config['METADATA_CACHE_TIMEOUT'])
+                app.extensions['ernest_metadata'] = metadata_cache
+    return metadata_cache.get()
+
+
+watch_models(SignallingSession, (Project, Sprint, ProjectAdmin),
+             lambda: bump_version(get_cache(app)))
+
+
 # ----------------------------------------
 # Template stuff
 # ----------------------------------------
@@ -204,6 +664,289 @@ def is_admin(username, project):
         return False
 
 
+@app.after_request
+def finish_api_response(response):
+    """Makes GET requests to the API conditional and compresses
+    responses
+
+    Views that can tell whether anything changed without building the
+    response set their own ETag. Everything else gets one from the
+    body, which saves the bandwidth if not the work.
+
+    """
+    if not request.path.startswith('/api/'):
+        return response
+
+    if (request.method == 'GET'
+            and response.status_code == 200
+            and not response.is_streamed
+            and 'ETag' not in response.headers):
+        body = response.get_data()
+        if response.mimetype == 'application/json':
+            # dumps doesn't sort keys, so the same data can come out
+            # in a different order from one request to the next.
+            etag = make_etag(json.loads(body))
+        else:
+            etag = generate_etag(body)
+        resp = not_modified(etag)
+        if resp is not None:
+            return resp
+        set_validators(response, etag)
+
+    return compress_response(response, app.config)
+
+
+def use_bug_mirror(userid):
+    """Whether to answer from the bug mirror rather than Bugzilla
+
+    The mirror only has public bugs, so it's only used for people who
+    aren't logged into Bugzilla.
+
+    :arg userid: The Bugzilla login or None
+
+    """
+    return app.config['BUG_MIRROR'] and not userid
+
+
+def get_sprint(projectslug, sprintslug, username):
+    """Returns (project, sprint, whether username is an admin of the
+    project, previous sprint, next sprint)
+
+    :raises NoResultFound: if there's no such sprint
+
+    """
+    metadata = get_metadata()
+    if metadata is not None:
+        project = metadata.project(projectslug)
+        sprint = metadata.sprint(project, sprintslug)
+        admin = metadata.is_admin(username, project)
+        prev_sprint, next_sprint = metadata.neighbors(sprint)
+    else:
+        project, sprint, admin = Sprint.with_project(
+            projectslug, sprintslug, username)
+        prev_sprint, next_sprint = sprint.neighbors()
+    return project, sprint, admin, prev_sprint, next_sprint
+
+
+def load_sprint_bugs(project, sprint, userid=None, cookie=None):
+    """Returns the bugs in a sprint with 'is_blocked' and
+    'open_blockers' set
+
+    :arg project: The Project
+    :arg sprint: The Sprint
+    :arg userid: (Optional) Bugzilla username
+    :arg cookie: (Optional) Bugzilla cookie for userid
+
+    """
+    if use_bug_mirror(userid):
+        return mark_is_blocked(
+            Bug.sprint_bugs(project.bugzilla_product, sprint.name,
+                            SPRINT_BUG_FIELDS),
+            Bug.statuses)
+
+    bz = BugzillaTracker(app)
+    sprint_bugs = bz.fetch_sprint_bugs(
+        fields=SPRINT_BUG_FIELDS,
+        components=project.bugzilla_components(),
+        sprint=sprint.name,
+        userid=userid,
+        cookie=cookie,
+        prefetch_blockers=True,
+        max_age=app.config['SPRINT_SNAPSHOT_MAX_AGE'],
+    )
+    return bz.mark_is_blocked(sprint_bugs, userid, cookie)
+
+
+def enrich_sprint_bugs(bugs, my_email, extra_breakdowns=()):
+    """Runs the sprint pipeline over bugs and sorts them
+
+    :arg bugs: Bugs from :py:func:`load_sprint_bugs`, which are
+        changed in place
+    :arg my_email: Email of the user asking
+    :arg extra_breakdowns: Breakdowns to include on top of the
+        default ones
+
+    :returns: The sprint's totals and breakdowns
+
+    """
+    SPRINT_PIPELINE.run(bugs, my_email=my_email)
+    stats = SprintStats(bugs).as_dict(extra=extra_breakdowns)
+
+    # FIXME - this is a stopgap until we have sorting in the
+    # table. It tries hard to sort P1 through P5 and then bugs
+    # that don't have a priority (for which the value is the
+    # helpful '--') go at the bottom.
+    bugs.sort(key=lambda bug: priority_key(bug.get('priority')))
+    return stats
+
+
+def get_project(projectslug, username):
+    """Returns (project, whether username is an admin of it, the
+    project's sprints in name order)
+
+    :raises NoResultFound: if there's no such project
+
+    """
+    metadata = get_metadata()
+    if metadata is not None:
+        project = metadata.project(projectslug)
+        admin = metadata.is_admin(username, project)
+        sprints = metadata.sprints(project)
+    else:
+        project, admin = Project.with_admin(projectslug, username)
+        sprints = (db.session.query(Sprint)
+                   .filter_by(project_id=project.id)
+                   .order_by(Sprint.name)
+                   .all())
+    return project, admin, sprints
+
+
+def load_tracker_bugs(projects, userid=None, cookie=None):
+    """Returns the open [tracker] bugs of each of the projects
+
+    The trackers of all the projects are fetched together, so that's
+    the same Bugzilla API requests as for a single project as long as
+    there are no more than a bucket's worth of products.
+
+    :arg projects: List of Projects
+    :arg userid: (Optional) Bugzilla username
+    :arg cookie: (Optional) Bugzilla cookie for userid
+
+    :returns: List of lists of bugs in the same order as projects
+
+    """
+    if use_bug_mirror(userid):
+        return [Bug.tracker_bugs(project.bugzilla_product, TRACKER_STATUSES,
+                                 TRACKER_BUG_FIELDS)
+                for project in projects]
+
+    components = []
+    for project in projects:
+        for component in project.bugzilla_components():
+            if component not in components:
+                components.append(component)
+
+    bz = BugzillaTracker(app)
+    bugs = bz.fetch_bugs(
+        fields=TRACKER_BUG_FIELDS + ('product',),
+        components=components,
+        summary='[tracker]',
+        userid=userid,
+        cookie=cookie,
+        status=TRACKER_STATUSES,
+    )['bugs']
+
+    by_product = {}
+    for bug in bugs:
+        by_product.setdefault(bug['product'], []).append(bug)
+
+    # The pipeline changes bugs in place, so each project gets copies
+    # without the product that was only fetched to sort them out.
+    return [
+        [dict((key, val) for key, val in bug.items() if key != 'product')
+         for bug in by_product.get(project.bugzilla_product, [])]
+        for project in projects
+    ]
+
+
+def load_sprints_bugs(sprints, userid=None, cookie=None):
+    """Returns the bugs in each of the sprints like
+    :py:func:`load_sprint_bugs` does
+
+    The sprints are fetched at the same time and then the statuses of
+    all their blockers are fetched with one Bugzilla API request.
+
+    :arg sprints: List of (project, sprint) with no sprint in it twice
+    :arg userid: (Optional) Bugzilla username
+    :arg cookie: (Optional) Bugzilla cookie for userid
+
+    :returns: List of lists of bugs in the same order as sprints
+
+    """
+    if use_bug_mirror(userid):
+        return [load_sprint_bugs(project, sprint)
+                for project, sprint in sprints]
+
+    bz = BugzillaTracker(app)
+
+    def fetch(project_sprint):
+        project, sprint = project_sprint
+        return list(bz.fetch_sprint_bugs(
+            fields=SPRINT_BUG_FIELDS,
+            components=project.bugzilla_components(),
+            sprint=sprint.name,
+            userid=userid,
+            cookie=cookie,
+            max_age=app.config['SPRINT_SNAPSHOT_MAX_AGE'],
+        ))
+
+    sprints_bugs = parallel_map(
+        fetch, sprints, app.config['BUGZILLA_MAX_CONCURRENCY'])
+    bz.mark_is_blocked(
+        [bug for bugs in sprints_bugs for bug in bugs], userid, cookie)
+    return sprints_bugs
+
+
+def load_bug_details(bugids, userid=None, cookie=None, my_email=None):
+    """Returns bugs for the bug details page with their blockers
+    under 'blockers'
+
+    Bugs asked for by id are fetched with one Bugzilla API request
+    and their blockers with one more. Aliases are fetched one at a
+    time.
+
+    :arg bugids: List of bug ids or aliases as strings
+    :arg userid: (Optional) Bugzilla username
+    :arg cookie: (Optional) Bugzilla cookie for userid
+    :arg my_email: (Optional) Email of the user asking
+
+    :returns: List of bugs in the same order as bugids. Bugs that
+        don't exist or that the user can't see are None.
+
+    """
+    bz = BugzillaTracker(app)
+
+    # The bugs themselves always come from Bugzilla since the mirror
+    # doesn't have comments.
+    ids = [int(bugid) for bugid in bugids if bugid.isdigit()]
+    by_id = dict(
+        (bug['id'], bug) for bug in bz.fetch_bugs_by_id(
+            ids, BUG_DETAILS_FIELDS, userid=userid, cookie=cookie))
+
+    bugs = []
+    for bugid in bugids:
+        if bugid.isdigit():
+            bug = by_id.get(int(bugid))
+        else:
+            bug = (bz.fetch_bug(bugid, userid=userid, cookie=cookie,
+                                fields=BUG_DETAILS_FIELDS)['bugs']
+                   or [None])[0]
+        bugs.append(bug)
+
+    found = list(collections.OrderedDict(
+        (id(bug), bug) for bug in bugs if bug is not None).values())
+    BUG_DETAILS_PIPELINE.run(found)
+
+    blocker_ids = list(collections.OrderedDict.fromkeys(
+        id_ for bug in found for id_ in bug.get('depends_on', [])))
+    if not blocker_ids:
+        blockers = []
+    elif use_bug_mirror(userid):
+        blockers = Bug.bugs_by_id(blocker_ids, BLOCKER_BUG_FIELDS)
+    else:
+        blockers = bz.fetch_bugs_by_id(
+            blocker_ids, BLOCKER_BUG_FIELDS, userid=userid, cookie=cookie)
+    SPRINT_PIPELINE.run(blockers, my_email=my_email)
+    blockers = dict((bug['id'], bug) for bug in blockers)
+
+    for bug in found:
+        # FIXME - this is gross.
+        bug['project_slug'] = slugify(bug['product'])
+        bug['blockers'] = [blockers[id_] for id_ in bug.get('depends_on', [])
+                           if id_ in blockers]
+    return bugs
+
+
 class RegexConverter(BaseConverter):
     def __init__(self, url_map, *items):
         super(RegexConverter, self).__init__(url_map)
@@ -214,7 +957,11 @@ app.url_map.converters['regex'] = RegexConverter
 
 class ProjectListView(MethodView):
     def get(self):
-        projects = db.session.query(Project).all()
+        metadata = get_metadata()
+        if metadata is not None:
+            projects = metadata.projects
+        else:
+            projects = db.session.query(Project).all()
         return jsonify({
             'projects': projects,
         })
@@ -223,59 +970,25 @@ class ProjectListView(MethodView):
 class ProjectDetailsView(MethodView):
     def get(self, projectslug):
         # FIXME - this can raise an error
-        project = db.session.query(Project).filter_by(slug=projectslug).one()
-
-        # FIXME - this can raise an error
-        sprints = (db.session.query(Sprint)
-                   .filter_by(project_id=project.id)
-                   .order_by(Sprint.name)
-                   .all())
+        project, admin, sprints = get_project(
+            projectslug, session.get('username'))
 
-        bugzilla_userid = session.get('Bugzilla_login')
-        bugzilla_cookie = session.get('Bugzilla_logincookie')
+        tracker_bugs = load_tracker_bugs(
+            [project],
+            session.get('Bugzilla_login'),
+            session.get('Bugzilla_logincookie'))[0]
+        trackers = TRACKER_PIPELINE.run(tracker_bugs)
 
-        components = [
-            {'product': project.bugzilla_product, 'component': '__ANY__'}
-        ]
-
-        bz = BugzillaTracker(app)
-        bug_data = bz.fetch_bugs(
-            fields=(
-                'id',
-                'priority',
-                'summary',
-                'last_change_time',
-                'depends_on',
-                'target_milestone',
-            ),
-            components=components,
-            summary='[tracker]',
-            userid=bugzilla_userid,
-            cookie=bugzilla_cookie,
-            status=['UNCONFIRMED', 'NEW', 'ASSIGNED', 'REOPENED'],
-        )
-
-        trackers = bug_data['bugs']
-        for bug in trackers:
-            bug['needinfo'] = []
-
-            for flag in bug.get('flags', []):
-                if flag['name'] == 'needinfo':
-                    needinfo_requestee = flag['requestee']['name']
-                    if '@' in needinfo_requestee:
-                        needinfo_requestee = needinfo_requestee.split('@')[0]
-                    bug['needinfo'].append({
-                        'username': needinfo_requestee,
-                        'name': flag['requestee']['name']
-                    })
-                # FIXME - are there other flags we're interested in?
-
-        return jsonify({
-            'is_admin': is_admin(session.get('username'), project),
+        data = {
+            'is_admin': admin,
             'trackers': trackers,
             'project': project,
             'sprints': sprints
-        })
+        }
+        stream_format = stream_requested()
+        if stream_format:
+            return stream_jsonify(data, 'trackers', stream_format)
+        return jsonify(data)
 
     def post(self, projectslug):
         """This creates a new sprint."""
@@ -316,180 +1029,66 @@ class ProjectDetailsView(MethodView):
 class ProjectSprintView(MethodView):
     def get(self, projectslug, sprintslug):
         # FIXME - this can raise an error
-        project = db.session.query(Project).filter_by(slug=projectslug).one()
-
-        # FIXME - this can raise an error
-        sprint = (db.session.query(Sprint)
-                  .filter_by(project_id=project.id, slug=sprintslug).one())
-        sprints = list((db.session.query(Sprint)
-                        .filter_by(project_id=project.id)
-                        .all()))
-
-        # FIXME - this sorts sprints on (start_date, name) to figure
-        # out prev/next sprints. The code is gross.
-        sprints.sort(key=lambda spr: (
-            spr.start_date.strftime('%Y-%m-%d') if spr.start_date else '',
-            spr.name))
-        next_sprint = None
-        prev_sprint = None
-        for i, spr in enumerate(sprints):
-            if spr.id == sprint.id:
-                if i > 0:
-                    prev_sprint = sprints[i-1]
-                if i < len(sprints) - 1:
-                    next_sprint = sprints[i+1]
-                break
+        project, sprint, admin, prev_sprint, next_sprint = get_sprint(
+            projectslug, sprintslug, request.cookies.get('username'))
 
         bugzilla_userid = session.get('Bugzilla_login')
         bugzilla_cookie = session.get('Bugzilla_logincookie')
         my_email = session.get('username')
         changed_after = request.args.get('since')
 
-        components = [
-            {'product': project.bugzilla_product, 'component': '__ANY__'}
+        bugs = load_sprint_bugs(
+            project, sprint, bugzilla_userid, bugzilla_cookie)
+
+        # Everything else in the response is derived from these, so
+        # an unchanged poll can stop here without enriching or
+        # serializing anything. The bugs' contents go into the ETag
+        # since not every change bumps last_change_time and snapshot
+        # resyncs pick those up.
+        stream_format = stream_requested()
+        latest_change_time = max(
+            [bug['last_change_time'] for bug in bugs] or [None])
+        etag = make_etag(
+            bugzilla_userid, my_email, admin, stream_format,
+            request.query_string,
+            project.__json__(),
+            [spr and spr.__json__()
+             for spr in (prev_sprint, sprint, next_sprint)],
+            sorted(bugs, key=lambda bug: bug['id']))
+        last_modified = parse_bugzilla_time(latest_change_time)
+        resp = not_modified(etag, last_modified)
+        if resp is not None:
+            return resp
+
+        # Extra breakdowns the client asked for, e.g.
+        # ?breakdowns=assignee,status,blocked
+        extra_breakdowns = [
+            name for name in request.args.get('breakdowns', '').split(',')
+            if name in SprintStats.BREAKDOWNS
         ]
+        stats = enrich_sprint_bugs(bugs, my_email, extra_breakdowns)
 
-        bz = BugzillaTracker(app)
-        bug_data = bz.fetch_bugs(
-            fields=(
-                'id',
-                'priority',
-                'summary',
-                'status',
-                'whiteboard',
-                'last_change_time',
-                'component',
-                'depends_on',
-                'flags',
-                'groups',
-                'assigned_to',
-            ),
-            components=components,
-            sprint=sprint.name,
-            userid=bugzilla_userid,
-            cookie=bugzilla_cookie,
-            changed_after=changed_after,
-        )
-
-        bugs = bz.mark_is_blocked(
-            bug_data['bugs'], bugzilla_userid, bugzilla_cookie)
-        total_bugs = len(bugs)
-        closed_bugs = 0
-        total_points = 0
-        closed_points = 0
-        bugs_with_no_points = 0
-
-        priority_breakdown = {}
-        points_breakdown = {}
-        component_breakdown = {}
-
-        for bug in bugs:
-            bug['needinfo'] = []
-            bug['confidentialgroup'] = False
-            bug['securitygroup'] = False
-
-            if bug.get('assigned_to', {}).get('real_name', '').startswith('Nobody'):
-                # This nixes the assigned_to because it's silly long
-                # when no one is assigned to the bug.
-                bug['assigned_to'] = {}
-
-            email = bug.get('assigned_to', {}).get('name')
-            if email and my_email:
-                bug['gravatar_url'] = gravatar_url(email, 40)
-            else:
-                bug['gravatar_url'] = False
-
-            if email and email == my_email:
-                bug['mine'] = True
-            else:
-                bug['mine'] = False
-
-            for flag in bug.get('flags', []):
-                if flag['name'] == 'needinfo':
-                    needinfo_requestee = flag['requestee']['name']
-                    if '@' in needinfo_requestee:
-                        needinfo_requestee = needinfo_requestee.split('@')[0]
-                    bug['needinfo'].append({
-                        'username': needinfo_requestee,
-                        'name': flag['requestee']['name']
-                    })
-                # FIXME - are there other flags we're interested in?
-
-            for group in bug.get('groups', []):
-                if group['name'] == 'mozilla-corporation-confidential':
-                    bug['confidentialgroup'] = True
-                elif group['name'] == 'websites-security':
-                    bug['securitygroup'] = True
-
-            # Pick out whiteboard data
-            wb_data = bz.parse_whiteboard(bug['whiteboard'])
-            bug['sprint'] = wb_data.get('s', None)
-            bug['points'] = wb_data.get('p', None)
-            bug['component'] = wb_data.get('c', None)
-
-            if bug['points'] is None or bug['points'] == '?':
-                bugs_with_no_points += 1
-            else:
-                total_points += bug['points']
-
-            if bug['status'].lower() in ('resolved', 'verified'):
-                if bug['points'] is not None and bug['points'] != '?':
-                    closed_points += bug['points']
-                closed_bugs += 1
-
-            priority_breakdown[bug['priority']] = (
-                priority_breakdown.get(bug['priority'], 0) + 1)
-            points_breakdown[bug['points']] = (
-                points_breakdown.get(bug['points'], 0) + 1)
-            component_breakdown[bug['component']] = (
-                component_breakdown.get(bug['component'], 0) + 1)
+        if changed_after:
+            # The totals and breakdowns cover the whole sprint, but
+            # only the bugs that changed since the client last asked
+            # get sent back.
+            bugs = [bug for bug in bugs
+                    if bug['last_change_time'] > changed_after]
 
-            bug['whiteboardflags'] = wb_data['flags']
-
-        if bug_data['bugs']:
-            latest_change_time = max(
-                [bug.get('last_change_time', 0) for bug in bug_data['bugs']])
-        else:
-            latest_change_time = None
-
-        # FIXME - this is a stopgap until we have sorting in the
-        # table. It tries hard to sort P1 through P5 and then bugs
-        # that don't have a priority (for which the value is the
-        # helpful '--') go at the bottom.
-        bugs.sort(key=lambda bug: (
-            bug.get('priority') if bug.get('priority') != '--' else 'P6')
-        )
-
-        # Convert this to a sorted list of dicts because Angular is Angular.
-        priority_breakdown = [
-            {'priority': key, 'count': priority_breakdown[key]}
-            for key in sorted(priority_breakdown.keys(),
-                              key=lambda p: p if p != '--' else 'P6')]
-        points_breakdown = [
-            {'num': key, 'count': points_breakdown[key]}
-            for key in sorted(points_breakdown.keys(),
-                              key=lambda p: p or '?')]
-        component_breakdown = [
-            {'name': key, 'count': component_breakdown[key]}
-            for key in sorted(component_breakdown.keys())]
-
-        return jsonify({
-            'is_admin': is_admin(request.cookies.get('username'), project),
+        data = {
+            'is_admin': admin,
             'project': project,
             'prev_sprint': prev_sprint,
             'sprint': sprint,
             'next_sprint': next_sprint,
-            'latest_change_time': latest_change_time,
             'bugs': bugs,
-            'total_bugs': total_bugs,
-            'closed_bugs': closed_bugs,
-            'total_points': total_points,
-            'closed_points': closed_points,
-            'bugs_with_no_points': bugs_with_no_points,
-            'priority_breakdown': priority_breakdown,
-            'points_breakdown': points_breakdown,
-            'component_breakdown': component_breakdown,
-        })
+        }
+        data.update(stats)
+        if stream_format:
+            resp = stream_jsonify(data, 'bugs', stream_format)
+        else:
+            resp = jsonify(data)
+        return set_validators(resp, etag, last_modified)
 
     def post(self, projectslug, sprintslug):
         """Update sprint details."""
@@ -525,123 +1124,63 @@ class ProjectSprintView(MethodView):
         })
 
 
-class BugzillaBugDetailsView(MethodView):
-    def get(self, bugid):
+class ProjectSprintEventsView(MethodView):
+    def get(self, projectslug, sprintslug):
+        """Pushes changes to a sprint as Server-Sent Events
+
+        Everyone watching the sprint as the same Bugzilla user shares
+        a poller, so Bugzilla gets polled once per sprint rather than
+        once per browser tab. See :py:class:`ernest.push.SprintPoller`
+        for the events.
+
+        Only available with gevent workers. Each stream holds its
+        worker for as long as the page is open, which would soon tie
+        up every sync worker. Without gevent this 404s and the page
+        falls back to refreshing every so often.
+
+        """
+        if not app.config['GEVENT']:
+            abort(404)
+
+        # FIXME - this can raise an error
+        project, sprint = get_sprint(projectslug, sprintslug, None)[:2]
+
         bugzilla_userid = session.get('Bugzilla_login')
         bugzilla_cookie = session.get('Bugzilla_logincookie')
         my_email = session.get('username')
 
-        bz = BugzillaTracker(app)
-
-        bug_data = bz.fetch_bug(
-            bugid,
-            userid=bugzilla_userid,
-            cookie=bugzilla_cookie,
-            fields=(
-                'id',
-                'priority',
-                'summary',
-                'status',
-                'whiteboard',
-                'last_change_time',
-                'product',
-                'component',
-                'depends_on',
-                'target_milestone',
-                'flags',
-                'comments',
-                'assigned_to',
-                'reported',
-            ))
-        bug_data = bug_data['bugs'][0]
-
-        if bug_data.get('assigned_to', {})['real_name'].startswith('Nobody'):
-            # This nixes the assigned_to because it's silly long
-            # when no one is assigned to the bug.
-            bug_data['assigned_to'] = {}
+        def poll():
+            with app.app_context():
+                try:
+                    bugs = load_sprint_bugs(
+                        project, sprint, bugzilla_userid, bugzilla_cookie)
+                    stats = enrich_sprint_bugs(bugs, my_email)
+                finally:
+                    db.session.remove()
+            return bugs, stats
+
+        key = (sprint.id, hash_identity(bugzilla_userid, bugzilla_cookie),
+               my_email)
+        poller, queue = get_pollers(app).subscribe(key, poll)
+
+        resp = app.response_class(
+            event_stream(poller, queue, app.config['SPRINT_PUSH_HEARTBEAT']),
+            mimetype='text/event-stream')
+        resp.headers['Cache-Control'] = 'no-cache'
+        # Stops nginx and the like from buffering events.
+        resp.headers['X-Accel-Buffering'] = 'no'
+        return resp
 
-        # FIXME - this is gross.
-        bug_data['project_slug'] = slugify(bug_data['product'])
-
-        bug_data['confidentialgroup'] = False
-        bug_data['securitygroup'] = False
-
-        for group in bug_data.get('groups', []):
-            if group['name'] == 'mozilla-corporation-confidential':
-                bug_data['confidentialgroup'] = True
-            elif group['name'] == 'websites-security':
-                bug_data['securitygroup'] = True
-
-        blocker_bug_ids = bug_data.get('depends_on', [])
-        if blocker_bug_ids:
-            # FIXME: Using "private" methods is goofypants.
-            blocker_bugs = bz._fetch_bugs(
-                ids=blocker_bug_ids,
-                userid=bugzilla_userid,
-                cookie=bugzilla_cookie,
-                fields=(
-                    'id',
-                    'priority',
-                    'summary',
-                    'status',
-                    'whiteboard',
-                    'last_change_time',
-                    'component',
-                    'depends_on',
-                    'flags',
-                    'groups',
-                    'assigned_to',
-                ),
-            )
-
-            for bug in blocker_bugs['bugs']:
-                bug['needinfo'] = []
-                bug['confidentialgroup'] = False
-                bug['securitygroup'] = False
-
-                if bug.get('assigned_to', {})['real_name'].startswith('Nobody'):
-                    # This nixes the assigned_to because it's silly long
-                    # when no one is assigned to the bug.
-                    bug['assigned_to'] = {}
-
-                email = bug.get('assigned_to', {}).get('name')
-                if email and my_email:
-                    bug['gravatar_url'] = gravatar_url(email, 40)
-                else:
-                    bug['gravatar_url'] = False
-
-                if email and email == my_email:
-                    bug['mine'] = True
-                else:
-                    bug['mine'] = False
-
-                for flag in bug.get('flags', []):
-                    if flag['name'] == 'needinfo':
-                        needinfo_requestee = flag['requestee']['name']
-                        if '@' in needinfo_requestee:
-                            needinfo_requestee = needinfo_requestee.split('@')[0]
-                        bug['needinfo'].append({
-                            'username': needinfo_requestee,
-                            'name': flag['requestee']['name']
-                        })
-                    # FIXME - are there other flags we're interested in?
-
-                for group in bug.get('groups', []):
-                    if group['name'] == 'mozilla-corporation-confidential':
-                        bug['confidentialgroup'] = True
-                    elif group['name'] == 'websites-security':
-                        bug['securitygroup'] = True
-
-                # Pick out whiteboard data
-                wb_data = bz.parse_whiteboard(bug.get('whiteboard', ''))
-                bug['sprint'] = wb_data.get('s', None)
-                bug['points'] = wb_data.get('p', None)
-                bug['component'] = wb_data.get('c', None)
-
-            bug_data['blockers'] = blocker_bugs['bugs']
 
-        else:
-            bug_data['blockers'] = []
+class BugzillaBugDetailsView(MethodView):
+    def get(self, bugid):
+        bug_data = load_bug_details(
+            [bugid],
+            session.get('Bugzilla_login'),
+            session.get('Bugzilla_logincookie'),
+            session.get('username'))[0]
+        if bug_data is None:
+            abort(404)
 
         # bug_data['comments'] = bz.fetch_comments(bug_data['id'])
 
@@ -650,6 +1189,130 @@ class BugzillaBugDetailsView(MethodView):
         })
 
 
+class BatchView(MethodView):
+    def post(self):
+        """Answers several API requests in one round trip
+
+        Takes ``{"requests": [path, ...]}`` where each path is one of
+        ``/api/project/<project>``, ``/api/project/<project>/<sprint>``
+        or ``/api/bugzilla/bug/<bug>``. Returns ``{"responses": [...]}``
+        in the same order, each with the path, a status and either the
+        body that path would return or an error.
+
+        Sub-requests of the same kind share Bugzilla API requests: the
+        trackers of all the projects are fetched together, the sprints
+        are fetched at the same time with one request for all their
+        blockers, and bugs are fetched with one request for the bugs
+        and one for their blockers.
+
+        """
+        json_data = request.get_json(force=True, silent=True)
+        paths = json_data.get('requests') if isinstance(
+            json_data, dict) else None
+        if (not isinstance(paths, list)
+                or not all(isinstance(path, basestring) for path in paths)):
+            return jsonify({'error': 'Expected a list of requests'}), 400
+        if len(paths) > app.config['BATCH_MAX_REQUESTS']:
+            return jsonify({'error': 'Too many requests'}), 400
+
+        bugzilla_userid = session.get('Bugzilla_login')
+        bugzilla_cookie = session.get('Bugzilla_logincookie')
+        my_email = session.get('username')
+
+        responses = [None] * len(paths)
+
+        def respond(indexes, body):
+            for i in indexes:
+                responses[i] = {'path': paths[i], 'status': 200,
+                                'body': body}
+
+        def fail(indexes, status, error):
+            for i in indexes:
+                responses[i] = {'path': paths[i], 'status': status,
+                                'error': error}
+
+        # Sort the paths out by kind. Each of these maps what's asked
+        # for to the indexes of the paths asking for it, so anything
+        # asked for twice is only loaded once.
+        projects = collections.OrderedDict()
+        sprints = collections.OrderedDict()
+        bugs = collections.OrderedDict()
+        urls = app.url_map.bind('')
+        for i, path in enumerate(paths):
+            try:
+                endpoint, args = urls.match(path, 'GET')
+            except HTTPException:
+                endpoint = None
+            if endpoint == 'project-details':
+                projects.setdefault(args['projectslug'], []).append(i)
+            elif endpoint == 'project-sprint':
+                sprints.setdefault(
+                    (args['projectslug'], args['sprintslug']), []).append(i)
+            elif endpoint == 'bugzilla-bug-details':
+                bugs.setdefault(args['bugid'], []).append(i)
+            else:
+                fail([i], 400, "Can't batch {0}".format(path))
+
+        found_projects = []
+        for projectslug, indexes in projects.items():
+            try:
+                found_projects.append(
+                    (get_project(projectslug, my_email), indexes))
+            except NoResultFound:
+                fail(indexes, 404, 'No such project')
+
+        all_tracker_bugs = load_tracker_bugs(
+            [project_info[0] for project_info, indexes in found_projects],
+            bugzilla_userid, bugzilla_cookie)
+        for (project_info, indexes), tracker_bugs in zip(
+                found_projects, all_tracker_bugs):
+            project, admin, project_sprints = project_info
+            respond(indexes, {
+                'is_admin': admin,
+                'trackers': TRACKER_PIPELINE.run(tracker_bugs),
+                'project': project,
+                'sprints': project_sprints,
+            })
+
+        found_sprints = []
+        for (projectslug, sprintslug), indexes in sprints.items():
+            try:
+                found_sprints.append((get_sprint(
+                    projectslug, sprintslug, request.cookies.get('username')),
+                    indexes))
+            except NoResultFound:
+                fail(indexes, 404, 'No such sprint')
+
+        all_sprint_bugs = load_sprints_bugs(
+            [sprint_info[:2] for sprint_info, indexes in found_sprints],
+            bugzilla_userid, bugzilla_cookie)
+        for (sprint_info, indexes), sprint_bugs in zip(
+                found_sprints, all_sprint_bugs):
+            project, sprint, admin, prev_sprint, next_sprint = sprint_info
+            data = {
+                'is_admin': admin,
+                'project': project,
+                'prev_sprint': prev_sprint,
+                'sprint': sprint,
+                'next_sprint': next_sprint,
+                'bugs': sprint_bugs,
+            }
+            data.update(enrich_sprint_bugs(sprint_bugs, my_email))
+            respond(indexes, data)
+
+        all_bugs = load_bug_details(
+            bugs.keys(), bugzilla_userid, bugzilla_cookie, my_email)
+        for indexes, bug_data in zip(bugs.values(), all_bugs):
+            if bug_data is None:
+                fail(indexes, 404, 'No such bug')
+            else:
+                respond(indexes, {'bug': bug_data})
+
+        return jsonify({
+            'responses': responses,
+        })
+
+
 class LogoutView(MethodView):
     def post(self):
         session.pop('Bugzilla_login', None)
@@ -702,10 +1365,27 @@ class LoginView(MethodView):
 @app.route('/<start>/<path:path>')
 def static_stuff(start=None, path=None):
     """Handles static files and falls back to serving the Angular homepage."""
-    if start in ['css', 'img', 'js', 'font', 'partials']:
-        return send_file('static/%s/%s' % (start, path))
+    assets = get_assets(app)
+    if start == 'partials':
+        partial = assets.partials.get(path)
+        if partial is None:
+            abort(404)
+        return partial.response()
+    elif start in ['css', 'img', 'js', 'font']:
+        return send_static(
+            safe_join(os.path.join(app.static_folder, start), path))
     else:
-        return send_file('static/index.html')
+        return assets.index.response()
+
+
+@app.endpoint('static')
+def static_file(filename):
+    """Serves /static/, where fingerprinted names can be cached forever"""
+    resp = get_assets(app).send_fingerprinted(
+        filename, app.config['STATIC_MAX_AGE'])
+    if resp is None:
+        resp = send_static(safe_join(app.static_folder, filename))
+    return resp
 
 
 # FIXME - we don't use this so far. it allows you to do bugzilla api
@@ -728,6 +1408,9 @@ def favicon():
         mimetype='image/vnd.microsoft.icon')
 
 
+app.add_url_rule(
+    '/api/project/<projectslug>/<sprintslug>/events',
+    view_func=ProjectSprintEventsView.as_view('project-sprint-events'))
 app.add_url_rule(
     '/api/project/<projectslug>/<sprintslug>',
     view_func=ProjectSprintView.as_view('project-sprint'))
@@ -741,6 +1424,7 @@ app.add_url_rule(
     '/api/bugzilla/bug/<bugid>',
     view_func=BugzillaBugDetailsView.as_view('bugzilla-bug-details'))
 
+app.add_url_rule('/api/batch', view_func=BatchView.as_view('batch'))
 app.add_url_rule('/api/logout', view_func=LogoutView.as_view('logout'))
 app.add_url_rule('/api/login', view_func=LoginView.as_view('login'))
 
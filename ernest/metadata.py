@@ -0,0 +1,155 @@
+import threading
+import time
+
+from sqlalchemy import event
+from sqlalchemy.orm.exc import NoResultFound
+
+
+VERSION_KEY = 'metadata:version'
+
+
+def bump_version(cache):
+    """Makes every process reload its Metadata snapshot"""
+    cache.set(VERSION_KEY, repr(time.time()), timeout=0)
+
+
+class Metadata(object):
+    """Snapshot of all the projects, sprints and project admins
+
+    The projects and sprints are detached from the session, so they
+    have to be loaded with everything views use and must not be
+    changed.
+
+    :arg projects: List of Projects
+    :arg sprints: List of Sprints
+    :arg admins: List of (project id, account) pairs
+
+    """
+    def __init__(self, projects, sprints, admins):
+        self.projects = sorted(projects, key=lambda project: project.id)
+        self._projects_by_slug = dict(
+            (project.slug, project) for project in projects)
+        self._sprints_by_slug = dict(
+            ((sprint.project_id, sprint.slug), sprint) for sprint in sprints)
+        # project id -> sprints in order_key order
+        self._sprints = {}
+        for sprint in sorted(sprints, key=lambda sprint: sprint.order_key()):
+            self._sprints.setdefault(sprint.project_id, []).append(sprint)
+        self._admins = frozenset(admins)
+
+    def project(self, slug):
+        """Returns the project with the slug
+
+        :raises NoResultFound: if there isn't one
+
+        """
+        try:
+            return self._projects_by_slug[slug]
+        except KeyError:
+            raise NoResultFound('No project {0!r}'.format(slug))
+
+    def sprint(self, project, slug):
+        """Returns the project's sprint with the slug
+
+        :raises NoResultFound: if there isn't one
+
+        """
+        try:
+            return self._sprints_by_slug[(project.id, slug)]
+        except KeyError:
+            raise NoResultFound('No sprint {0!r}'.format(slug))
+
+    def sprints(self, project):
+        """Returns the project's sprints in name order"""
+        return sorted(self._sprints.get(project.id, ()),
+                      key=lambda sprint: sprint.name)
+
+    def neighbors(self, sprint):
+        """Returns (previous sprint, next sprint) like
+        Sprint.neighbors does"""
+        sprints = self._sprints[sprint.project_id]
+        i = sprints.index(sprint)
+        return (sprints[i - 1] if i > 0 else None,
+                sprints[i + 1] if i < len(sprints) - 1 else None)
+
+    def is_admin(self, username, project):
+        return (project.id, username) in self._admins
+
+
+class MetadataCache(object):
+    """Keeps a Metadata snapshot in the process
+
+    The snapshot is tagged with a version stamp kept in the shared
+    cache. Anything that changes projects, sprints or admins bumps
+    the stamp with :py:func:`bump_version` and the next read in every
+    process sees that it changed and reloads the snapshot. Checking
+    the stamp is a cache lookup, so reads don't touch the database.
+
+    Snapshots are also reloaded after ``timeout`` seconds in case
+    the stamp can't be seen, e.g. with a cache that isn't shared
+    between processes.
+
+    :arg cache: The cache holding the version stamp
+    :arg load: Function returning a new Metadata
+    :arg timeout: Seconds a snapshot is used for at most
+
+    """
+    def __init__(self, cache, load, timeout):
+        self.cache = cache
+        self.load = load
+        self.timeout = timeout
+        # (version, loaded at, Metadata)
+        self._snapshot = None
+        self._lock = threading.Lock()
+
+    def version(self):
+        version = self.cache.get(VERSION_KEY)
+        if version is None:
+            # Nothing has set a version yet or it was evicted. Start
+            # a new one so every process reloads.
+            self.cache.add(VERSION_KEY, repr(time.time()), timeout=0)
+            version = self.cache.get(VERSION_KEY)
+        return version
+
+    def _is_current(self, snapshot, version):
+        return (snapshot is not None
+                and snapshot[0] == version
+                and time.time() - snapshot[1] < self.timeout)
+
+    def get(self):
+        """Returns the current Metadata"""
+        version = self.version()
+        snapshot = self._snapshot
+        if not self._is_current(snapshot, version):
+            with self._lock:
+                snapshot = self._snapshot
+                if not self._is_current(snapshot, version):
+                    snapshot = (version, time.time(), self.load())
+                    self._snapshot = snapshot
+        return snapshot[2]
+
+
+def watch_models(session, models, on_change):
+    """Calls on_change after a commit that changed any of the models
+
+    :arg session: The session or session class to watch
+    :arg models: Tuple of model classes
+    :arg on_change: Function taking no arguments
+
+    """
+    def after_flush(session, flush_context):
+        for obj in session.new | session.dirty | session.deleted:
+            if isinstance(obj, models):
+                session.info['metadata_changed'] = True
+                return
+
+    def after_commit(session):
+        if session.info.pop('metadata_changed', False):
+            on_change()
+
+    def after_rollback(session):
+        session.info.pop('metadata_changed', None)
+
+    event.listen(session, 'after_flush', after_flush)
+    event.listen(session, 'after_commit', after_commit)
+    event.listen(session, 'after_rollback', after_rollback)
@@ -0,0 +1,236 @@
+import datetime
+import logging
+import time
+
+from sqlalchemy import func
+
+from ernest.bugzilla import BugzillaTracker
+from ernest.main import Bug, BugDependency, Project, db
+from ernest.utils import format_bugzilla_time
+
+
+log = logging.getLogger(__name__)
+
+
+# Fields the mirror keeps. Bug.update_from_bugzilla knows what to do
+# with each of them.
+MIRROR_FIELDS = (
+    'id',
+    'product',
+    'component',
+    'status',
+    'priority',
+    'summary',
+    'whiteboard',
+    'target_milestone',
+    'assigned_to',
+    'groups',
+    'last_change_time',
+    'depends_on',
+    'flags',
+)
+
+# Number of ids per IN (...) query. sqlite allows at most 999
+# parameters.
+STORE_CHUNK_SIZE = 500
+
+
+def store_bugs(bugs):
+    """Adds or updates bugs from the Bugzilla API in the mirror
+
+    Doesn't commit.
+
+    :arg bugs: List of bug dicts from the Bugzilla API
+
+    :returns: Number of bugs stored
+
+    """
+    for i in range(0, len(bugs), STORE_CHUNK_SIZE):
+        chunk = bugs[i:i + STORE_CHUNK_SIZE]
+        existing = dict(
+            (bug.id, bug) for bug in Bug.query_with_related().filter(
+                Bug.id.in_([bug['id'] for bug in chunk])))
+
+        for data in chunk:
+            bug = existing.get(data['id'])
+            if bug is None:
+                bug = Bug(id=data['id'])
+                db.session.add(bug)
+            bug.update_from_bugzilla(data)
+    return len(bugs)
+
+
+def mirrored_products():
+    """Returns the Bugzilla products of all the projects"""
+    return sorted(set(
+        product for (product,) in db.session.query(Project.bugzilla_product)
+        if product))
+
+
+def drop_bugs(ids):
+    """Deletes mirrored bugs
+
+    Doesn't commit.
+
+    :arg ids: Iterable of bug ids
+
+    """
+    for id_ in ids:
+        bug = db.session.query(Bug).get(id_)
+        if bug is not None:
+            db.session.delete(bug)
+
+
+def sync_product(bz, product, full=False, sweep=False):
+    """Brings the mirrored bugs in a product up to date
+
+    An incremental sync asks Bugzilla for the bugs that changed since
+    the latest last_change_time in the mirror. A full sync fetches all
+    the bugs.
+
+    A full sync drops mirrored bugs that Bugzilla no longer returns,
+    e.g. ones moved to another product or made private. Those don't
+    show up as changes, so an incremental sync with ``sweep`` asks
+    for the ids of all the bugs in the product and drops the rest.
+    That's a request for the whole product, so it's done every
+    BUG_MIRROR_SWEEP_INTERVAL seconds rather than on every sync.
+
+    Responses aren't cached since nothing reads them again.
+
+    :arg bz: BugzillaTracker
+    :arg product: Bugzilla product name
+    :arg full: Whether to do a full sync
+    :arg sweep: Whether an incremental sync drops bugs that can't be
+        seen anymore
+
+    :returns: Number of bugs stored
+
+    """
+    changed_after = None
+    if not full:
+        watermark = (db.session.query(func.max(Bug.last_change_time))
+                     .filter(Bug.product == product)
+                     .scalar())
+        if watermark is not None:
+            # fetch_bugs only keeps bugs that changed after this, so
+            # go back a second to pick up changes made in the same
+            # second as the last one we have.
+            changed_after = format_bugzilla_time(
+                watermark - datetime.timedelta(seconds=1))
+
+    bug_data = bz.fetch_bugs(
+        fields=MIRROR_FIELDS,
+        components=[{'product': product, 'component': '__ANY__'}],
+        changed_after=changed_after,
+        use_cache=False,
+    )
+    bugs = bug_data['bugs']
+
+    if changed_after is None:
+        ids = set(bug['id'] for bug in bugs)
+    elif sweep:
+        ids = set(bug['id'] for bug in bz.fetch_bugs(
+            fields=('id',),
+            components=[{'product': product, 'component': '__ANY__'}],
+            use_cache=False,
+        )['bugs'])
+        # Leave out bugs made private since they were fetched.
+        bugs = [bug for bug in bugs if bug['id'] in ids]
+    else:
+        ids = None
+
+    if ids is not None:
+        drop_bugs([id_ for (id_,) in (db.session.query(Bug.id)
+                                      .filter(Bug.product == product))
+                   if id_ not in ids])
+
+    count = store_bugs(bugs)
+    db.session.commit()
+    return count
+
+
+def sync_blockers(bz, products):
+    """Brings blockers from other products up to date
+
+    Sprint pages need the statuses of blockers, which can be in
+    products that aren't mirrored. Those are fetched by id every time
+    since there's no cheap way to tell which of them changed.
+
+    :arg bz: BugzillaTracker
+    :arg products: The mirrored products
+
+    :returns: Number of bugs stored
+
+    """
+    in_products = (db.session.query(Bug.id)
+                   .filter(Bug.product.in_(products)))
+    ids = sorted(
+        id_ for (id_,) in (db.session.query(BugDependency.depends_on)
+                           .filter(~BugDependency.depends_on.in_(
+                               in_products))
+                           .distinct()))
+    if not ids:
+        return 0
+
+    bugs = bz.fetch_bugs_by_id(ids, MIRROR_FIELDS, use_cache=False)
+    # Blockers Bugzilla left out have been made private or deleted.
+    found = set(bug['id'] for bug in bugs)
+    drop_bugs([id_ for id_ in ids if id_ not in found])
+    count = store_bugs(bugs)
+    db.session.commit()
+    return count
+
+
+def sync_all(app, full=False, sweep=False):
+    """Syncs every mirrored product and then the blockers
+
+    A product that fails to sync is logged and skipped.
+
+    :arg app: The Flask app
+    :arg full: Whether to do full syncs
+    :arg sweep: Whether incremental syncs drop bugs that can't be
+        seen anymore. See :py:func:`sync_product`.
+
+    """
+    bz = BugzillaTracker(app)
+    try:
+        products = mirrored_products()
+        for product in products:
+            try:
+                count = sync_product(bz, product, full=full, sweep=sweep)
+            except Exception:
+                db.session.rollback()
+                log.exception('Syncing %s failed', product)
+            else:
+                log.info('Synced %s: %d bugs', product, count)
+
+        try:
+            count = sync_blockers(bz, products)
+        except Exception:
+            db.session.rollback()
+            log.exception('Syncing blockers failed')
+        else:
+            log.info('Synced blockers: %d bugs', count)
+    finally:
+        db.session.remove()
+
+
+def run(app, interval, full_interval, sweep_interval):
+    """Syncs every ``interval`` seconds until interrupted
+
+    Does a full sync first and then every ``full_interval`` seconds.
+    Incremental syncs drop bugs that can't be seen anymore every
+    ``sweep_interval`` seconds.
+
+    """
+    next_full = next_sweep = 0
+    while True:
+        started = time.time()
+        full = started >= next_full
+        sweep = started >= next_sweep
+        sync_all(app, full=full, sweep=sweep)
+        if full:
+            next_full = started + full_interval
+        if full or sweep:
+            next_sweep = started + sweep_interval
+        time.sleep(max(0, started + interval - time.time()))
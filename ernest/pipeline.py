@@ -0,0 +1,126 @@
+from ernest.bugzilla import whiteboard_data
+from ernest.utils import gravatar_url
+
+
+CONFIDENTIAL_GROUP = 'mozilla-corporation-confidential'
+SECURITY_GROUP = 'websites-security'
+
+
+# ----------------------------------------
+# Stages
+#
+# Each stage takes a bug and the context dict the pipeline was run
+# with and updates the bug in place.
+# ----------------------------------------
+
+def strip_nobody(bug, context):
+    """Nixes assigned_to when no one is assigned to the bug
+
+    It's silly long when no one is assigned.
+
+    """
+    assigned_to = bug.get('assigned_to')
+    if assigned_to and assigned_to.get('real_name', '').startswith('Nobody'):
+        bug['assigned_to'] = {}
+
+
+def assignee(bug, context):
+    """Adds 'gravatar_url' and 'mine'
+
+    Uses 'my_email' from the context. Gravatar urls are only added
+    for logged in users.
+
+    """
+    my_email = context.get('my_email')
+    email = bug.get('assigned_to', {}).get('name')
+
+    if email and my_email:
+        # Sprints have lots of bugs but few assignees, so don't hash
+        # the same email over and over.
+        urls = context.setdefault('gravatar_urls', {})
+        url = urls.get(email)
+        if url is None:
+            url = urls[email] = gravatar_url(email, 40)
+        bug['gravatar_url'] = url
+    else:
+        bug['gravatar_url'] = False
+
+    bug['mine'] = bool(email) and email == my_email
+
+
+def needinfo(bug, context):
+    """Adds 'needinfo' listing who needinfo is requested of"""
+    needinfos = []
+    for flag in bug.get('flags', ()):
+        if flag['name'] == 'needinfo':
+            name = flag['requestee']['name']
+            needinfos.append({
+                'username': name.split('@', 1)[0],
+                'name': name
+            })
+        # FIXME - are there other flags we're interested in?
+    bug['needinfo'] = needinfos
+
+
+def groups(bug, context):
+    """Adds 'confidentialgroup' and 'securitygroup'"""
+    names = [group['name'] for group in bug.get('groups', ())]
+    bug['confidentialgroup'] = CONFIDENTIAL_GROUP in names
+    bug['securitygroup'] = SECURITY_GROUP in names
+
+
+def whiteboard(bug, context):
+    """Adds 'sprint', 'points', 'component' and 'whiteboardflags'
+
+    These are picked out of the whiteboard. Note that this replaces
+    the Bugzilla component with the whiteboard one. Bugs from the
+    mirror come with the whiteboard already parsed in '_whiteboard'.
+
+    """
+    wb_data = bug.pop('_whiteboard', None)
+    if wb_data is None:
+        wb_data = whiteboard_data(bug.get('whiteboard', ''))
+    bug['sprint'] = wb_data.sprint
+    bug['points'] = wb_data.points
+    bug['component'] = wb_data.component
+    bug['whiteboardflags'] = list(wb_data.flags)
+
+
+# ----------------------------------------
+# Pipelines
+# ----------------------------------------
+
+class Pipeline(object):
+    """Runs a sequence of stages over a list of bugs in one pass
+
+    :arg stages: Stage functions to run on each bug in order
+
+    """
+    def __init__(self, *stages):
+        self.stages = stages
+
+    def run(self, bugs, **context):
+        """Runs the stages over the bugs
+
+        :arg bugs: List of bugs which are updated in place
+        :arg context: Values stages can use, e.g. 'my_email'
+
+        :returns: The bugs
+
+        """
+        stages = self.stages
+        for bug in bugs:
+            for stage in stages:
+                stage(bug, context)
+        return bugs
+
+
+# Bugs listed in a sprint or as blockers of a bug.
+SPRINT_PIPELINE = Pipeline(strip_nobody, assignee, needinfo, groups,
+                           whiteboard)
+
+# Tracker bugs listed on the project page.
+TRACKER_PIPELINE = Pipeline(needinfo)
+
+# The bug on the bug details page.
+BUG_DETAILS_PIPELINE = Pipeline(strip_nobody, groups)
@@ -0,0 +1,188 @@
+import logging
+import Queue
+import threading
+import time
+
+from ernest.encoding import dumps
+
+
+log = logging.getLogger(__name__)
+
+_pollers_lock = threading.Lock()
+
+
+def format_event(event, data):
+    """Returns a Server-Sent Event with data encoded as JSON"""
+    return 'event: {0}\ndata: {1}\n\n'.format(event, dumps(data))
+
+
+class SprintPoller(object):
+    """Polls a sprint for everyone watching it and pushes what changed
+
+    The first poll is pushed as a 'snapshot' event with all the bugs
+    and the sprint's totals and breakdowns. After that, polls that
+    changed something are pushed as 'update' events. Those have only
+    the bugs that changed, the ids of bugs that left the sprint under
+    'removed', and the totals and breakdowns. Subscribers that join
+    later get a snapshot of the latest poll.
+
+    Polling happens in a thread that runs while there are
+    subscribers. Each event is encoded once no matter how many
+    subscribers there are.
+
+    :arg poll: Function returning (bugs, stats) for the sprint
+    :arg interval: Seconds between polls
+
+    """
+    def __init__(self, poll, interval):
+        self.poll = poll
+        self.interval = interval
+        self.subscribers = set()
+        # The latest poll: list of bugs, id -> bug and stats
+        self.bugs = None
+        self.bugs_by_id = None
+        self.stats = None
+        self._thread = None
+        self._lock = threading.Lock()
+
+    def snapshot(self):
+        data = dict(self.stats)
+        data['bugs'] = self.bugs
+        return format_event('snapshot', data)
+
+    def subscribe(self):
+        """Subscribes to events
+
+        :returns: Queue events are put in
+
+        """
+        queue = Queue.Queue()
+        with self._lock:
+            self.subscribers.add(queue)
+            if self.bugs is not None:
+                queue.put(self.snapshot())
+            if self._thread is None:
+                self._thread = threading.Thread(target=self.run)
+                self._thread.daemon = True
+                self._thread.start()
+        return queue
+
+    def unsubscribe(self, queue):
+        with self._lock:
+            self.subscribers.discard(queue)
+
+    def is_idle(self):
+        return self._thread is None
+
+    def poll_once(self):
+        """Polls the sprint and pushes what changed"""
+        bugs, stats = self.poll()
+        bugs_by_id = dict((bug['id'], bug) for bug in bugs)
+
+        with self._lock:
+            if self.bugs is None:
+                self.bugs, self.bugs_by_id, self.stats = (
+                    bugs, bugs_by_id, stats)
+                event = self.snapshot()
+            else:
+                changed = [bug for bug in bugs
+                           if self.bugs_by_id.get(bug['id']) != bug]
+                removed = sorted(set(self.bugs_by_id) - set(bugs_by_id))
+                if changed or removed or stats != self.stats:
+                    data = dict(stats)
+                    data['bugs'] = changed
+                    data['removed'] = removed
+                    event = format_event('update', data)
+                else:
+                    event = None
+                self.bugs, self.bugs_by_id, self.stats = (
+                    bugs, bugs_by_id, stats)
+
+            if event is not None:
+                for queue in self.subscribers:
+                    queue.put(event)
+
+    def run(self):
+        while True:
+            with self._lock:
+                if not self.subscribers:
+                    self._thread = None
+                    return
+            try:
+                self.poll_once()
+            except Exception:
+                log.exception('Polling sprint failed')
+            time.sleep(self.interval)
+
+
+class SprintPollers(object):
+    """The SprintPollers of a process, one for each key
+
+    :arg interval: Seconds between polls
+
+    """
+    def __init__(self, interval):
+        self.interval = interval
+        self._pollers = {}
+        self._lock = threading.Lock()
+
+    def subscribe(self, key, poll):
+        """Subscribes to the poller for key
+
+        :arg key: Key of the poller, e.g. the sprint and who's asking
+        :arg poll: Function to poll with if there's no poller yet
+
+        :returns: (poller, queue)
+
+        """
+        with self._lock:
+            # Drop pollers nobody is watching anymore. Their last poll
+            # is too old to start anyone off with.
+            for other_key, poller in self._pollers.items():
+                if poller.is_idle():
+                    del self._pollers[other_key]
+
+            poller = self._pollers.get(key)
+            if poller is None:
+                poller = SprintPoller(poll, self.interval)
+                self._pollers[key] = poller
+            return poller, poller.subscribe()
+
+
+def get_pollers(app):
+    """Returns the SprintPollers for the app
+
+    :arg app: The Flask app
+
+    """
+    pollers = app.extensions.get('ernest_pollers')
+    if pollers is None:
+        with _pollers_lock:
+            pollers = app.extensions.get('ernest_pollers')
+            if pollers is None:
+                pollers = SprintPollers(app.config['SPRINT_PUSH_INTERVAL'])
+                app.extensions['ernest_pollers'] = pollers
+    return pollers
+
+
+def event_stream(poller, queue, heartbeat):
+    """Generates the Server-Sent Events put in queue
+
+    A comment is sent every ``heartbeat`` seconds that nothing else
+    is, so proxies don't close the connection and the server notices
+    when the client is gone. The subscription ends when the response
+    is closed.
+
+    :arg poller: The SprintPoller
+    :arg queue: The queue from subscribing to it
+    :arg heartbeat: Seconds between heartbeats
+
+    """
+    try:
+        while True:
+            try:
+                yield queue.get(timeout=heartbeat)
+            except Queue.Empty:
+                yield ': heartbeat\n\n'
+    finally:
+        poller.unsubscribe(queue)
@@ -0,0 +1,135 @@
+import datetime
+import logging
+import random
+import time
+
+from ernest.bugzilla import BugzillaTracker
+from ernest.main import SPRINT_BUG_FIELDS, Project, Sprint, db
+
+
+log = logging.getLogger(__name__)
+
+
+def current_sprints(now):
+    """Returns (project, sprint) for every sprint that's on now
+
+    :arg now: naive UTC datetime
+
+    """
+    today = now.replace(hour=0, minute=0, second=0, microsecond=0)
+    return (db.session.query(Project, Sprint)
+            .join(Sprint, Sprint.project_id == Project.id)
+            .filter(Sprint.start_date <= now, Sprint.end_date >= today)
+            .all())
+
+
+class SprintRefresher(object):
+    """Keeps the cached snapshots of current sprints up to date
+
+    Each sprint is refreshed every ``interval`` seconds give or take
+    ``jitter * interval`` so that sprints don't all hit Bugzilla at
+    the same time.
+
+    Refreshing a sprint does what the sprint view does with the cache:
+    brings the sprint's snapshot up to date and fetches the statuses
+    of its blockers. It's done without a Bugzilla login, so only views
+    for people who aren't logged in find it. The views use snapshots
+    that were refreshed in the last SPRINT_SNAPSHOT_MAX_AGE seconds
+    without asking Bugzilla.
+
+    This is only any use with a cache that's shared between processes,
+    i.e. CACHE_TYPE = 'memcached'.
+
+    :arg app: The Flask app
+    :arg interval: Seconds between refreshes of a sprint
+    :arg jitter: Fraction of interval to randomly vary it by
+
+    """
+    def __init__(self, app, interval, jitter):
+        self.app = app
+        self.interval = interval
+        self.jitter = jitter
+        # sprint id -> time.time() when it's next due
+        self.due = {}
+
+    def next_due(self, now):
+        return now + self.interval * random.uniform(
+            1 - self.jitter, 1 + self.jitter)
+
+    def refresh_sprint(self, project, sprint):
+        """Refreshes one sprint
+
+        Each refresh gets a new tracker, like each request does, since
+        a tracker remembers every bug it sees and never asks Bugzilla
+        about them again.
+
+        :returns: Number of bugs in the sprint
+
+        """
+        bz = BugzillaTracker(self.app)
+        bugs = bz.fetch_sprint_bugs(
+            fields=SPRINT_BUG_FIELDS,
+            components=project.bugzilla_components(),
+            sprint=sprint.name,
+            prefetch_blockers=True,
+        )
+        bz.mark_is_blocked(bugs)
+        return len(bugs)
+
+    def refresh_due(self, now, stagger=True):
+        """Refreshes the sprints that are due
+
+        :arg now: time.time()
+        :arg stagger: Whether to spread sprints seen for the first time
+            over the first ``jitter * interval`` seconds rather than
+            refresh them now
+
+        :returns: time.time() when the next sprint is due
+
+        """
+        try:
+            sprints = current_sprints(datetime.datetime.utcfromtimestamp(now))
+        finally:
+            db.session.remove()
+
+        due = {}
+        for project, sprint in sprints:
+            if sprint.id in self.due:
+                due[sprint.id] = self.due[sprint.id]
+            elif stagger:
+                due[sprint.id] = (
+                    now + self.interval * self.jitter * random.random())
+            else:
+                due[sprint.id] = now
+            if due[sprint.id] > now:
+                continue
+
+            try:
+                count = self.refresh_sprint(project, sprint)
+            except Exception:
+                log.exception('Refreshing %s %s failed', project.name,
+                              sprint.name)
+            else:
+                log.info('Refreshed %s %s: %d bugs', project.name,
+                         sprint.name, count)
+            due[sprint.id] = self.next_due(now)
+
+        # Sprints that are over drop out.
+        self.due = due
+        return min(due.values()) if due else now + self.interval
+
+    def run(self, once=False):
+        """Refreshes sprints as they come due until interrupted
+
+        :arg once: Refresh every current sprint once and return
+
+        """
+        if once:
+            self.refresh_due(time.time(), stagger=False)
+            return
+
+        while True:
+            next_due = self.refresh_due(time.time())
+            # Look for new sprints at least once an interval.
+            time.sleep(max(0, min(next_due, time.time() + self.interval)
+                           - time.time()))
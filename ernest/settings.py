@@ -44,6 +44,203 @@ SECRET_KEY = os.environ.get('SECRET_KEY')
 #     )
 # )
 
+# ------------------------------------------------
+# Web server
+# ------------------------------------------------
+
+# The gunicorn worker class, which gunicorn_config.py reads too. With
+# 'sync', each worker handles one request at a time, so a few slow
+# Bugzilla requests tie up every worker. With 'gevent', each worker
+# handles up to WEB_WORKER_CONNECTIONS requests at once and waits on
+# Bugzilla, postgres and everything else on the network without
+# blocking the others. pylibmc still blocks, but memcached answers
+# fast enough that it doesn't matter.
+WEB_WORKER_CLASS = os.environ.get('WEB_WORKER_CLASS', 'sync')
+GEVENT = WEB_WORKER_CLASS == 'gevent'
+
+# ------------------------------------------------
+# Bugzilla API
+# ------------------------------------------------
+
+# Connection pooling for requests to the Bugzilla API. The pool is
+# shared by all requests handled by a process.
+#
+# BUGZILLA_POOL_CONNECTIONS is the number of hosts to keep pools for
+# and BUGZILLA_POOL_MAXSIZE is the number of connections kept open
+# per host. If BUGZILLA_POOL_BLOCK is True, requests wait for a free
+# connection rather than opening one beyond the limit.
+#
+# gevent workers have many more requests in flight, so they get a
+# bigger pool and wait for a connection rather than open hundreds of
+# them to Bugzilla.
+BUGZILLA_POOL_CONNECTIONS = int(
+    os.environ.get('BUGZILLA_POOL_CONNECTIONS', 4))
+BUGZILLA_POOL_MAXSIZE = int(
+    os.environ.get('BUGZILLA_POOL_MAXSIZE', 100 if GEVENT else 10))
+BUGZILLA_POOL_BLOCK = truthiness(
+    os.environ.get('BUGZILLA_POOL_BLOCK', GEVENT))
+
+# How many times to retry a Bugzilla API request that failed to
+# connect or read (e.g. a pooled connection the server already
+# closed) and the backoff factor in seconds between retries.
+BUGZILLA_RETRY_TOTAL = int(os.environ.get('BUGZILLA_RETRY_TOTAL', 2))
+BUGZILLA_RETRY_BACKOFF = float(
+    os.environ.get('BUGZILLA_RETRY_BACKOFF', 0.2))
+
+# Maximum number of Bugzilla API requests a single page load makes
+# at the same time, e.g. when a query is split across several
+# products.
+BUGZILLA_MAX_CONCURRENCY = int(
+    os.environ.get('BUGZILLA_MAX_CONCURRENCY', 4))
+
+# Maximum number of bug ids to ask for in a single Bugzilla API
+# request. Longer lists are split across several requests.
+BUGZILLA_MAX_IDS_PER_REQUEST = int(
+    os.environ.get('BUGZILLA_MAX_IDS_PER_REQUEST', 200))
+
+# Bugzilla responses are decoded as they're read rather than after
+# the whole body has been read. This is the number of bytes read at a
+# time.
+BUGZILLA_STREAM_CHUNK_SIZE = int(
+    os.environ.get('BUGZILLA_STREAM_CHUNK_SIZE', 64 * 1024))
+
+# Seconds to cache Bugzilla API responses for. Cached responses are
+# per Bugzilla login, so users never see each other's private bugs.
+BUGZILLA_CACHE_TIMEOUT = int(os.environ.get('BUGZILLA_CACHE_TIMEOUT', 60))
+
+# Once a cached response is older than BUGZILLA_CACHE_TIMEOUT, it's
+# served for BUGZILLA_CACHE_STALE more seconds while one request
+# refreshes it and for up to BUGZILLA_CACHE_MAX_STALE more seconds if
+# refreshing it fails.
+BUGZILLA_CACHE_STALE = int(os.environ.get('BUGZILLA_CACHE_STALE', 300))
+BUGZILLA_CACHE_MAX_STALE = int(
+    os.environ.get('BUGZILLA_CACHE_MAX_STALE', 3600))
+
+# Seconds to remember the fields of individual bugs for. These are
+# shared between views, e.g. blocker statuses on the sprint page and
+# blockers on the bug details page.
+BUGZILLA_BUG_CACHE_TIMEOUT = int(
+    os.environ.get('BUGZILLA_BUG_CACHE_TIMEOUT', 60))
+
+# Sprint pages keep a snapshot of the sprint's bugs that's updated
+# with only the bugs that changed since the last fetch. This is how
+# often in seconds the snapshot is thrown away and rebuilt from
+# scratch to pick up changes Bugzilla's changed_after misses.
+SPRINT_SNAPSHOT_RESYNC = int(os.environ.get('SPRINT_SNAPSHOT_RESYNC', 600))
+
+# Sprint snapshots brought up to date less than this many seconds ago
+# are used as is without asking Bugzilla for changes. Set this to a
+# bit more than SPRINT_REFRESH_INTERVAL when running
+# "manage.py refresh_sprints".
+SPRINT_SNAPSHOT_MAX_AGE = int(os.environ.get('SPRINT_SNAPSHOT_MAX_AGE', 0))
+
+# How often in seconds "manage.py refresh_sprints" refreshes each
+# current sprint and the fraction of that it randomly varies by.
+SPRINT_REFRESH_INTERVAL = int(os.environ.get('SPRINT_REFRESH_INTERVAL', 60))
+SPRINT_REFRESH_JITTER = float(os.environ.get('SPRINT_REFRESH_JITTER', 0.2))
+
+# Sprint pages that are open get changes pushed to them. Each sprint
+# is polled every SPRINT_PUSH_INTERVAL seconds for as long as anyone
+# is watching it, once for everyone watching as the same Bugzilla
+# user. A heartbeat is sent every SPRINT_PUSH_HEARTBEAT seconds that
+# nothing else is. Each open page holds a connection, so this wants
+# WEB_WORKER_CLASS = 'gevent'.
+SPRINT_PUSH_INTERVAL = int(os.environ.get('SPRINT_PUSH_INTERVAL', 30))
+SPRINT_PUSH_HEARTBEAT = int(os.environ.get('SPRINT_PUSH_HEARTBEAT', 15))
+
+# Maximum number of sub-requests in one request to /api/batch.
+BATCH_MAX_REQUESTS = int(os.environ.get('BATCH_MAX_REQUESTS', 20))
+
+# ------------------------------------------------
+# Bug mirror
+# ------------------------------------------------
+
+# Whether pages for people who aren't logged into Bugzilla are built
+# from the bugs mirrored in the database rather than asking Bugzilla.
+# The mirror only has public bugs, so people who are logged in always
+# get theirs from Bugzilla. Keep it up to date with
+# "manage.py sync_bugs --loop".
+BUG_MIRROR = truthiness(os.environ.get('BUG_MIRROR', False))
+
+# How often in seconds "manage.py sync_bugs --loop" syncs the bugs
+# that changed and how often it does a full sync, which picks up bugs
+# that left a product or were made private.
+BUG_MIRROR_SYNC_INTERVAL = int(
+    os.environ.get('BUG_MIRROR_SYNC_INTERVAL', 60))
+BUG_MIRROR_FULL_SYNC_INTERVAL = int(
+    os.environ.get('BUG_MIRROR_FULL_SYNC_INTERVAL', 24 * 60 * 60))
+
+# How often in seconds a sync also asks for the ids of every bug in
+# each product to drop bugs that were made private since, rather than
+# waiting for the next full sync. That's a request for every bug in
+# the product, so it's not done on every sync.
+BUG_MIRROR_SWEEP_INTERVAL = int(
+    os.environ.get('BUG_MIRROR_SWEEP_INTERVAL', 15 * 60))
+
+# ------------------------------------------------
+# Cache
+# ------------------------------------------------
+
+# Which cache to use for Bugzilla data. One of:
+#
+# * 'null': don't cache anything
+# * 'lru': in-process cache holding at most CACHE_LRU_MAXSIZE items
+# * 'memcached': memcached via pylibmc using the CACHE_MEMCACHED_*
+#   settings, which ernest/main.py fills in from the MEMCACHIER_*
+#   environment variables on Heroku. Requires pylibmc. Falls back to
+#   'lru' with a warning if pylibmc isn't installed.
+CACHE_TYPE = os.environ.get(
+    'CACHE_TYPE',
+    'memcached' if os.environ.get('MEMCACHIER_SERVERS') else 'lru')
+CACHE_DEFAULT_TIMEOUT = int(os.environ.get('CACHE_DEFAULT_TIMEOUT', 300))
+CACHE_LRU_MAXSIZE = int(os.environ.get('CACHE_LRU_MAXSIZE', 500))
+# With 'lru', the bugs that requests share are cached one per item in
+# an LRU of their own holding at most this many. In the one above, a
+# single big sprint would evict every cached response and snapshot.
+CACHE_LRU_BUG_MAXSIZE = int(os.environ.get('CACHE_LRU_BUG_MAXSIZE', 5000))
+CACHE_KEY_PREFIX = os.environ.get('CACHE_KEY_PREFIX', 'ernest:')
+# Connections to memcached each process keeps. Requests wait for a
+# free one when they're all in use, so raise this along with the
+# number of threads or greenlets a worker runs.
+CACHE_MEMCACHED_POOL_SIZE = int(
+    os.environ.get('CACHE_MEMCACHED_POOL_SIZE', 10))
+
+# Whether to keep projects, sprints and project admins in memory
+# rather than query them on every request. Changes made through the
+# app or manage.py show up in every process right away since the
+# version stamp is kept in the shared cache. That only works with
+# memcached, so it's off by default otherwise: with 'lru', other
+# processes wouldn't see changes for METADATA_CACHE_TIMEOUT seconds.
+METADATA_CACHE = truthiness(
+    os.environ.get('METADATA_CACHE', CACHE_TYPE == 'memcached'))
+METADATA_CACHE_TIMEOUT = int(os.environ.get('METADATA_CACHE_TIMEOUT', 60))
+
+# ------------------------------------------------
+# Static files
+# ------------------------------------------------
+
+# Whether to keep index.html, the partials and the fingerprinted names
+# of static files in memory. Turn this off while working on them so
+# changes show up without restarting.
+STATIC_CACHE = truthiness(os.environ.get('STATIC_CACHE', not DEBUG))
+
+# Seconds browsers can cache fingerprinted static files for.
+STATIC_MAX_AGE = int(os.environ.get('STATIC_MAX_AGE', 365 * 24 * 60 * 60))
+
+# ------------------------------------------------
+# Compression
+# ------------------------------------------------
+
+# API responses smaller than this many bytes aren't compressed. Static
+# files smaller than this don't get precompressed copies.
+COMPRESS_MIN_SIZE = int(os.environ.get('COMPRESS_MIN_SIZE', 1024))
+
+# gzip level (1-9) and brotli quality (0-11) for API responses. These
+# are lower than the maximums because they're paid on every request.
+# brotli is only used if it's installed.
+COMPRESS_GZIP_LEVEL = int(os.environ.get('COMPRESS_GZIP_LEVEL', 6))
+COMPRESS_BROTLI_QUALITY = int(os.environ.get('COMPRESS_BROTLI_QUALITY', 5))
+
 # This imports settings_local.py thus everything in that file
 # overrides what's in this file.
 try:
@@ -134,6 +134,7 @@ ernest.controller('SprintDetailCtrl', ['$scope', '$routeParams', '$http', '$q',
         $scope.nobugs = false;
 
         $scope.autoRefreshInterval = null;
+        $scope.eventSource = null;
         $scope.enabledAutoRefresh = false;
         $scope.enable_disable_auto_refresh = 'Enable autorefresh';
 
@@ -244,17 +245,80 @@ ernest.controller('SprintDetailCtrl', ['$scope', '$routeParams', '$http', '$q',
             }
         };
 
+        function stopAutoRefresh() {
+            if ($scope.autoRefreshInterval !== null) {
+                $interval.cancel($scope.autoRefreshInterval);
+                $scope.autoRefreshInterval = null;
+            }
+            if ($scope.eventSource !== null) {
+                $scope.eventSource.close();
+                $scope.eventSource = null;
+            }
+        }
+
+        function startPolling() {
+            // Refresh the data every 10 minutes. Since it does a GH
+            // API request, we probably don't want to do it more often
+            // than that.
+            $scope.autoRefreshInterval = $interval($scope.refresh, 10 * 60 * 1000);
+        }
+
+        function startAutoRefresh() {
+            if (!window.EventSource) {
+                startPolling();
+                return;
+            }
+
+            // The server pushes the bugs that changed along with the
+            // totals and breakdowns. See ernest/push.py.
+            var url = ('/api/project/' + $routeParams.projSlug + '/' +
+                       $routeParams.sprintSlug + '/events');
+            $scope.eventSource = new EventSource(url);
+            // A snapshot comes first, and again after reconnecting. It
+            // has all the bugs, so anything missing from it is gone.
+            $scope.eventSource.addEventListener('snapshot', function(event) {
+                var data = JSON.parse(event.data);
+                var ids = {};
+                data.bugs.forEach(function(bug) {
+                    ids[bug.id] = true;
+                });
+                data.removed = $scope.bugs.filter(function(bug) {
+                    return !ids[bug.id];
+                }).map(function(bug) {
+                    return bug.id;
+                });
+                $scope.$apply(function() {
+                    applyUpdate(data);
+                });
+            });
+            $scope.eventSource.addEventListener('update', function(event) {
+                $scope.$apply(function() {
+                    applyUpdate(JSON.parse(event.data));
+                });
+            });
+            // The browser reconnects on its own after a dropped
+            // connection. It gives up if the server doesn't push
+            // events (it only does with gevent workers), so poll
+            // instead.
+            $scope.eventSource.addEventListener('error', function() {
+                if ($scope.eventSource === null ||
+                    $scope.eventSource.readyState !== EventSource.CLOSED) {
+                    return;
+                }
+                $scope.eventSource.close();
+                $scope.eventSource = null;
+                $scope.$apply(startPolling);
+            });
+        }
+
         $scope.changeEnabledAutoRefresh = function() {
             if ($scope.enabledAutoRefresh) {
                 $scope.enabledAutoRefresh = false;
-                if ($scope.autoRefreshInterval !== null) {
-                    $interval.cancel($scope.autoRefreshInterval);
-                    $scope.autoRefreshInterval = null;
-                }
+                stopAutoRefresh();
                 $scope.enable_disable_auto_refresh = 'Enable autorefresh';
             } else {
                 $scope.enabledAutoRefresh = true;
-                $scope.autoRefreshInterval = $interval($scope.refresh, 10 * 60 * 1000);
+                startAutoRefresh();
                 $scope.enable_disable_auto_refresh = 'Disable autorefresh';
             }
         };
@@ -289,6 +353,67 @@ ernest.controller('SprintDetailCtrl', ['$scope', '$routeParams', '$http', '$q',
                 });
         };
 
+        function applyStats(data) {
+            $scope.bugs_with_no_points = data.bugs_with_no_points;
+            $scope.latest_change_time = data.latest_change_time;
+            $scope.total_bugs = data.total_bugs;
+            $scope.closed_bugs = data.closed_bugs;
+            $scope.total_points = data.total_points;
+            $scope.closed_points = data.closed_points;
+            $scope.priority_breakdown = data.priority_breakdown;
+            $scope.points_breakdown = data.points_breakdown;
+            $scope.component_breakdown = data.component_breakdown;
+
+            if ($scope.bugs_with_no_points > 0 || $scope.total_points === 0) {
+                $scope.completionState = 'notready';
+            } else if ($scope.closed_points === $scope.total_points) {
+                $scope.completionState = 'done';
+            } else if ($scope.closed_points > $scope.total_points / 2) {
+                $scope.completionState = 'almost';
+            } else {
+                $scope.completionState = 'incomplete';
+            }
+        }
+
+        function applyUpdate(data) {
+            // Swap in the bugs that changed, keeping the pull
+            // requests we already know about, and drop the ones that
+            // left the sprint.
+            var removed = {};
+            data.removed.forEach(function(id) {
+                removed[id] = true;
+            });
+            var changed = {};
+            data.bugs.forEach(function(bug) {
+                changed[bug.id] = bug;
+            });
+
+            var bugs = [];
+            $scope.bugs.forEach(function(bug) {
+                if (removed[bug.id]) {
+                    return;
+                }
+                var newBug = changed[bug.id];
+                if (newBug) {
+                    newBug.pulls = bug.pulls;
+                    delete changed[bug.id];
+                    bug = newBug;
+                }
+                bugs.push(bug);
+            });
+            data.bugs.forEach(function(bug) {
+                if (changed[bug.id]) {
+                    bug.pulls = [];
+                    bugs.push(bug);
+                }
+            });
+
+            $scope.bugs = bugs;
+            $scope.nobugs = bugs.length === 0;
+            applyStats(data);
+            $scope.last_load = new Date();
+        }
+
         function getData() {
             $scope.$emit('loading+');
 
@@ -304,28 +429,10 @@ ernest.controller('SprintDetailCtrl', ['$scope', '$routeParams', '$http', '$q',
                         $scope.show_hide_closed = 'Show closed';
                     }
 
-                    $scope.bugs_with_no_points = data.bugs_with_no_points;
-                    $scope.latest_change_time = data.latest_change_time;
                     $scope.prev_sprint = data.prev_sprint;
                     $scope.sprint = data.sprint;
                     $scope.next_sprint = data.next_sprint;
-                    $scope.total_bugs = data.total_bugs;
-                    $scope.closed_bugs = data.closed_bugs;
-                    $scope.total_points = data.total_points;
-                    $scope.closed_points = data.closed_points;
-                    $scope.priority_breakdown = data.priority_breakdown;
-                    $scope.points_breakdown = data.points_breakdown;
-                    $scope.component_breakdown = data.component_breakdown;
-
-                    if ($scope.bugs_with_no_points > 0 || $scope.total_points === 0) {
-                        $scope.completionState = 'notready';
-                    } else if ($scope.closed_points === $scope.total_points) {
-                        $scope.completionState = 'done';
-                    } else if ($scope.closed_points > $scope.total_points / 2) {
-                        $scope.completionState = 'almost';
-                    } else {
-                        $scope.completionState = 'incomplete';
-                    }
+                    applyStats(data);
 
                     if ($scope.bugs.length === 0) {
                         $scope.nobugs = true;
@@ -395,14 +502,7 @@ ernest.controller('SprintDetailCtrl', ['$scope', '$routeParams', '$http', '$q',
         }
 
         getData();
-        // Refresh the data every 10 minutes. Since it does a GH API
-        // request, we probably don't want to do it more often than
-        // that.
-        $scope.$on('$destroy', function() {
-            if ($scope.autoRefreshInterval !== null) {
-                $interval.cancel($scope.autoRefreshInterval);
-            }
-        });
+        $scope.$on('$destroy', stopAutoRefresh);
     }
 ]);
 
@@ -0,0 +1,182 @@
+from itertools import compress
+from operator import and_, itemgetter, methodcaller
+
+
+CLOSED_STATUSES = frozenset(['resolved', 'verified'])
+
+
+def priority_key(priority):
+    """Sort key that puts P1 through P5 first and '--' last"""
+    return priority if priority != '--' else 'P6'
+
+
+def points_key(points):
+    """Sort key for points which puts unestimated bugs last"""
+    return points or '?'
+
+
+def is_estimated(points):
+    """Whether points is a number rather than None or '?'"""
+    return isinstance(points, (int, long)) and not isinstance(points, bool)
+
+
+def count_values(column):
+    """Returns a dict of value -> number of times it's in column
+
+    Columns have few distinct values compared to their length, so
+    letting list.count do the counting beats a Python loop.
+
+    """
+    return dict((value, column.count(value)) for value in set(column))
+
+
+class SprintStats(object):
+    """Totals and breakdowns for the bugs in a sprint
+
+    Each column the stats need is pulled out of the bug dicts once,
+    the first time it's needed. Everything else is computed from the
+    columns with builtins that loop in C rather than in Python.
+
+    :arg bugs: List of bugs that have been through the sprint
+        pipeline and, for the 'blocked' breakdown, mark_is_blocked
+
+    """
+    # Breakdown name -> (column, key name in the output, sort key)
+    BREAKDOWNS = {
+        'priority': ('priorities', 'priority', priority_key),
+        'points': ('points', 'num', points_key),
+        'component': ('components', 'name', None),
+        'assignee': ('assignees', 'name', None),
+        'status': ('statuses', 'status', None),
+        'blocked': ('blocked', 'blocked', None),
+    }
+
+    # Breakdowns the sprint page always gets.
+    DEFAULT_BREAKDOWNS = ('priority', 'points', 'component')
+
+    def __init__(self, bugs):
+        self.bugs = bugs
+        self._columns = {}
+
+    def _column(self, name, make):
+        column = self._columns.get(name)
+        if column is None:
+            column = self._columns[name] = make()
+        return column
+
+    @property
+    def priorities(self):
+        return self._column(
+            'priorities', lambda: map(itemgetter('priority'), self.bugs))
+
+    @property
+    def points(self):
+        return self._column(
+            'points', lambda: map(itemgetter('points'), self.bugs))
+
+    @property
+    def statuses(self):
+        return self._column(
+            'statuses', lambda: map(itemgetter('status'), self.bugs))
+
+    @property
+    def components(self):
+        return self._column(
+            'components', lambda: map(itemgetter('component'), self.bugs))
+
+    @property
+    def assignees(self):
+        return self._column('assignees', lambda: [
+            bug.get('assigned_to', {}).get('name') for bug in self.bugs])
+
+    @property
+    def blocked(self):
+        return self._column('blocked', lambda: map(
+            methodcaller('get', 'is_blocked', False), self.bugs))
+
+    @property
+    def change_times(self):
+        return self._column('change_times', lambda: map(
+            methodcaller('get', 'last_change_time'), self.bugs))
+
+    @property
+    def closed(self):
+        """Column of whether each bug is closed"""
+        def make():
+            values = frozenset(
+                status for status in set(self.statuses)
+                if status.lower() in CLOSED_STATUSES)
+            return map(values.__contains__, self.statuses)
+        return self._column('closed', make)
+
+    @property
+    def estimated(self):
+        """Column of whether each bug has been estimated"""
+        def make():
+            values = frozenset(
+                points for points in set(self.points)
+                if is_estimated(points))
+            return map(values.__contains__, self.points)
+        return self._column('estimated', make)
+
+    @property
+    def total_bugs(self):
+        return len(self.bugs)
+
+    @property
+    def closed_bugs(self):
+        return sum(self.closed)
+
+    @property
+    def total_points(self):
+        return sum(compress(self.points, self.estimated))
+
+    @property
+    def closed_points(self):
+        return sum(compress(self.points, map(and_, self.closed,
+                                             self.estimated)))
+
+    @property
+    def bugs_with_no_points(self):
+        return self.total_bugs - sum(self.estimated)
+
+    @property
+    def latest_change_time(self):
+        change_times = filter(None, self.change_times)
+        return max(change_times) if change_times else None
+
+    def breakdown(self, name):
+        """Returns counts of bugs grouped by a column
+
+        Angular wants a sorted list of dicts rather than a dict.
+
+        :arg name: One of the keys in BREAKDOWNS
+
+        :returns: List of ``{<key name>: value, 'count': count}``
+
+        """
+        column, key_name, sort_key = self.BREAKDOWNS[name]
+        counts = count_values(getattr(self, column))
+        return [
+            {key_name: key, 'count': counts[key]}
+            for key in sorted(counts, key=sort_key)
+        ]
+
+    def as_dict(self, extra=()):
+        """Returns the totals and breakdowns for the sprint page
+
+        :arg extra: Names of breakdowns to include on top of
+            DEFAULT_BREAKDOWNS. Each goes in '<name>_breakdown'.
+
+        """
+        data = {
+            'latest_change_time': self.latest_change_time,
+            'total_bugs': self.total_bugs,
+            'closed_bugs': self.closed_bugs,
+            'total_points': self.total_points,
+            'closed_points': self.closed_points,
+            'bugs_with_no_points': self.bugs_with_no_points,
+        }
+        for name in self.DEFAULT_BREAKDOWNS + tuple(extra):
+            data[name + '_breakdown'] = self.breakdown(name)
+        return data
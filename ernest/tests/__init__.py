@@ -11,3 +11,18 @@ class TestCase(unittest.TestCase):
 
     def tearDown(self):
         pass
+
+
+class DBTestCase(TestCase):
+    """TestCase with the tables created in an in-memory sqlite db"""
+    def setUp(self):
+        super(DBTestCase, self).setUp()
+        self.app.config['SQLALCHEMY_DATABASE_URI'] = 'sqlite://'
+        main.db.create_all()
+        # Drop snapshots of earlier tests' databases.
+        self.app.extensions.pop('ernest_metadata', None)
+
+    def tearDown(self):
+        main.db.session.remove()
+        main.db.drop_all()
+        super(DBTestCase, self).tearDown()
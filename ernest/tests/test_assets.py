@@ -0,0 +1,64 @@
+import os
+import shutil
+import tempfile
+
+from nose.tools import eq_
+
+from ernest.assets import StaticAssets, fingerprint
+from ernest.main import app
+from ernest.tests import TestCase
+
+
+INDEX = '''<html><head>
+<link rel="stylesheet" href="/static/css/ernest.css"/>
+</head><body>
+<script src="/static/js/app.js"></script>
+<script src="/static/js/missing.js"></script>
+</body></html>'''
+
+
+class StaticAssetsTestCase(TestCase):
+    def setUp(self):
+        super(StaticAssetsTestCase, self).setUp()
+        self.static = tempfile.mkdtemp()
+        for path, data in (('index.html', INDEX),
+                           ('css/ernest.css', 'body {}'),
+                           ('js/app.js', 'var x;'),
+                           ('js/app.js.gz', 'not fingerprinted'),
+                           ('partials/home.html', '<p>{{ hi }}</p>')):
+            full_path = os.path.join(self.static, path)
+            if not os.path.isdir(os.path.dirname(full_path)):
+                os.makedirs(os.path.dirname(full_path))
+            with open(full_path, 'w') as fp:
+                fp.write(data)
+
+    def tearDown(self):
+        shutil.rmtree(self.static)
+        super(StaticAssetsTestCase, self).tearDown()
+
+    def test_manifest(self):
+        assets = StaticAssets(self.static)
+        eq_(assets.manifest['js/app.js'], fingerprint('js/app.js', 'var x;'))
+        eq_(assets.originals[assets.manifest['js/app.js']], 'js/app.js')
+        assert 'js/app.js.gz' not in assets.manifest
+
+    def test_index(self):
+        assets = StaticAssets(self.static)
+        eq_(assets.index.data, INDEX
+            .replace('/static/css/ernest.css',
+                     '/static/' + assets.manifest['css/ernest.css'])
+            .replace('/static/js/app.js',
+                     '/static/' + assets.manifest['js/app.js'])
+            .replace('</body>',
+                     '<script type="text/ng-template" '
+                     'id="/partials/home.html"><p>{{ hi }}</p></script>\n'
+                     '</body>'))
+
+    def test_send_fingerprinted(self):
+        assets = StaticAssets(self.static)
+        with app.test_request_context('/'):
+            resp = assets.send_fingerprinted(
+                assets.manifest['js/app.js'], 100)
+            eq_(resp.headers['Cache-Control'],
+                'public, max-age=100, immutable')
+            eq_(assets.send_fingerprinted('js/app.js', 100), None)
@@ -0,0 +1,78 @@
+import json
+
+from nose.tools import eq_
+
+from . import DBTestCase
+from .test_bugzilla import FakeSession
+from ernest.bugzilla import BugzillaTracker
+from ernest.main import Project, db
+
+
+class BatchTestCase(DBTestCase):
+    def setUp(self):
+        super(BatchTestCase, self).setUp()
+        for name, product in (('SUMO', 'support'), ('Input', 'input')):
+            project = Project(name)
+            project.bugzilla_product = product
+            db.session.add(project)
+        db.session.commit()
+        BugzillaTracker(self.app).cache.clear()
+
+    def tearDown(self):
+        self.app.extensions.pop('bugzilla_session', None)
+        super(BatchTestCase, self).tearDown()
+
+    def fake_bugzilla(self, *responses):
+        session = FakeSession([json.dumps({'bugs': bugs})
+                               for bugs in responses])
+        self.app.extensions['bugzilla_session'] = session
+        return session
+
+    def batch(self, paths):
+        resp = self.client.post('/api/batch',
+                                data=json.dumps({'requests': paths}))
+        eq_(resp.status_code, 200)
+        return json.loads(resp.data)['responses']
+
+    def test_bad_requests(self):
+        eq_(self.client.post('/api/batch', data='nope').status_code, 400)
+        eq_(self.client.post('/api/batch', data=json.dumps(
+            {'requests': ['/api/project'] * 100})).status_code, 400)
+
+        responses = self.batch(['/api/project', '/api/project/nope'])
+        eq_([(resp['status'], resp['error']) for resp in responses],
+            [(400, "Can't batch /api/project"), (404, 'No such project')])
+
+    def test_projects_share_a_request(self):
+        session = self.fake_bugzilla([
+            {'id': 1, 'product': 'input', 'summary': '[tracker] a'},
+            {'id': 2, 'product': 'support', 'summary': '[tracker] b'},
+        ])
+        responses = self.batch(['/api/project/sumo', '/api/project/input',
+                                '/api/project/sumo'])
+
+        eq_(len(session.requests), 1)
+        eq_(session.requests[0][2]['product'], ['support', 'input'])
+        eq_([resp['body']['project']['slug'] for resp in responses],
+            ['sumo', 'input', 'sumo'])
+        eq_([[bug['id'] for bug in resp['body']['trackers']]
+             for resp in responses],
+            [[2], [1], [2]])
+        assert 'product' not in responses[0]['body']['trackers'][0]
+
+    def test_bugs_share_requests(self):
+        session = self.fake_bugzilla(
+            [{'id': 5, 'product': 'support', 'depends_on': [7, 8]},
+             {'id': 6, 'product': 'support', 'depends_on': [8]}],
+            [{'id': 7, 'status': 'NEW'}, {'id': 8, 'status': 'NEW'}])
+        responses = self.batch(['/api/bugzilla/bug/5', '/api/bugzilla/bug/6',
+                                '/api/bugzilla/bug/9'])
+
+        # One request for the bugs and one for all their blockers.
+        eq_([params['id'] for method, url, params in session.requests],
+            ['5,6,9', '7,8'])
+        eq_([resp['status'] for resp in responses], [200, 200, 404])
+        eq_([[blocker['id'] for blocker in resp['body']['bug']['blockers']]
+             for resp in responses[:2]],
+            [[7, 8], [8]])
+        eq_(responses[0]['body']['bug']['project_slug'], 'support')
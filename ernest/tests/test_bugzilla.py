@@ -1,10 +1,46 @@
+import json
+
 from nose.tools import eq_
 
 from . import TestCase
-from ernest.bugzilla import BugzillaTracker
+from ernest.bugzilla import (
+    BugzillaTracker, Whiteboard, parse_whiteboards, tokenize_whiteboard)
+from ernest.cache import LRUCache
+
+
+class FakeResponse(object):
+    def __init__(self, text, status_code=200):
+        self.text = text
+        self.status_code = status_code
+
+    def iter_content(self, chunk_size=1):
+        body = self.text.encode('utf-8')
+        for i in range(0, len(body), chunk_size):
+            yield body[i:i + chunk_size]
+
+
+class FakeSession(object):
+    """Stands in for requests.Session and records the requests made
+
+    :arg text: The response body or a list of response bodies to
+        return in order
+
+    """
+    def __init__(self, text='{"bugs": []}'):
+        self.texts = text if isinstance(text, list) else [text]
+        self.requests = []
+
+    def request(self, method, url, params=None, **kwargs):
+        self.requests.append((method, url, params))
+        text = self.texts[min(len(self.requests), len(self.texts)) - 1]
+        return FakeResponse(text)
 
 
 class BugzillaTestCase(TestCase):
+    def setUp(self):
+        super(BugzillaTestCase, self).setUp()
+        BugzillaTracker(self.app).cache.clear()
+
     def test_parse_whiteboard(self):
         bz = BugzillaTracker(self.app)
 
@@ -31,3 +67,214 @@ class BugzillaTestCase(TestCase):
 
         for text, expected in tests:
             eq_(bz.parse_whiteboard(text), expected)
+
+    def test_parse_whiteboards(self):
+        eq_(parse_whiteboards(['u=user c=comp p=? s=2013.20 [foo]', '']),
+            [Whiteboard('user', 'comp', '2013.20', '?', ('foo',), ()),
+             Whiteboard(None, None, None, None, (), ())])
+
+    def test_tokenize_whiteboard(self):
+        eq_(tokenize_whiteboard('[foo] [a=b] u=user r=rel p=3 [bar]'),
+            Whiteboard('user', '', '', 3, ('foo', 'a=b', 'bar'),
+                       (('r', 'rel'),)))
+
+    def test_session_is_shared(self):
+        bz1 = BugzillaTracker(self.app)
+        bz2 = BugzillaTracker(self.app)
+        assert bz1.session is bz2.session
+
+        adapter = bz1.session.get_adapter(self.app.config['BUGZILLA_API_URL'])
+        eq_(adapter._pool_maxsize, self.app.config['BUGZILLA_POOL_MAXSIZE'])
+
+    def test_fetch_bugs_is_cached_per_identity(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession('{"bugs": [{"id": 1}]}')
+
+        eq_(bz.fetch_bug(1), {'bugs': [{'id': 1}]})
+        eq_(bz.fetch_bug(1), {'bugs': [{'id': 1}]})
+        eq_(len(bz.session.requests), 1)
+
+        bz.fetch_bug(1, userid='1', cookie='abc')
+        eq_(len(bz.session.requests), 2)
+
+        bz.fetch_bug(1, refresh=True)
+        eq_(len(bz.session.requests), 3)
+
+    def test_invalidate_cache(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession()
+
+        bz.fetch_bug(1)
+        bz.invalidate_cache()
+        bz.fetch_bug(1)
+        eq_(len(bz.session.requests), 2)
+
+    def test_fetch_sprint_bugs_merges_changes(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession([
+            json.dumps({'bugs': [
+                {'id': 1, 'status': 'NEW', 'last_change_time': '2014-01-01'},
+                {'id': 2, 'status': 'NEW', 'last_change_time': '2014-01-02'},
+            ]}),
+            json.dumps({'bugs': [
+                {'id': 2, 'status': 'RESOLVED',
+                 'last_change_time': '2014-01-03'},
+            ]}),
+        ])
+        components = [{'product': 'support', 'component': '__ANY__'}]
+
+        bugs = bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        eq_(sorted(bug['id'] for bug in bugs), [1, 2])
+
+        bugs = bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        eq_(sorted((bug['id'], bug['status']) for bug in bugs),
+            [(1, 'NEW'), (2, 'RESOLVED')])
+        eq_(bz.session.requests[1][2]['changed_after'], '2014-01-02')
+
+    def test_fetch_sprint_bugs_gets_changes_in_the_same_second(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession([
+            json.dumps({'bugs': [
+                {'id': 1, 'status': 'NEW',
+                 'last_change_time': '2014-01-02T00:00:00Z'},
+            ]}),
+            # Resolved in the same second as the snapshot's watermark.
+            json.dumps({'bugs': [
+                {'id': 1, 'status': 'RESOLVED',
+                 'last_change_time': '2014-01-02T00:00:00Z'},
+            ]}),
+        ])
+        components = [{'product': 'support', 'component': '__ANY__'}]
+
+        bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        bugs = bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        eq_([(bug['id'], bug['status']) for bug in bugs], [(1, 'RESOLVED')])
+        eq_(bz.session.requests[1][2]['changed_after'],
+            '2014-01-01T23:59:59Z')
+
+    def test_fetch_sprint_bugs_uses_fresh_snapshot(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession(json.dumps({'bugs': [
+            {'id': 1, 'status': 'NEW', 'last_change_time': '2014-01-01'},
+        ]}))
+        components = [{'product': 'support', 'component': '__ANY__'}]
+
+        bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        bugs = bz.fetch_sprint_bugs(('status',), components, '2014.1',
+                                    max_age=60)
+        eq_([bug['id'] for bug in bugs], [1])
+        eq_(len(bz.session.requests), 1)
+
+        bz.fetch_sprint_bugs(('status',), components, '2014.1')
+        eq_(len(bz.session.requests), 2)
+
+    def test_mark_is_blocked_caches_blocker_statuses(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession(json.dumps({'bugs': [
+            {'id': 10, 'status': 'NEW'},
+            {'id': 11, 'status': 'RESOLVED'},
+        ]}))
+
+        def make_bugs():
+            return [
+                {'id': 1, 'status': 'NEW', 'depends_on': [10]},
+                {'id': 2, 'status': 'NEW', 'depends_on': [11]},
+                {'id': 3, 'status': 'NEW', 'depends_on': []},
+            ]
+
+        bugs = bz.mark_is_blocked(make_bugs())
+        eq_([bug['is_blocked'] for bug in bugs], [True, False, False])
+        eq_(bugs[0]['open_blockers'], [10])
+
+        bugs = bz.mark_is_blocked(make_bugs())
+        eq_([bug['is_blocked'] for bug in bugs], [True, False, False])
+        eq_(len(bz.session.requests), 1)
+
+        eq_(bz.fetch_statuses([10, 11]), {10: 'NEW', 11: 'RESOLVED'})
+        eq_(len(bz.session.requests), 1)
+
+    def test_fetch_bugs_splits_long_id_lists(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession()
+        self.app.config['BUGZILLA_MAX_IDS_PER_REQUEST'] = 2
+        try:
+            bz._fetch_bugs(ids=[1, 2, 3, 2, 4, 5], fields=('id',))
+        finally:
+            self.app.config['BUGZILLA_MAX_IDS_PER_REQUEST'] = 200
+
+        eq_(sorted(params['id'] for method, url, params
+                   in bz.session.requests),
+            ['1,2', '3,4', '5'])
+
+    def test_fetch_bugs_by_id_only_fetches_whats_missing(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession([
+            json.dumps({'bugs': [
+                {'id': 1, 'status': 'NEW'},
+                {'id': 2, 'status': 'RESOLVED'},
+            ]}),
+            json.dumps({'bugs': [
+                {'id': 1, 'summary': 'one'},
+                {'id': 2, 'summary': 'two'},
+            ]}),
+        ])
+
+        eq_(bz.fetch_statuses([1, 2]), {1: 'NEW', 2: 'RESOLVED'})
+        eq_(bz.fetch_bugs_by_id([2], ('status',)),
+            [{'id': 2, 'status': 'RESOLVED'}])
+        eq_(len(bz.session.requests), 1)
+
+        eq_(bz.fetch_bugs_by_id([1, 2], ('status', 'summary')),
+            [{'id': 1, 'status': 'NEW', 'summary': 'one'},
+             {'id': 2, 'status': 'RESOLVED', 'summary': 'two'}])
+        eq_(bz.session.requests[1][2]['include_fields'], 'id,summary')
+
+        # A new tracker (i.e. the next request) gets them from the
+        # cache.
+        bz2 = BugzillaTracker(self.app)
+        bz2.session = FakeSession()
+        eq_(bz2.fetch_statuses([1, 2]), {1: 'NEW', 2: 'RESOLVED'})
+        eq_(len(bz2.session.requests), 0)
+
+    def test_fetch_bug_by_alias_keeps_fields(self):
+        bz = BugzillaTracker(self.app)
+        bz.session = FakeSession(json.dumps({'bugs': [{'id': 1}]}))
+        bz.fetch_bug('some-alias', fields=('id', 'summary'))
+        eq_(bz.session.requests[0][2]['id'], 'some-alias')
+        eq_(bz.session.requests[0][2]['include_fields'], 'id,summary')
+
+    def test_many_bugs_dont_evict_the_generation(self):
+        bz = BugzillaTracker(self.app)
+        bz.cache = LRUCache(maxsize=5)
+        generation = bz.cache_generation()
+        bz.session = FakeSession(json.dumps({'bugs': [
+            {'id': i, 'status': 'NEW'} for i in range(20)]}))
+        bz.fetch_statuses(range(20))
+        eq_(bz.cache_generation(), generation)
+
+    def test_many_bugs_dont_evict_responses(self):
+        bz = BugzillaTracker(self.app)
+        bugs = [{'id': i, 'status': 'NEW'}
+                for i in range(self.app.config['CACHE_LRU_MAXSIZE'] + 1)]
+        bz.session = FakeSession([json.dumps({'bugs': []}),
+                                  json.dumps({'bugs': bugs})])
+        components = [{'product': 'support', 'component': '__ANY__'}]
+
+        bz.fetch_bugs(('status',), components)
+        bz.fetch_statuses([bug['id'] for bug in bugs])
+        count = len(bz.session.requests)
+        bz.fetch_bugs(('status',), components)
+        eq_(len(bz.session.requests), count)
+
+    def test_fetch_bugs_streams_response(self):
+        bz = BugzillaTracker(self.app)
+        bugs = [{'id': i, 'summary': u'bug \u2603 {0}'.format(i)}
+                for i in range(10)]
+        bz.session = FakeSession(json.dumps({'bugs': bugs, 'total': 10}))
+        self.app.config['BUGZILLA_STREAM_CHUNK_SIZE'] = 3
+        try:
+            bug_data = bz._fetch_bugs(ids=range(10), fields=('summary',))
+        finally:
+            self.app.config['BUGZILLA_STREAM_CHUNK_SIZE'] = 64 * 1024
+
+        eq_(bug_data, {'bugs': bugs, 'total': 10})
@@ -0,0 +1,386 @@
+import Queue
+import contextlib
+import sys
+import threading
+import time
+import types
+
+from nose.tools import eq_, assert_raises
+
+from ernest.cache import (LRUCache, MemcachedCache, NullCache, SingleFlight,
+                          build_cache, fetch_through, hash_identity, make_key)
+from ernest.main import app
+
+
+class FakeMemcachedError(Exception):
+    pass
+
+
+class FakeMemcachedClient(object):
+    """Stands in for pylibmc.Client
+
+    Clones share the data and whether memcached is down.
+
+    """
+    def __init__(self, servers, server=None, **kwargs):
+        self.servers = servers
+        self.kwargs = kwargs
+        self.server = server or {'data': {}, 'down': False}
+        self.behaviors = {}
+
+    def clone(self):
+        return FakeMemcachedClient(self.servers, self.server, **self.kwargs)
+
+    @property
+    def data(self):
+        if self.server['down']:
+            raise FakeMemcachedError('down')
+        return self.server['data']
+
+    def get(self, key):
+        return self.data.get(key)
+
+    def get_multi(self, keys, key_prefix=''):
+        return dict((key, self.data[key_prefix + key]) for key in keys
+                    if key_prefix + key in self.data)
+
+    def set(self, key, value, time=0):
+        self.data[key] = value
+
+    def set_multi(self, mapping, time=0, key_prefix=''):
+        for key, value in mapping.items():
+            self.set(key_prefix + key, value, time)
+
+    def add(self, key, value, time=0):
+        if key in self.data:
+            return False
+        self.set(key, value, time)
+        return True
+
+    def delete(self, key):
+        self.data.pop(key, None)
+
+    def flush_all(self):
+        self.data.clear()
+
+
+class FakeClientPool(object):
+    """Stands in for pylibmc.ClientPool and records who borrowed what"""
+    def __init__(self):
+        self.clients = Queue.Queue()
+        self.reserved = []
+
+    def fill(self, client, pool_size):
+        for i in range(pool_size):
+            self.clients.put(client.clone())
+
+    @contextlib.contextmanager
+    def reserve(self, block=False):
+        client = self.clients.get(block)
+        self.reserved.append(client)
+        try:
+            yield client
+        finally:
+            self.clients.put(client)
+
+
+def make_fake_pylibmc():
+    module = types.ModuleType('pylibmc')
+    module.Client = FakeMemcachedClient
+    module.ClientPool = FakeClientPool
+    module.Error = FakeMemcachedError
+    return module
+
+
+@contextlib.contextmanager
+def fake_pylibmc(module=None):
+    """Makes importing pylibmc give module
+
+    :arg module: (Optional) The module. Defaults to a fake one. With
+        False, importing it fails like it isn't installed.
+
+    """
+    if module is None:
+        module = make_fake_pylibmc()
+    elif module is False:
+        # None in sys.modules makes importing it fail.
+        module = None
+    old = sys.modules.get('pylibmc')
+    sys.modules['pylibmc'] = module
+    try:
+        yield module
+    finally:
+        if old is None:
+            del sys.modules['pylibmc']
+        else:
+            sys.modules['pylibmc'] = old
+
+
+def test_null_cache():
+    cache = NullCache()
+    cache.set('foo', 'bar')
+    eq_(cache.get('foo'), None)
+
+
+def test_lru_cache_get_set_delete():
+    cache = LRUCache()
+    eq_(cache.get('foo'), None)
+    cache.set('foo', {'bugs': [1, 2]})
+    eq_(cache.get('foo'), {'bugs': [1, 2]})
+    cache.delete('foo')
+    eq_(cache.get('foo'), None)
+
+
+def test_lru_cache_copies_values():
+    cache = LRUCache()
+    cache.set('foo', {'bugs': [1, 2]})
+    cache.get('foo')['bugs'].append(3)
+    eq_(cache.get('foo'), {'bugs': [1, 2]})
+
+
+def test_lru_cache_evicts_least_recently_used():
+    cache = LRUCache(maxsize=2)
+    cache.set('a', 1)
+    cache.set('b', 2)
+    cache.get('a')
+    cache.set('c', 3)
+    eq_(cache.get('a'), 1)
+    eq_(cache.get('b'), None)
+    eq_(cache.get('c'), 3)
+
+
+def test_lru_cache_keeps_items_that_never_expire():
+    cache = LRUCache(maxsize=2)
+    cache.set('generation', 1, timeout=0)
+    for key in 'abc':
+        cache.set(key, key)
+    eq_(cache.get('generation'), 1)
+    eq_([cache.get(key) for key in 'abc'], [None, 'b', 'c'])
+    eq_(cache.add('generation', 2, timeout=0), False)
+
+    # Setting it with a timeout makes it evictable again.
+    cache.set('generation', 3)
+    cache.set('d', 'd')
+    cache.set('e', 'e')
+    eq_(cache.get('generation'), None)
+
+
+def test_lru_cache_expires():
+    cache = LRUCache()
+    cache.set('foo', 'bar', timeout=0.01)
+    time.sleep(0.02)
+    eq_(cache.get('foo'), None)
+
+
+def test_memcached_cache():
+    with fake_pylibmc():
+        cache = MemcachedCache(['localhost:11211'], 'user', 'secret',
+                               key_prefix='test:')
+    eq_(cache.get('foo'), None)
+    cache.set('foo', 1)
+    eq_(cache.get('foo'), 1)
+    cache.set_many({'bar': 2, 'baz': 3})
+    eq_(cache.get_many(['foo', 'bar', 'nope']), {'foo': 1, 'bar': 2})
+    eq_(cache.add('foo', 4), False)
+    eq_(cache.add('qux', 4), True)
+    cache.delete('foo')
+    eq_(cache.get('foo'), None)
+
+    client = cache._pool.reserved[0]
+    eq_(sorted(client.server['data']), ['test:bar', 'test:baz', 'test:qux'])
+    eq_(client.kwargs,
+        {'binary': True, 'username': 'user', 'password': 'secret'})
+
+    cache.clear()
+    eq_(cache.get('bar'), None)
+
+
+def test_memcached_cache_errors_are_misses():
+    with fake_pylibmc():
+        cache = MemcachedCache(['localhost:11211'])
+    cache.set('foo', 1)
+    cache._pool.reserved[0].server['down'] = True
+
+    eq_(cache.get('foo'), None)
+    eq_(cache.get_many(['foo']), {})
+    cache.set('foo', 2)
+    cache.delete('foo')
+    # Better for everyone to go ahead than for no one to.
+    eq_(cache.add('foo', 3), True)
+
+
+def test_memcached_cache_shares_clients():
+    with fake_pylibmc():
+        cache = MemcachedCache(['localhost:11211'], pool_size=2)
+
+    def work():
+        for i in range(10):
+            cache.set('foo', i)
+            cache.get('foo')
+
+    threads = [threading.Thread(target=work) for i in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    eq_(len(cache._pool.reserved), 100)
+    eq_(len(set(map(id, cache._pool.reserved))), 2)
+
+
+def test_build_cache_without_pylibmc():
+    config = dict(app.config, CACHE_TYPE='memcached')
+    with fake_pylibmc():
+        assert isinstance(build_cache(config), MemcachedCache)
+
+    with fake_pylibmc(False):
+        assert isinstance(build_cache(config), LRUCache)
+
+
+def test_make_key_normalizes_params():
+    identity = hash_identity(None, None)
+    eq_(make_key('bug', {'product': ['a', 'b'], 'status': 'NEW'}, identity),
+        make_key('bug', {'status': 'NEW', 'product': ['b', 'a']}, identity))
+
+
+def test_make_key_varies_by_identity():
+    params = {'product': ['a']}
+    anon = make_key('bug', params, hash_identity(None, None))
+    user1 = make_key('bug', params, hash_identity('1', 'cookie1'))
+    user2 = make_key('bug', params, hash_identity('2', 'cookie2'))
+    eq_(len(set([anon, user1, user2])), 3)
+
+
+def test_lru_cache_add():
+    cache = LRUCache()
+    eq_(cache.add('foo', 1), True)
+    eq_(cache.add('foo', 2), False)
+    eq_(cache.get('foo'), 1)
+    cache.set('bar', 1, timeout=-1)
+    eq_(cache.add('bar', 2), True)
+
+
+def test_fetch_through_fresh_and_stale():
+    cache = LRUCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return len(calls)
+
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60), 1)
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60), 1)
+
+    # Stale and someone else has the lock, so it's served stale.
+    cache.set('foo', (time.time() - 1, 'stale'))
+    cache.add('foo:lock', True)
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60, stale=60), 'stale')
+    eq_(len(calls), 1)
+
+    # Without the lock this caller refreshes it.
+    cache.delete('foo:lock')
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60, stale=60), 2)
+    eq_(cache.get('foo:lock'), None)
+
+
+def test_fetch_through_waits_for_other_process():
+    cache = LRUCache()
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return 'mine'
+
+    # Too old to serve stale and another process has the lock.
+    cache.set('foo', (time.time() - 100, 'old'))
+    cache.add('foo:lock', True)
+
+    def other_process():
+        time.sleep(0.1)
+        cache.set('foo', (time.time() + 60, 'theirs'))
+
+    thread = threading.Thread(target=other_process)
+    thread.start()
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60, stale=10,
+                      lock_timeout=5), 'theirs')
+    thread.join()
+    eq_(calls, [])
+    # Their lock is theirs to release.
+    eq_(cache.get('foo:lock'), True)
+
+
+def test_fetch_through_stale_caller_leaves_no_lock():
+    cache = LRUCache()
+    started = threading.Event()
+    release = threading.Event()
+
+    def fetch():
+        started.set()
+        release.wait()
+        return 'new'
+
+    cache.set('foo', (time.time() - 1, 'stale'))
+    thread = threading.Thread(target=fetch_through, args=(
+        cache, 'foo', fetch, 60, 60))
+    thread.start()
+    started.wait()
+    # The refresh is in flight in this process.
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60, stale=60), 'stale')
+    release.set()
+    thread.join()
+    eq_(cache.get('foo:lock'), None)
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60), 'new')
+
+
+def test_fetch_through_max_stale():
+    cache = LRUCache()
+
+    def fetch():
+        raise ValueError('bugzilla is down')
+
+    cache.set('foo', (time.time() - 10, 'stale'))
+    eq_(fetch_through(cache, 'foo', fetch, timeout=60, max_stale=60),
+        'stale')
+
+    cache.set('foo', (time.time() - 100, 'stale'))
+    with assert_raises(ValueError):
+        fetch_through(cache, 'foo', fetch, timeout=60, max_stale=60)
+
+
+def test_fetch_through_coalesces():
+    started = threading.Event()
+    release = threading.Event()
+    calls = []
+    results = []
+
+    def fetch():
+        calls.append(1)
+        started.set()
+        release.wait()
+        return {'bugs': []}
+
+    def get():
+        results.append(fetch_through(NullCache(), 'foo', fetch, timeout=60))
+
+    threads = [threading.Thread(target=get) for i in range(3)]
+    threads[0].start()
+    started.wait()
+    for thread in threads[1:]:
+        thread.start()
+    # Give the others a chance to get to waiting.
+    time.sleep(0.2)
+    release.set()
+    for thread in threads:
+        thread.join()
+
+    eq_(len(calls), 1)
+    eq_(results, [{'bugs': []}] * 3)
+    # They don't share a value.
+    eq_(len(set(map(id, results))), 3)
+
+
+def test_single_flight_clears_failed_calls():
+    flight = SingleFlight()
+    with assert_raises(ValueError):
+        flight.do('foo', lambda: int('x'))
+    eq_(flight.do('foo', lambda: 1), (1, False))
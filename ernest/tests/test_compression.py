@@ -0,0 +1,71 @@
+import gzip
+import json
+import mimetypes
+import os
+import shutil
+import tempfile
+from StringIO import StringIO
+
+from nose.tools import eq_
+
+from ernest.compression import (compress_response, compress_static,
+                                send_static)
+from ernest.encoding import jsonify
+from ernest.main import app
+from ernest.tests import TestCase
+
+
+def gunzip(data):
+    return gzip.GzipFile(fileobj=StringIO(data)).read()
+
+
+class CompressionTestCase(TestCase):
+    def setUp(self):
+        super(CompressionTestCase, self).setUp()
+        self.tempdir = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.tempdir)
+        super(CompressionTestCase, self).tearDown()
+
+    def test_compress_static(self):
+        path = os.path.join(self.tempdir, 'app.js')
+        with open(path, 'w') as fp:
+            fp.write('var x = 1;\n' * 200)
+        with open(os.path.join(self.tempdir, 'tiny.js'), 'w') as fp:
+            fp.write('var x = 1;\n')
+
+        eq_(compress_static(self.tempdir, 1024), [path + '.gz'])
+        # Nothing to do the second time.
+        eq_(compress_static(self.tempdir, 1024), [])
+
+        with app.test_request_context(
+                '/', headers={'Accept-Encoding': 'gzip'}):
+            resp = send_static(path)
+            resp.direct_passthrough = False
+            eq_(resp.headers['Content-Encoding'], 'gzip')
+            eq_(resp.mimetype, mimetypes.guess_type(path)[0])
+            eq_(gunzip(resp.get_data()), 'var x = 1;\n' * 200)
+
+        with app.test_request_context('/'):
+            resp = send_static(path)
+            eq_(resp.headers.get('Content-Encoding'), None)
+
+    def test_compress_response(self):
+        def get(count, **headers):
+            with app.test_request_context('/api/', headers=headers):
+                resp = jsonify(items=range(count))
+                resp.set_etag('abc')
+                return compress_response(resp, app.config)
+
+        resp = get(1000, **{'Accept-Encoding': 'gzip'})
+        eq_(resp.headers['Content-Encoding'], 'gzip')
+        eq_(resp.headers['ETag'], '"abc-gzip"')
+        eq_(json.loads(gunzip(resp.get_data())), {'items': range(1000)})
+
+        resp = get(1000)
+        eq_(resp.headers.get('Content-Encoding'), None)
+
+        # Too small to bother with.
+        resp = get(3, **{'Accept-Encoding': 'gzip'})
+        eq_(resp.headers.get('Content-Encoding'), None)
@@ -0,0 +1,43 @@
+import datetime
+import json
+
+from nose.tools import eq_, assert_raises
+
+from ernest.encoding import dumps, register_encoder
+from ernest.main import Project, Sprint, app
+
+
+class Point(object):
+    def __init__(self, x, y):
+        self.x = x
+        self.y = y
+
+
+register_encoder(Point, lambda point: [point.x, point.y])
+
+
+def test_dumps_uses_registry():
+    eq_(json.loads(dumps({'a': Point(1, 2)})), {'a': [1, 2]})
+
+
+def test_dumps_falls_back_to_flask():
+    with app.app_context():
+        eq_(dumps([datetime.datetime(2014, 1, 2)]),
+            '["Thu, 02 Jan 2014 00:00:00 GMT"]')
+    with assert_raises(TypeError):
+        dumps(object())
+
+
+def test_model_json_is_cached_until_changed():
+    project = Project('SUMO')
+    first = project.__json__()
+    assert project.__json__() is first
+    eq_(json.loads(dumps(project))['name'], 'SUMO')
+
+    project.name = 'Input'
+    eq_(project.__json__()['name'], 'Input')
+
+    sprint = Sprint(1, '2014.1')
+    eq_(sprint.__json__()['start_date'], '')
+    sprint.start_date = datetime.datetime(2014, 1, 6)
+    eq_(sprint.__json__()['start_date'], '2014-01-06')
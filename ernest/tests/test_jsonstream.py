@@ -0,0 +1,75 @@
+# -*- coding: utf-8 -*-
+import json
+
+from nose.tools import eq_, assert_raises
+
+from ernest import jsonstream
+from ernest.jsonstream import iterparse
+
+
+def chunked(text, size):
+    body = text.encode('utf-8')
+    return [body[i:i + size] for i in range(0, len(body), size)]
+
+
+def test_iterparse_yields_array_items():
+    doc = {
+        'bugs': [
+            {'id': 12345, 'summary': u'[foo] "quoted" ☃ {x}'},
+            {'id': 2, 'flags': [{'name': 'needinfo', 'status': '?'}]},
+            [], 1.5, None,
+        ],
+        'total': 1234567,
+        'other': {'bugs': [1, 2]},
+    }
+    text = json.dumps(doc, indent=2)
+
+    # Every chunk size splits things somewhere different, including in
+    # the middle of numbers and multibyte characters.
+    for size in (1, 2, 3, 7, 64, len(text)):
+        items = list(iterparse(chunked(text, size), 'bugs'))
+        eq_([value for key, value in items if key == 'bugs'], doc['bugs'])
+        eq_(dict((key, value) for key, value in items if key != 'bugs'),
+            {'total': 1234567, 'other': {'bugs': [1, 2]}})
+
+
+def test_iterparse_escapes_across_chunks():
+    doc = {'bugs': [u'ends with \\', u'"[{', {'a\\"': [u'}\\\\"]']}]}
+    text = json.dumps(doc)
+    for size in (1, 2, 3):
+        eq_([value for key, value in iterparse(chunked(text, size), 'bugs')],
+            doc['bugs'])
+
+
+def test_iterparse_decodes_long_values_once():
+    calls = []
+
+    class CountingDecoder(json.JSONDecoder):
+        def raw_decode(self, s, idx=0):
+            calls.append(idx)
+            return super(CountingDecoder, self).raw_decode(s, idx)
+
+    bug = {'id': 1, 'summary': 'x' * 1000, 'flags': [{'name': 'y'}] * 100}
+    text = json.dumps({'bugs': [bug, bug]})
+    old_decoder = jsonstream._decoder
+    jsonstream._decoder = CountingDecoder()
+    try:
+        items = list(iterparse(chunked(text, 10), 'bugs'))
+    finally:
+        jsonstream._decoder = old_decoder
+    eq_(items, [('bugs', bug), ('bugs', bug)])
+    # One for the key and one for each bug, not one for each chunk
+    # they span.
+    eq_(len(calls), 3)
+
+
+def test_iterparse_empty():
+    eq_(list(iterparse(['{}'], 'bugs')), [])
+    eq_(list(iterparse(['{"bugs": [ ]}'], 'bugs')), [])
+
+
+def test_iterparse_invalid():
+    for text in ('', '[]', '{"bugs": [1, 2}', '{"bugs": [1, 2]',
+                 '{"bugs": [{"id": 1'):
+        with assert_raises(ValueError):
+            list(iterparse(chunked(text, 2), 'bugs'))
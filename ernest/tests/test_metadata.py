@@ -0,0 +1,87 @@
+import datetime
+
+from nose.tools import eq_, raises
+from sqlalchemy import event
+from sqlalchemy.orm.exc import NoResultFound
+
+from . import DBTestCase
+from ernest.main import (Bug, Project, ProjectAdmin, Sprint, db,
+                         get_metadata)
+
+
+class MetadataTestCase(DBTestCase):
+    def setUp(self):
+        super(MetadataTestCase, self).setUp()
+        self.app.config['METADATA_CACHE'] = True
+        project = Project('SUMO')
+        db.session.add(project)
+        db.session.commit()
+        db.session.add(ProjectAdmin(project.id, 'admin@example.com'))
+        for i, name in enumerate(['2014.2', '2014.1', '2014.3']):
+            sprint = Sprint(project.id, name)
+            sprint.start_date = datetime.datetime(2014, 1, 1 + i)
+            db.session.add(sprint)
+        db.session.add(Sprint(project.id, 'someday'))
+        db.session.commit()
+
+    def tearDown(self):
+        self.app.config['METADATA_CACHE'] = False
+        super(MetadataTestCase, self).tearDown()
+
+    def test_lookups(self):
+        metadata = get_metadata()
+        project = metadata.project('sumo')
+        eq_(project.name, 'SUMO')
+        eq_([sprint.name for sprint in metadata.sprints(project)],
+            ['2014.1', '2014.2', '2014.3', 'someday'])
+        eq_(metadata.is_admin('admin@example.com', project), True)
+        eq_(metadata.is_admin('someone@example.com', project), False)
+
+        # Neighbors are the same as the database gives.
+        for sprint in metadata.sprints(project):
+            expected = (db.session.query(Sprint).get(sprint.id)
+                        .neighbors())
+            eq_([spr and spr.id for spr in metadata.neighbors(sprint)],
+                [spr and spr.id for spr in expected])
+
+    @raises(NoResultFound)
+    def test_missing_sprint(self):
+        metadata = get_metadata()
+        metadata.sprint(metadata.project('sumo'), '2014-9')
+
+    def test_reloads_after_changes(self):
+        metadata = get_metadata()
+        eq_(get_metadata(), metadata)
+
+        # Only changes to projects, sprints and admins count.
+        db.session.add(Bug(id=1))
+        db.session.commit()
+        eq_(get_metadata(), metadata)
+
+        sprint = db.session.query(Sprint).filter_by(name='2014.1').one()
+        sprint.notes = 'notes'
+        db.session.commit()
+        metadata = get_metadata()
+        eq_(metadata.sprint(metadata.project('sumo'), '2014-1').notes,
+            'notes')
+
+        # Changes that were rolled back don't.
+        sprint.notes = 'other notes'
+        db.session.flush()
+        db.session.rollback()
+        eq_(get_metadata(), metadata)
+
+    def test_views_skip_the_database(self):
+        get_metadata()
+        queries = []
+
+        def count(*args):
+            queries.append(args[2])
+
+        event.listen(db.engine, 'before_cursor_execute', count)
+        try:
+            resp = self.client.get('/api/project')
+        finally:
+            event.remove(db.engine, 'before_cursor_execute', count)
+        eq_(resp.status_code, 200)
+        eq_(queries, [])
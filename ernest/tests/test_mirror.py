@@ -0,0 +1,190 @@
+import json
+
+from nose.tools import eq_
+
+from . import DBTestCase
+from .test_bugzilla import FakeSession
+from ernest import mirror
+from ernest.bugzilla import BugzillaTracker, mark_is_blocked, whiteboard_data
+from ernest.main import Bug, BugWhiteboardFlag, Project, db
+
+
+def make_bug(id_, **kwargs):
+    bug = {
+        'id': id_,
+        'product': 'support',
+        'component': 'General',
+        'status': 'NEW',
+        'priority': 'P1',
+        'summary': 'bug {0}'.format(id_),
+        'whiteboard': 'u=dev c=comp p=1 s=2014.2',
+        'target_milestone': '---',
+        'assigned_to': {'name': 'dev@example.com', 'real_name': 'Dev'},
+        'groups': [],
+        'last_change_time': '2014-01-01T00:00:00Z',
+        'depends_on': [],
+        'flags': [],
+    }
+    bug.update(kwargs)
+    return bug
+
+
+class MirrorTestCase(DBTestCase):
+    def setUp(self):
+        super(MirrorTestCase, self).setUp()
+        project = Project('SUMO')
+        project.bugzilla_product = 'support'
+        db.session.add(project)
+        db.session.commit()
+        self.bz = BugzillaTracker(self.app)
+        self.bz.cache.clear()
+
+    def test_store_bugs_round_trip(self):
+        bug = make_bug(
+            1,
+            groups=[{'name': 'websites-security'}],
+            depends_on=[3, 2],
+            flags=[{'name': 'needinfo', 'status': '?',
+                    'requestee': {'name': 'joe@example.com'},
+                    'setter': {'name': 'dev@example.com'}}])
+        mirror.store_bugs([bug])
+        db.session.commit()
+
+        eq_(db.session.query(Bug).get(1).sprint, '2014.2')
+        data = Bug.bugs_by_id([1])[0]
+        del data['_whiteboard']
+        data['depends_on'] = sorted(data['depends_on'])
+        bug['depends_on'] = [2, 3]
+        eq_(data, bug)
+
+        # Updating replaces dependencies and flags.
+        mirror.store_bugs([make_bug(1, status='RESOLVED', depends_on=[4])])
+        db.session.commit()
+        eq_(Bug.bugs_by_id([1], ('id', 'status', 'depends_on', 'flags')),
+            [{'id': 1, 'status': 'RESOLVED', 'depends_on': [4],
+              'flags': []}])
+
+    def test_whiteboard_columns(self):
+        whiteboards = [
+            '',
+            'u=dev c=comp p=3 s=2014.2 [foo] [bar] [foo]',
+            'p=? s=2014.2 [bar]',
+            'no key vals here',
+        ]
+        mirror.store_bugs([make_bug(i, whiteboard=wb)
+                           for i, wb in enumerate(whiteboards, 1)])
+        db.session.commit()
+
+        for i, wb in enumerate(whiteboards, 1):
+            # Same as parsing it, except for 'other' which isn't kept.
+            eq_(db.session.query(Bug).get(i).whiteboard_data(),
+                whiteboard_data(wb)._replace(other=()))
+
+        eq_(db.session.query(Bug).get(2).points, 3)
+        eq_(db.session.query(Bug).get(3).points_text, '?')
+
+        # Storing it again replaces the flags.
+        mirror.store_bugs([make_bug(2, whiteboard='s=2014.2 [baz]')])
+        db.session.commit()
+        eq_(db.session.query(Bug).get(2).whiteboard_data().flags, ('baz',))
+        eq_(db.session.query(BugWhiteboardFlag).filter_by(bug_id=2).count(),
+            1)
+
+    def test_sprint_and_tracker_queries(self):
+        mirror.store_bugs([
+            make_bug(1, depends_on=[2, 3]),
+            make_bug(2, whiteboard='s=2014.3'),
+            make_bug(3, status='RESOLVED', summary='[tracker] old'),
+            make_bug(4, summary='[tracker] new', whiteboard=''),
+            make_bug(5, product='firefox'),
+        ])
+        db.session.commit()
+
+        bugs = Bug.sprint_bugs(
+            'support', '2014.2', ('id', 'depends_on', 'status'))
+        eq_(sorted(bug['id'] for bug in bugs), [1, 3])
+
+        mark_is_blocked(bugs, Bug.statuses)
+        blocked = dict((bug['id'], bug['open_blockers']) for bug in bugs)
+        eq_(blocked, {1: [2], 3: []})
+
+        eq_([bug['id'] for bug in Bug.tracker_bugs('support', ['NEW'])],
+            [4])
+
+    def test_incremental_sync(self):
+        self.bz.session = FakeSession(json.dumps({'bugs': [make_bug(1)]}))
+        eq_(mirror.sync_product(self.bz, 'support'), 1)
+        params = self.bz.session.requests[0][2]
+        eq_(params['product'], ['support'])
+        assert 'changed_after' not in params
+
+        self.bz.session = FakeSession([
+            json.dumps({'bugs': [
+                make_bug(2, last_change_time='2014-01-02T00:00:00Z')]}),
+            json.dumps({'bugs': [{'id': 1}, {'id': 2}]}),
+        ])
+        eq_(mirror.sync_product(self.bz, 'support'), 1)
+        # Goes back a second from the latest change it has.
+        eq_(self.bz.session.requests[0][2]['changed_after'],
+            '2013-12-31T23:59:59Z')
+        eq_(db.session.query(Bug).count(), 2)
+
+    def test_incremental_sync_drops_missing_bugs(self):
+        mirror.store_bugs([make_bug(1), make_bug(2), make_bug(3)])
+        db.session.commit()
+
+        # Bug 1 changed, bug 2 was made private and bug 3 was made
+        # private after the changes were fetched.
+        self.bz.session = FakeSession([
+            json.dumps({'bugs': [
+                make_bug(1, status='RESOLVED'),
+                make_bug(3, status='RESOLVED')]}),
+            json.dumps({'bugs': [{'id': 1}]}),
+        ])
+        eq_(mirror.sync_product(self.bz, 'support', sweep=True), 1)
+        eq_(self.bz.session.requests[1][2]['include_fields'], 'id')
+        eq_([(bug.id, bug.status) for bug in db.session.query(Bug)],
+            [(1, 'RESOLVED')])
+
+    def test_incremental_sync_only_sweeps_when_asked(self):
+        mirror.store_bugs([make_bug(1), make_bug(2)])
+        db.session.commit()
+
+        self.bz.session = FakeSession(json.dumps({'bugs': [
+            make_bug(1, status='RESOLVED')]}))
+        eq_(mirror.sync_product(self.bz, 'support'), 1)
+        eq_(len(self.bz.session.requests), 1)
+        eq_([(bug.id, bug.status) for bug in db.session.query(Bug)],
+            [(1, 'RESOLVED'), (2, 'NEW')])
+
+    def test_sync_doesnt_cache_responses(self):
+        self.bz.session = FakeSession(json.dumps({'bugs': [make_bug(1)]}))
+        mirror.sync_product(self.bz, 'support', full=True)
+        self.bz.fetch_bugs(
+            fields=mirror.MIRROR_FIELDS,
+            components=[{'product': 'support', 'component': '__ANY__'}])
+        eq_(len(self.bz.session.requests), 2)
+
+    def test_full_sync_drops_missing_bugs(self):
+        mirror.store_bugs([make_bug(1, depends_on=[2]), make_bug(2)])
+        db.session.commit()
+
+        self.bz.session = FakeSession(json.dumps({'bugs': [make_bug(2)]}))
+        mirror.sync_product(self.bz, 'support', full=True)
+        eq_([bug.id for bug in db.session.query(Bug)], [2])
+
+    def test_sync_blockers(self):
+        mirror.store_bugs([make_bug(1, depends_on=[2, 3]), make_bug(2)])
+        db.session.commit()
+
+        self.bz.session = FakeSession(json.dumps({'bugs': [
+            make_bug(3, product='firefox', status='RESOLVED')]}))
+        eq_(mirror.sync_blockers(self.bz, ['support']), 1)
+        # Only asks for the blocker that's in another product.
+        eq_(self.bz.session.requests[0][2]['id'], '3')
+        eq_(Bug.statuses([3]), {3: 'RESOLVED'})
+
+        # Then it's made private.
+        self.bz.session = FakeSession()
+        eq_(mirror.sync_blockers(self.bz, ['support']), 0)
+        eq_(Bug.statuses([3]), {})
@@ -0,0 +1,59 @@
+import datetime
+
+from nose.tools import eq_
+
+from . import DBTestCase
+from ernest.main import Project, ProjectAdmin, Sprint, db
+
+
+class SprintQueriesTestCase(DBTestCase):
+    def setUp(self):
+        super(SprintQueriesTestCase, self).setUp()
+        self.project = Project('SUMO')
+        db.session.add(self.project)
+        db.session.commit()
+        db.session.add(ProjectAdmin(self.project.id, 'admin@example.com'))
+
+        other = Project('Input')
+        db.session.add(other)
+        db.session.commit()
+        # Sprints in other projects are never neighbors.
+        db.session.add(Sprint(other.id, '2014.1'))
+        db.session.add(Sprint(other.id, '2014.0'))
+
+        sprints = [
+            ('b', None),
+            ('a', None),
+            ('2014.2', datetime.datetime(2014, 1, 15)),
+            ('2014.1', datetime.datetime(2014, 1, 1)),
+            ('2014.1b', datetime.datetime(2014, 1, 1)),
+            ('2014.3', datetime.datetime(2014, 2, 1)),
+        ]
+        for name, start_date in sprints:
+            sprint = Sprint(self.project.id, name)
+            sprint.start_date = start_date
+            db.session.add(sprint)
+        db.session.commit()
+
+    def test_neighbors(self):
+        expected = ['a', 'b', '2014.1', '2014.1b', '2014.2', '2014.3']
+        for i, name in enumerate(expected):
+            sprint = (db.session.query(Sprint)
+                      .filter_by(project_id=self.project.id, name=name)
+                      .one())
+            prev_sprint, next_sprint = sprint.neighbors()
+            eq_(prev_sprint and prev_sprint.name,
+                expected[i - 1] if i > 0 else None)
+            eq_(next_sprint and next_sprint.name,
+                expected[i + 1] if i < len(expected) - 1 else None)
+
+    def test_with_project(self):
+        project, sprint, admin = Sprint.with_project(
+            'sumo', '2014-2', 'admin@example.com')
+        eq_((project.name, sprint.name, admin), ('SUMO', '2014.2', True))
+
+        for username in ('someone@example.com', None):
+            eq_(Sprint.with_project('sumo', '2014-2', username)[2], False)
+
+        eq_(Project.with_admin('sumo', 'admin@example.com')[1], True)
+        eq_(Project.with_admin('input', 'admin@example.com')[1], False)
@@ -0,0 +1,65 @@
+from nose.tools import eq_
+
+from ernest.bugzilla import Whiteboard
+from ernest.pipeline import (
+    SPRINT_PIPELINE, Pipeline, assignee, groups, needinfo, strip_nobody,
+    whiteboard)
+
+
+def test_strip_nobody():
+    bugs = [
+        {'assigned_to': {'name': 'nobody@mozilla.org',
+                         'real_name': 'Nobody; OK to take it and work on it'}},
+        {'assigned_to': {'name': 'willkg@example.com', 'real_name': 'Will'}},
+        {},
+    ]
+    Pipeline(strip_nobody).run(bugs)
+    eq_([bug.get('assigned_to') for bug in bugs],
+        [{}, {'name': 'willkg@example.com', 'real_name': 'Will'}, None])
+
+
+def test_assignee():
+    bugs = [
+        {'assigned_to': {'name': 'willkg@example.com'}},
+        {'assigned_to': {'name': 'rrosario@example.com'}},
+        {'assigned_to': {}},
+    ]
+    Pipeline(assignee).run(bugs, my_email='willkg@example.com')
+    eq_([bug['mine'] for bug in bugs], [True, False, False])
+    assert bugs[0]['gravatar_url'].startswith('https://secure.gravatar.com/')
+    eq_(bugs[2]['gravatar_url'], False)
+
+    Pipeline(assignee).run(bugs)
+    eq_([bug['gravatar_url'] for bug in bugs], [False, False, False])
+
+
+def test_needinfo_and_groups():
+    bugs = [{
+        'flags': [
+            {'name': 'needinfo', 'requestee': {'name': 'willkg@example.com'}},
+            {'name': 'review', 'requestee': {'name': 'r@example.com'}},
+        ],
+        'groups': [{'name': 'websites-security'}],
+    }]
+    Pipeline(needinfo, groups).run(bugs)
+    eq_(bugs[0]['needinfo'],
+        [{'username': 'willkg', 'name': 'willkg@example.com'}])
+    eq_(bugs[0]['securitygroup'], True)
+    eq_(bugs[0]['confidentialgroup'], False)
+
+
+def test_sprint_pipeline():
+    bugs = [{'whiteboard': 'u=user c=comp p=2 s=2014.1 [qa+]'}, {}]
+    SPRINT_PIPELINE.run(bugs)
+    eq_([(bug['sprint'], bug['points'], bug['component'],
+          bug['whiteboardflags']) for bug in bugs],
+        [('2014.1', 2, 'comp', ['qa+']), (None, None, None, [])])
+
+
+def test_whiteboard_already_parsed():
+    bugs = [{'whiteboard': 'p=2 s=2014.1',
+             '_whiteboard': Whiteboard('', '', '2014.2', 3, ('qa+',), ())}]
+    Pipeline(whiteboard).run(bugs)
+    assert '_whiteboard' not in bugs[0]
+    eq_((bugs[0]['sprint'], bugs[0]['points'], bugs[0]['whiteboardflags']),
+        ('2014.2', 3, ['qa+']))
@@ -0,0 +1,86 @@
+import json
+import Queue
+
+from nose.tools import eq_
+
+from ernest.push import SprintPoller, SprintPollers, event_stream
+
+
+def parse_event(text):
+    lines = text.strip().split('\n')
+    eq_(len(lines), 2)
+    return lines[0][len('event: '):], json.loads(lines[1][len('data: '):])
+
+
+class FakePoll(object):
+    def __init__(self):
+        self.bugs = []
+        self.stats = {'total_bugs': 0}
+
+    def __call__(self):
+        return [dict(bug) for bug in self.bugs], dict(self.stats)
+
+
+def test_poll_once_pushes_changes():
+    poll = FakePoll()
+    poller = SprintPoller(poll, 60)
+    queue = Queue.Queue()
+    poller.subscribers.add(queue)
+
+    poll.bugs = [{'id': 1, 'status': 'NEW'}, {'id': 2, 'status': 'NEW'}]
+    poll.stats = {'total_bugs': 2}
+    poller.poll_once()
+    eq_(parse_event(queue.get_nowait()),
+        ('snapshot', {'bugs': poll.bugs, 'total_bugs': 2}))
+
+    # Nothing changed, so nothing is pushed.
+    poller.poll_once()
+    assert queue.empty()
+
+    poll.bugs = [{'id': 1, 'status': 'RESOLVED'}, {'id': 3, 'status': 'NEW'}]
+    poller.poll_once()
+    eq_(parse_event(queue.get_nowait()),
+        ('update', {'bugs': poll.bugs, 'removed': [2], 'total_bugs': 2}))
+
+    poll.stats = {'total_bugs': 3}
+    poller.poll_once()
+    eq_(parse_event(queue.get_nowait()),
+        ('update', {'bugs': [], 'removed': [], 'total_bugs': 3}))
+
+    # Subscribers that join later start with a snapshot.
+    event, data = parse_event(poller.subscribe().get(timeout=5))
+    eq_(event, 'snapshot')
+    eq_(data['bugs'], poll.bugs)
+
+
+def test_subscribers_share_pollers():
+    pollers = SprintPollers(0.01)
+    poll = FakePoll()
+    subscriptions = [
+        pollers.subscribe('sprint', poll),
+        pollers.subscribe('sprint', FakePoll()),
+        pollers.subscribe('other sprint', poll),
+    ]
+    try:
+        poller, queue = subscriptions[0]
+        eq_(subscriptions[1][0], poller)
+        assert subscriptions[2][0] is not poller
+        eq_(parse_event(queue.get(timeout=5))[0], 'snapshot')
+    finally:
+        for poller, queue in subscriptions:
+            poller.unsubscribe(queue)
+
+
+def test_event_stream():
+    poller = SprintPoller(FakePoll(), 60)
+    queue = Queue.Queue()
+    poller.subscribers.add(queue)
+    stream = event_stream(poller, queue, 0.01)
+
+    eq_(next(stream), ': heartbeat\n\n')
+    queue.put('event: update\ndata: {}\n\n')
+    eq_(next(stream), 'event: update\ndata: {}\n\n')
+
+    # Closing the response unsubscribes.
+    stream.close()
+    eq_(poller.subscribers, set())
@@ -0,0 +1,41 @@
+import json
+
+from nose.tools import eq_
+
+from . import DBTestCase
+from .test_bugzilla import FakeSession
+from .test_mirror import make_bug
+from ernest.bugzilla import BugzillaTracker
+from ernest.main import Project, Sprint, db
+from ernest.refresher import SprintRefresher
+
+
+class SprintRefresherTestCase(DBTestCase):
+    def setUp(self):
+        super(SprintRefresherTestCase, self).setUp()
+        self.project = Project('SUMO')
+        self.project.bugzilla_product = 'support'
+        db.session.add(self.project)
+        db.session.commit()
+        self.sprint = Sprint(self.project.id, '2014.2')
+        db.session.add(self.sprint)
+        db.session.commit()
+        BugzillaTracker(self.app).cache.clear()
+
+    def tearDown(self):
+        self.app.extensions.pop('bugzilla_session', None)
+        super(SprintRefresherTestCase, self).tearDown()
+
+    def test_blocker_statuses_are_refetched(self):
+        refresher = SprintRefresher(self.app, 60, 0)
+        for status in ('NEW', 'RESOLVED'):
+            session = FakeSession([
+                json.dumps({'bugs': [make_bug(1, depends_on=[2])]}),
+                json.dumps({'bugs': [{'id': 2, 'status': status}]}),
+            ])
+            self.app.extensions['bugzilla_session'] = session
+            refresher.refresh_sprint(self.project, self.sprint)
+            eq_(len(session.requests), 2)
+            eq_(session.requests[1][2]['id'], '2')
+            # The cached statuses expire.
+            BugzillaTracker(self.app).cache.clear()
@@ -0,0 +1,60 @@
+from nose.tools import eq_
+
+from ernest.stats import SprintStats
+
+
+BUGS = [
+    {'id': 1, 'priority': 'P1', 'points': 2, 'status': 'RESOLVED',
+     'component': 'kb', 'assigned_to': {'name': 'a@example.com'},
+     'is_blocked': False, 'last_change_time': '2014-01-02T00:00:00Z'},
+    {'id': 2, 'priority': '--', 'points': '?', 'status': 'NEW',
+     'component': 'kb', 'assigned_to': {},
+     'is_blocked': True, 'last_change_time': '2014-01-03T00:00:00Z'},
+    {'id': 3, 'priority': 'P3', 'points': 3, 'status': 'ASSIGNED',
+     'component': 'search', 'assigned_to': {'name': 'a@example.com'},
+     'is_blocked': False, 'last_change_time': '2014-01-01T00:00:00Z'},
+    {'id': 4, 'priority': 'P1', 'points': None, 'status': 'VERIFIED',
+     'component': None, 'assigned_to': {'name': 'b@example.com'},
+     'is_blocked': False, 'last_change_time': '2014-01-01T00:00:00Z'},
+]
+
+
+def test_totals():
+    stats = SprintStats(BUGS)
+    eq_(stats.total_bugs, 4)
+    eq_(stats.closed_bugs, 2)
+    eq_(stats.total_points, 5)
+    eq_(stats.closed_points, 2)
+    eq_(stats.bugs_with_no_points, 2)
+    eq_(stats.latest_change_time, '2014-01-03T00:00:00Z')
+
+
+def test_breakdowns():
+    stats = SprintStats(BUGS)
+    eq_(stats.breakdown('priority'),
+        [{'priority': 'P1', 'count': 2},
+         {'priority': 'P3', 'count': 1},
+         {'priority': '--', 'count': 1}])
+    eq_(stats.breakdown('component'),
+        [{'name': None, 'count': 1},
+         {'name': 'kb', 'count': 2},
+         {'name': 'search', 'count': 1}])
+    eq_(stats.breakdown('blocked'),
+        [{'blocked': False, 'count': 3}, {'blocked': True, 'count': 1}])
+
+
+def test_as_dict():
+    data = SprintStats(BUGS).as_dict(extra=['assignee'])
+    assert 'points_breakdown' in data
+    assert 'status_breakdown' not in data
+    eq_(data['assignee_breakdown'],
+        [{'name': None, 'count': 1},
+         {'name': 'a@example.com', 'count': 2},
+         {'name': 'b@example.com', 'count': 1}])
+
+
+def test_empty():
+    data = SprintStats([]).as_dict()
+    eq_(data['total_bugs'], 0)
+    eq_(data['latest_change_time'], None)
+    eq_(data['priority_breakdown'], [])
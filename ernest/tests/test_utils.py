@@ -0,0 +1,104 @@
+import datetime
+import json
+import threading
+import time
+
+from nose.tools import eq_, assert_raises
+
+from ernest.main import app
+from ernest.utils import (make_etag, not_modified, parallel_map,
+                          parse_bugzilla_time, stream_jsonify,
+                          stream_requested)
+
+
+def test_parallel_map_keeps_order():
+    def slow_square(n):
+        # Later items finish first.
+        time.sleep((5 - n) * 0.01)
+        return n * n
+
+    eq_(parallel_map(slow_square, range(5), 5), [0, 1, 4, 9, 16])
+
+
+def test_parallel_map_limits_concurrency():
+    lock = threading.Lock()
+    state = {'running': 0, 'max': 0}
+
+    def track(n):
+        with lock:
+            state['running'] += 1
+            state['max'] = max(state['max'], state['running'])
+        time.sleep(0.01)
+        with lock:
+            state['running'] -= 1
+
+    parallel_map(track, range(10), 3)
+    eq_(state['max'], 3)
+
+
+def test_parallel_map_raises_first_error_and_skips_the_rest():
+    started = []
+
+    def boom(n):
+        started.append(n)
+        if n == 0:
+            raise ValueError(n)
+        time.sleep(0.05)
+
+    assert_raises(ValueError, parallel_map, boom, range(10), 2)
+    assert len(started) < 10
+
+
+def test_stream_jsonify():
+    data = {'total': 250, 'bugs': [{'id': i} for i in range(250)]}
+    with app.test_request_context('/'):
+        resp = stream_jsonify(data, 'bugs', 'json')
+        eq_(json.loads(''.join(resp.response)), data)
+
+        resp = stream_jsonify(data, 'bugs', 'ndjson')
+        lines = ''.join(resp.response).splitlines()
+        eq_(map(json.loads, lines), [{'total': 250}] + data['bugs'])
+        eq_(resp.mimetype, 'application/x-ndjson')
+
+
+def test_stream_requested():
+    with app.test_request_context('/?stream=ndjson'):
+        eq_(stream_requested(), 'ndjson')
+    with app.test_request_context(
+            '/', headers={'Accept': 'application/x-ndjson'}):
+        eq_(stream_requested(), 'ndjson')
+    with app.test_request_context('/?stream=xml'):
+        eq_(stream_requested(), None)
+
+
+def test_make_etag_ignores_dict_order():
+    # 1 and 9 land in the same slot, so these list their items in
+    # the order they were added.
+    first, second = {1: 'a', 9: 'b'}, {9: 'b', 1: 'a'}
+    assert repr(first) != repr(second)
+    eq_(make_etag(first), make_etag(second))
+    assert make_etag({1: 'a'}) != make_etag({1: 'b'})
+
+
+def test_not_modified():
+    since = 'Sat, 04 Jan 2014 00:00:00 GMT'
+    etag = make_etag(1, 'a')
+    last_modified = parse_bugzilla_time('2014-01-04T00:00:00Z')
+    eq_(last_modified, datetime.datetime(2014, 1, 4))
+
+    with app.test_request_context('/'):
+        eq_(not_modified(etag, last_modified), None)
+    with app.test_request_context(
+            '/', headers={'If-None-Match': '"{0}"'.format(etag)}):
+        resp = not_modified(etag, last_modified)
+        eq_(resp.status_code, 304)
+        eq_(resp.headers['ETag'], '"{0}"'.format(etag))
+    with app.test_request_context(
+            '/', headers={'If-None-Match': '"old"',
+                          'If-Modified-Since': since}):
+        # The ETag wins.
+        eq_(not_modified(etag, last_modified), None)
+    with app.test_request_context(
+            '/', headers={'If-Modified-Since': since}):
+        eq_(not_modified(etag, last_modified).status_code, 304)
+        eq_(not_modified(etag, None), None)
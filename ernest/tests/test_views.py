@@ -0,0 +1,82 @@
+import json
+
+from nose.tools import eq_
+
+from . import DBTestCase
+from .test_bugzilla import FakeSession
+from .test_mirror import make_bug
+from ernest import mirror
+from ernest.bugzilla import BugzillaTracker
+from ernest.main import Project, Sprint, db
+
+
+class SprintViewTestCase(DBTestCase):
+    def setUp(self):
+        super(SprintViewTestCase, self).setUp()
+        self.app.config['BUG_MIRROR'] = True
+        project = Project('SUMO')
+        project.bugzilla_product = 'support'
+        db.session.add(project)
+        db.session.commit()
+        db.session.add(Sprint(project.id, '2014.2'))
+        mirror.store_bugs([make_bug(1), make_bug(2)])
+        db.session.commit()
+
+    def tearDown(self):
+        self.app.config['BUG_MIRROR'] = False
+        super(SprintViewTestCase, self).tearDown()
+
+    def test_etag_changes_with_bug_contents(self):
+        resp = self.client.get('/api/project/sumo/2014-2')
+        etag = resp.headers['ETag']
+
+        resp = self.client.get('/api/project/sumo/2014-2',
+                               headers={'If-None-Match': etag})
+        eq_(resp.status_code, 304)
+
+        # Whiteboard edits don't always bump last_change_time.
+        mirror.store_bugs([make_bug(2, whiteboard='p=5 s=2014.2')])
+        db.session.commit()
+        resp = self.client.get('/api/project/sumo/2014-2',
+                               headers={'If-None-Match': etag})
+        eq_(resp.status_code, 200)
+        assert resp.headers['ETag'] != etag
+
+    def test_events_need_gevent(self):
+        eq_(self.app.config['GEVENT'], False)
+        resp = self.client.get('/api/project/sumo/2014-2/events')
+        eq_(resp.status_code, 404)
+
+
+class SprintBugzillaViewTestCase(DBTestCase):
+    def setUp(self):
+        super(SprintBugzillaViewTestCase, self).setUp()
+        project = Project('SUMO')
+        project.bugzilla_product = 'support'
+        db.session.add(project)
+        db.session.commit()
+        db.session.add(Sprint(project.id, '2014.2'))
+        db.session.commit()
+        BugzillaTracker(self.app).cache.clear()
+
+    def tearDown(self):
+        self.app.extensions.pop('bugzilla_session', None)
+        super(SprintBugzillaViewTestCase, self).tearDown()
+
+    def test_unchanged_snapshot_is_not_modified(self):
+        bugs = [make_bug(id_, whiteboard='p=1 s=2014.2 u=dev c=comp')
+                for id_ in range(1, 20)]
+        self.app.extensions['bugzilla_session'] = FakeSession([
+            json.dumps({'bugs': bugs}),
+            json.dumps({'bugs': []}),
+        ])
+
+        resp = self.client.get('/api/project/sumo/2014-2')
+        eq_(resp.status_code, 200)
+        etag = resp.headers['ETag']
+
+        # This time the bugs come out of the cached snapshot rather
+        # than straight from Bugzilla.
+        resp = self.client.get('/api/project/sumo/2014-2',
+                               headers={'If-None-Match': etag})
+        eq_(resp.status_code, 304)
@@ -1,10 +1,16 @@
+import Queue
 import datetime
 import hashlib
 import json
 import subprocess
+import sys
+import threading
 from urllib import urlencode
 
-from flask import Response, request
+from flask import Response, request, stream_with_context
+
+from ernest.compression import ENCODINGS
+from ernest.encoding import dumps, encode_default
 
 
 def call_command(cmd, verbose=False):
@@ -30,6 +36,162 @@ def jsonify(obj):
     return Response(dump, mimetype='application/json')
 
 
+# Streaming formats -> mimetype.
+STREAM_FORMATS = {
+    'json': 'application/json',
+    'ndjson': 'application/x-ndjson',
+}
+
+# Number of items serialized per chunk of a streamed response.
+STREAM_BATCH_SIZE = 100
+
+
+def stream_requested():
+    """Returns the streaming format the request asked for or None
+
+    Clients ask with ``?stream=json`` or ``?stream=ndjson`` or by
+    accepting application/x-ndjson.
+
+    """
+    fmt = request.args.get('stream')
+    if fmt in STREAM_FORMATS:
+        return fmt
+    best = request.accept_mimetypes.best_match(
+        ['application/json', 'application/x-ndjson'])
+    if best == 'application/x-ndjson':
+        return 'ndjson'
+    return None
+
+
+def _iter_json(data, items_key):
+    members = [
+        '{0}: {1}'.format(dumps(key), dumps(value))
+        for key, value in data.items() if key != items_key
+    ]
+    members.append('{0}: ['.format(dumps(items_key)))
+    yield '{' + ', '.join(members)
+
+    items = data[items_key]
+    for i in range(0, len(items), STREAM_BATCH_SIZE):
+        batch = ', '.join(
+            dumps(item) for item in items[i:i + STREAM_BATCH_SIZE])
+        yield batch if i == 0 else ', ' + batch
+
+    yield ']}'
+
+
+def _iter_ndjson(data, items_key):
+    yield dumps(dict(
+        (key, value) for key, value in data.items() if key != items_key
+    )) + '\n'
+
+    items = data[items_key]
+    for i in range(0, len(items), STREAM_BATCH_SIZE):
+        yield ''.join(
+            dumps(item) + '\n' for item in items[i:i + STREAM_BATCH_SIZE])
+
+
+def stream_jsonify(data, items_key, fmt):
+    """Creates a Response that serializes data as it's sent
+
+    Everything but ``data[items_key]`` is sent first, so the client
+    can render the page header while the items are still coming.
+
+    With fmt 'json', the body is the same JSON object jsonify would
+    produce with the items last. With fmt 'ndjson', the first line is
+    the object without the items and each following line is one item.
+
+    :arg data: Dict to send
+    :arg items_key: Key of the list in data to stream
+    :arg fmt: One of the keys in STREAM_FORMATS
+
+    :returns: Response
+
+    """
+    make_chunks = _iter_json if fmt == 'json' else _iter_ndjson
+    return Response(stream_with_context(make_chunks(data, items_key)),
+                    mimetype=STREAM_FORMATS[fmt])
+
+
+def make_etag(*parts):
+    """Returns a strong ETag fingerprinting parts
+
+    parts are hashed as JSON with sorted keys rather than by their
+    repr since the order of a dict's items depends on how it was
+    built. A freshly fetched bug and the same bug unpickled from the
+    cache have to give the same ETag.
+
+    :arg parts: Things that encode differently whenever the response
+        would
+
+    """
+    return hashlib.sha1(json.dumps(
+        parts, sort_keys=True, separators=(',', ':'),
+        default=encode_default)).hexdigest()
+
+
+def parse_bugzilla_time(text):
+    """Parses a Bugzilla timestamp like 2014-01-04T00:00:00Z
+
+    :returns: naive UTC datetime or None if text isn't one
+
+    """
+    try:
+        return datetime.datetime.strptime(text, '%Y-%m-%dT%H:%M:%SZ')
+    except (TypeError, ValueError):
+        return None
+
+
+def format_bugzilla_time(dt):
+    """Formats a datetime like Bugzilla does, e.g. 2014-01-04T00:00:00Z
+
+    :returns: The string or None if dt is None
+
+    """
+    if dt is None:
+        return None
+    return dt.strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+def set_validators(response, etag, last_modified=None):
+    """Sets ETag and Last-Modified on a response
+
+    Responses must be revalidated every time, otherwise browsers
+    treat Last-Modified as a hint they can cache for a while and
+    polling stops seeing changes.
+
+    """
+    response.set_etag(etag)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    response.cache_control.private = True
+    response.cache_control.no_cache = True
+    return response
+
+
+def not_modified(etag, last_modified=None):
+    """Returns a 304 response if the client has this version already
+
+    If-None-Match wins over If-Modified-Since when a request has both.
+
+    :returns: Response or None if the client needs the full response
+
+    """
+    if request.if_none_match:
+        # Compressed responses have the encoding tacked on the ETag.
+        # The 304 has to have the ETag the client has.
+        tags = [etag] + ['{0}-{1}'.format(etag, encoding)
+                         for encoding, suffix in ENCODINGS]
+        matches = [tag for tag in tags if request.if_none_match.contains(tag)]
+        if not matches:
+            return None
+        etag = matches[0]
+    elif (last_modified is None or request.if_modified_since is None
+          or last_modified > request.if_modified_since):
+        return None
+    return set_validators(Response(status=304), etag, last_modified)
+
+
 def truthiness(s):
     """Returns a boolean from a string"""
     try:
@@ -61,3 +223,57 @@ def gravatar_url(email, size=None):
 
     url += '?' + urlencode(qs)
     return url
+
+
+def parallel_map(func, items, max_workers):
+    """Calls func on every item using at most max_workers threads
+
+    Results come back in the same order as items regardless of the
+    order the calls finish in.
+
+    If a call raises an exception, items that haven't been started
+    yet are skipped, calls already in flight are allowed to finish and
+    the first exception raised is re-raised.
+
+    :arg func: Function taking a single item
+    :arg items: Iterable of items
+    :arg max_workers: Maximum number of concurrent calls
+
+    :returns: List of results
+
+    """
+    items = list(items)
+    if max_workers <= 1 or len(items) <= 1:
+        return [func(item) for item in items]
+
+    results = [None] * len(items)
+    errors = []
+    todo = Queue.Queue()
+    for i, item in enumerate(items):
+        todo.put((i, item))
+
+    def worker():
+        while not errors:
+            try:
+                i, item = todo.get_nowait()
+            except Queue.Empty:
+                return
+            try:
+                results[i] = func(item)
+            except Exception:
+                errors.append(sys.exc_info())
+                return
+
+    threads = [threading.Thread(target=worker)
+               for _ in range(min(max_workers, len(items)))]
+    for thread in threads:
+        thread.daemon = True
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    if errors:
+        exc_type, exc_value, exc_tb = errors[0]
+        raise exc_type, exc_value, exc_tb
+
+    return results
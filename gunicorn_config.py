@@ -0,0 +1,29 @@
+"""gunicorn settings for the web process
+
+Set WEB_WORKER_CLASS=gevent to have each worker handle many requests
+at once. See "Run server" in README.rst.
+
+"""
+import os
+
+
+bind = '0.0.0.0:{0}'.format(os.environ.get('PORT', 8000))
+worker_class = os.environ.get('WEB_WORKER_CLASS', 'sync')
+workers = int(os.environ.get('WEB_CONCURRENCY', 3))
+# Number of requests each gevent worker handles at once.
+worker_connections = int(os.environ.get('WEB_WORKER_CONNECTIONS', 500))
+
+
+def post_fork(server, worker):
+    if worker_class != 'gevent':
+        return
+
+    # psycopg2 blocks the whole worker while it waits on postgres
+    # unless it's told to wait on gevent instead.
+    try:
+        from psycogreen.gevent import patch_psycopg
+    except ImportError:
+        server.log.warning('psycogreen is not installed. Database '
+                           'queries will block other requests.')
+    else:
+        patch_psycopg()
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import logging
 import subprocess
 import sys
 
@@ -7,7 +8,11 @@ from prettytable import PrettyTable
 from sqlalchemy.exc import IntegrityError, OperationalError, ProgrammingError
 from sqlalchemy.orm.exc import NoResultFound
 
+from ernest.bugzilla import BugzillaTracker
+from ernest.compression import compress_static as compress_static_files
+from ernest import mirror
 from ernest.main import app, db, Project, ProjectAdmin, Sprint
+from ernest.refresher import SprintRefresher
 
 
 manager = Manager(app)
@@ -149,5 +154,47 @@ def delete_sprint(projectname, sprintname):
     print '{0} deleted.'.format(sprintname)
 
 
+@manager.command
+def invalidate_cache():
+    """Invalidates all cached Bugzilla data in a shared cache"""
+    BugzillaTracker(app).invalidate_cache()
+    print 'Bugzilla cache invalidated.'
+
+
+@manager.command
+def compress_static():
+    """Writes precompressed copies of static files"""
+    written = compress_static_files(
+        app.static_folder, app.config['COMPRESS_MIN_SIZE'])
+    for path in written:
+        print path
+    print '{0} files written.'.format(len(written))
+
+
+@manager.command
+def refresh_sprints(once=False):
+    """Keeps cached Bugzilla data for current sprints up to date"""
+    logging.basicConfig(level=logging.INFO)
+    refresher = SprintRefresher(
+        app,
+        app.config['SPRINT_REFRESH_INTERVAL'],
+        app.config['SPRINT_REFRESH_JITTER'])
+    refresher.run(once=once)
+
+
+@manager.command
+def sync_bugs(full=False, loop=False):
+    """Syncs the bug mirror with Bugzilla"""
+    logging.basicConfig(level=logging.INFO)
+    if loop:
+        mirror.run(
+            app,
+            app.config['BUG_MIRROR_SYNC_INTERVAL'],
+            app.config['BUG_MIRROR_FULL_SYNC_INTERVAL'],
+            app.config['BUG_MIRROR_SWEEP_INTERVAL'])
+    else:
+        mirror.sync_all(app, full=full, sweep=True)
+
+
 if __name__ == '__main__':
     manager.run()